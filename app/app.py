@@ -1,9 +1,22 @@
-from flask import Flask, render_template, redirect, flash, request
-from .yamlServices import loadEntriesYaml, validateYaml, appendEntry, getRawYaml, writeRawYaml, validateYamlFromUser
+from flask import Flask, render_template, redirect, flash, request, session, make_response, send_file, g, before_render_template, template_rendered
+from .yamlServices import loadEntriesYaml, validateYaml, appendEntry, getRawYaml, writeRawYaml, validateYamlFromUser, getCachedYamlVersion
 from . import errorHandling
-from .settingHandling import getSettings, checkIfSettingExistsOrIsEmpty, setAndWriteSetting
-from .services import getEntryOptions, getPictureLink
+from . import fileWatcher
+from . import pageCache
+from . import themeRegistry
+from . import thumbnails
+from . import imageProxy
+from . import fingerprints
+from . import assets
+from . import compression
+from . import metrics
+from . import timing
+from .searchIndex import searchEntries
+from .settingHandling import getSettings, setAndWriteSetting
+from .services import getEntryOptions, getPictureLink, getEntryPicture, getEntryPictureSources, refreshPictureIndex, refreshPictureIndexIfStale, getPictureIndexVersion, getEntryPage, getProxiedUrl, getImageUrl
 import os
+import sqlite3
+import time
 from functools import wraps
 import sys
 from threading import Timer
@@ -15,6 +28,8 @@ init(autoreset=True) #colorama init
 
 baseDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # Base directory of the app
 app = Flask(__name__, template_folder="../themes", static_folder="../images")
+app.config["TEMPLATES_AUTO_RELOAD"] = True # Edited theme files are used without a restart, they are only loaded when a page gets rendered
+firstPageSize = 48 # Entries rendered into the home page, the rest gets loaded through /api/entries while scrolling
 
 def checkIfStartUpPrevented(f):
     @wraps(f)
@@ -25,39 +40,23 @@ def checkIfStartUpPrevented(f):
         return f(*args, **kwargs)
     return decorated_function
 
+@timing.timed("getTheme")
 def getTheme():
     settings = getSettings()
-    if not checkIfSettingExistsOrIsEmpty('theme.name'):
+    themeName = settings.theme.name if settings.theme else None
+    if not themeName:
         print(Fore.YELLOW + "No theme set. Setting to default 'standard'.")
         setAndWriteSetting(settingsName='theme.name', value='standard')
         return "standard"
-    else:
-        baseDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        themesDir = os.path.join(baseDir, "themes")
 
-        themeBaseDir = os.path.join(themesDir, 'base')
-        themeMainDir = os.path.join(themesDir, 'main')
-        themeErrorDir = os.path.join(themesDir, 'error')
-        themeEditDir = os.path.join(themesDir, 'edit')
-        
-        paths = [
-            os.path.join(themeBaseDir, f"{settings.theme.name}.html"),
-            os.path.join(themeMainDir, f"{settings.theme.name}.html"), 
-            os.path.join(themeErrorDir, f"{settings.theme.name}.html"),
-            os.path.join(themeEditDir, f"{settings.theme.name}.html")
-        ]
-        fileNotFound = False
-        falsePaths = []
-        for path in paths:
-            if not os.path.exists(path):
-                fileNotFound = True
-                falsePaths.append(path)
-        if fileNotFound:
-            printPaths = "\n".join(falsePaths)
-            flash(f"{len(falsePaths)} Theme file(s) of Theme: '{settings.theme.name}' not found at: {printPaths}. Using default theme instead.", "warning")
-            return "standard"
-
-        return settings.theme.name
+    if not fileWatcher.isWatcherRunning(): # Otherwise the watcher scans themes/ again when it changes
+        themeRegistry.rescanIfChanged()
+    theme, missingPaths = themeRegistry.selectTheme(themeName)
+    if missingPaths: # Only returned once per theme setting and change of themes/
+        printPaths = "\n".join(missingPaths)
+        print(Fore.YELLOW + f"{len(missingPaths)} Theme file(s) of Theme: '{themeName}' not found at: {printPaths}. Using default theme instead.")
+        flash(f"{len(missingPaths)} Theme file(s) of Theme: '{themeName}' not found at: {printPaths}. Using default theme instead.", "warning")
+    return theme
 
 @app.route("/")
 @checkIfStartUpPrevented
@@ -66,13 +65,131 @@ def home():
     if errorHandling.errorExists():
         return redirect("/error")
     
-    for entry in entries: # Check if all images actually exist
-        if getattr(entry, "picture", None):
-            getPictureLink(entry.picture)
+    if not fileWatcher.isWatcherRunning(): # Otherwise the watcher refreshes the picture index when images/ changes
+        refreshPictureIndexIfStale() # Sets an error if a picture does not exist
     if errorHandling.errorExists():
         return redirect("/error")
     
-    return render_template(f"main/{getTheme()}.html", entries=entries, settings=getSettings())
+    theme = getTheme()
+
+    def renderHome(): # Only reads the first page when the page is rendered, with the SQLite backend it is read from the database
+        firstPage = getEntryPage(entries, limit=firstPageSize)
+        return render_template(f"main/{theme}.html", entries=entries, firstEntries=firstPage["entries"], nextCursor=firstPage["nextCursor"], settings=getSettings())
+
+    if "_flashes" in session: # Pending messages get rendered into the page, so it can't be cached
+        return renderHome()
+
+    if fileWatcher.isWatcherRunning(): # The watcher scans themes/ again whenever a theme file changes
+        themeVersion = themeRegistry.getRegistryVersion()
+    else:
+        themeVersion = themeRegistry.getThemeVersion(theme)
+    cacheKey = pageCache.makeCacheKey(
+        "home",
+        getCachedYamlVersion("entries.yaml"),
+        getCachedYamlVersion("settings.yaml"),
+        getPictureIndexVersion(),
+        theme,
+        themeVersion
+    )
+    page = pageCache.getCachedPage(cacheKey)
+    if page is None:
+        page = pageCache.storePage(cacheKey, renderHome())
+
+    response = make_response(page.body)
+    response.set_etag(page.etag)
+    response.headers["Cache-Control"] = "no-cache" # Browsers may keep the page, but have to revalidate it with the ETag
+    g.cachedPage = page # Its compressed body gets cached with it
+    return response.make_conditional(request)
+
+@app.route("/api/entries")
+@checkIfStartUpPrevented
+def entriesApi():
+    offset = request.args.get("offset", 0, type=int)
+    limit = min(max(request.args.get("limit", firstPageSize, type=int), 1), 500)
+    cursor = request.args.get("cursor")
+    entries = loadEntriesYaml()
+    if entries is None:
+        return {"success": False, "reason": "Entries could not be loaded"}, 500
+
+    try:
+        page = getEntryPage(entries, offset=offset, limit=limit, cursor=cursor)
+    except ValueError as exc:
+        return {"success": False, "reason": "Invalid cursor", "details": str(exc)}, 400
+    except sqlite3.Error as exc:
+        return {"success": False, "reason": "Entries could not be loaded", "details": str(exc)}, 500
+
+    page["entries"] = [{
+        "name": name,
+        "url": entry.get("url"),
+        "description": entry.get("description"),
+        "picture": getEntryPicture(name),
+        "pictureSources": getEntryPictureSources(name)
+    } for name, entry in page["entries"]]
+    page["success"] = True
+    return page
+
+@app.route("/search")
+@checkIfStartUpPrevented
+def search():
+    if not getSettings().searchbar:
+        return {"success": False, "reason": "Search is disabled. Set searchbar: true in settings.yaml to enable it"}, 404
+
+    query = request.args.get("q", "")
+    limit = min(max(request.args.get("limit", 20, type=int), 1), 100)
+    entries = loadEntriesYaml()
+    if entries is None:
+        return {"success": False, "reason": "Entries could not be loaded"}, 500
+
+    results = []
+    for name, score in searchEntries(entries, query, limit=limit):
+        entry = entries[name]
+        results.append({
+            "name": name,
+            "url": entry.get("url"),
+            "description": entry.get("description"),
+            "picture": getEntryPicture(name),
+            "pictureSources": getEntryPictureSources(name),
+            "score": score
+        })
+    return {"success": True, "query": query, "results": results}
+
+@app.route("/imageProxy/<proxyKey>")
+def imageProxyRoute(proxyKey):
+    url = getProxiedUrl(proxyKey)
+    if url is None: # Only pictures of the entries get proxied
+        return {"success": False, "reason": "Unknown picture"}, 404
+    if not imageProxy.isEnabled():
+        return redirect(url)
+
+    path, contentType = imageProxy.getImage(url)
+    response = None
+    if path is not None:
+        try:
+            response = send_file(path, mimetype=contentType, conditional=True, max_age=7 * 24 * 60 * 60)
+        except FileNotFoundError: # Evicted from the cache in the meantime
+            pass
+    if response is None: # Could not be fetched, maybe the browser can reach the host
+        response = redirect(url)
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    response.headers["Cache-Control"] = "public, max-age=604800, stale-while-revalidate=86400"
+    response.headers["Content-Security-Policy"] = "default-src 'none'; style-src 'unsafe-inline'; sandbox" # Remote SVGs must not run scripts on this origin
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    return response
+
+@app.route("/assets/<path:assetPath>")
+def assetRoute(assetPath):
+    filePath, encoding = assets.getAssetFile(assetPath, request.accept_encodings)
+    if filePath is None:
+        return {"success": False, "reason": "Unknown asset. Run install/bundleAssets.py to bundle the assets"}, 404
+
+    response = send_file(filePath, mimetype=assets.getMimeType(assetPath), conditional=True)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable" # The version is part of the path
+    return response
 
 @app.route("/add/picture", methods=["POST"])
 @checkIfStartUpPrevented
@@ -100,6 +217,8 @@ def uploadPicture():
     
     try:
         file.save(os.path.join(imagesDir, filename))
+        refreshPictureIndex() # Overwritten pictures get a new fingerprint, the directory mtime does not change then
+        thumbnails.queueThumbnails(filename, onDone=refreshPictureIndex) # The picture index picks up the thumbnails once they exist
         flash(message="File uploaded successfully", category="success")
         return redirect(request.referrer or url_for('index')), 200
     except Exception as e:
@@ -122,16 +241,18 @@ def add():
         flash("No name provided for new entry. Couldn't create new entry", "warning")
         return redirect("/")
     print("appending")
-    appendEntry(entryName=name, entryData=dataDict)
-    if errorHandling.errorExists:
+    if not appendEntry(entryName=name, entryData=dataDict):
         return redirect("/error/f")
     return redirect("/")
     
 @app.route("/error")
 def errorPage():
+    if errorHandling.errorExists():
+        if fileWatcher.isWatcherRunning():
+            fileWatcher.requestRevalidation() # Revalidates in the background, so this request does not wait for it
+        else:
+            validateYaml()
     errors = errorHandling.getErrors()
-    if errors:
-        validateYaml()
     if not errors:
         return redirect("/")
     return render_template(f"error/{getTheme()}.html", errors=errors, startUpPrevented=errorHandling.errorPreventedStart(), settings=getSettings())
@@ -141,7 +262,7 @@ def fErrorPage():
     errors = errorHandling.getErrors()
     if not errors:
         return redirect("/")
-    return render_template(f"error/{getTheme()}.html", errors=errors, startUpPrevented=errorHandling.errorPreventedStart(), settings=getSettings)
+    return render_template(f"error/{getTheme()}.html", errors=errors, startUpPrevented=errorHandling.errorPreventedStart(), settings=getSettings())
 
 @app.route("/edit")
 @checkIfStartUpPrevented
@@ -160,11 +281,11 @@ def writeRawYamlFromUser():
         return {"success": False, "reason": "Missing data or fileName"}, 400
     
     try:
-        validationError = validateYamlFromUser(data=data, yamlFileName=fileName)
+        validatedData, validationError = validateYamlFromUser(data=data, yamlFileName=fileName)
         if validationError:  # If there's an error
             return validationError, 400
         
-        writeRawYaml(fileName=fileName, rawYaml=data)
+        writeRawYaml(fileName=fileName, rawYaml=data, data=validatedData) # Not parsed and validated a second time
         
         if errorHandling.errorExists():
             errors = errorHandling.getErrors()
@@ -225,9 +346,76 @@ def power():
         flash("Unknown power action. No action taken.", "warning")
         return redirect("/")
 
+@app.before_request
+def startRequestTimer():
+    g.requestStarted = time.perf_counter()
+    timing.startRequest()
+
+@app.after_request
+def recordRequestMetrics(response): # Registered first, so it runs after all other after_request functions
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.increment("sitebook_http_requests_total", (("route", route), ("method", request.method), ("status", str(response.status_code))))
+    started = g.get("requestStarted")
+    if started is not None:
+        metrics.observe("sitebook_http_request_duration_seconds", time.perf_counter() - started, (("route", route),))
+    return response
+
+@app.after_request
+def addServerTiming(response): # Runs right before recordRequestMetrics, so compressing the response is included
+    started = g.get("requestStarted")
+    if started is None:
+        return response
+    spans = timing.finishRequest()
+    totalSeconds = time.perf_counter() - started
+    response.headers["Server-Timing"] = timing.formatServerTiming(spans, totalSeconds)
+
+    server = getSettings().server
+    threshold = server.slowRequestThresholdMs if server else None
+    if threshold is not None and totalSeconds * 1000 >= threshold:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        print(timing.formatSlowRequest(request.method, request.full_path.rstrip("?"), route, response.status_code, spans, totalSeconds), flush=True)
+    return response
+
+def startRenderTimer(sender, template, context, **extra):
+    g.renderStarted = time.perf_counter()
+
+def stopRenderTimer(sender, template, context, **extra):
+    started = g.pop("renderStarted", None)
+    if started is not None:
+        timing.record("render", time.perf_counter() - started)
+
+before_render_template.connect(startRenderTimer, app)
+template_rendered.connect(stopRenderTimer, app)
+
+@app.route("/metrics")
+def metricsPage():
+    return app.response_class(metrics.renderMetrics(), mimetype="text/plain; version=0.0.4")
+
+@app.after_request
+def cacheImagesForever(response):
+    """
+    Lets browsers cache files under images/ forever if they were requested with their current fingerprint (?v=, see services.getImageUrl()).
+    """
+    if request.endpoint != "static" or response.status_code not in (200, 206, 304):
+        return response
+    fingerprint = request.args.get("v")
+    filePath = os.path.join(app.static_folder, request.view_args.get("filename", "")) # Already checked by the static route
+    if fingerprint and fingerprint == fingerprints.getFingerprint(filePath):
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+@app.before_request
+def acceptCompressedEtags():
+    compression.stripEtagSuffixes(request.environ)
+
+@app.after_request
+def compressResponse(response):
+    with timing.span("compress"):
+        return compression.compressResponse(response, request.accept_encodings, page=g.get("cachedPage"))
+
 @app.context_processor
 def contextProcessorFunction():
-    return dict(getEntryOptions=getEntryOptions, getPictureLink=getPictureLink) # Make getEntryOptions available in templates
+    return dict(getEntryOptions=getEntryOptions, getPictureLink=getPictureLink, getEntryPicture=getEntryPicture, getEntryPictureSources=getEntryPictureSources, getImageUrl=getImageUrl, assetUrl=assets.assetUrl) # Make getEntryOptions available in templates
 
 @app.errorhandler(404)
 def unknownPage(*args):
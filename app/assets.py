@@ -0,0 +1,62 @@
+import mimetypes
+import os
+from werkzeug.security import safe_join
+
+baseDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # Base directory of the app
+assetsDir = os.path.join(baseDir, "assets") # Filled by install/bundleAssets.py
+cdnUrl = "https://cdn.jsdelivr.net/npm" # assets/ has the same layout, so missing assets can be loaded from there
+encodingExtensions = (("br", ".br"), ("gzip", ".gz")) # Preferred encoding first
+extraMimeTypes = {".woff": "font/woff", ".woff2": "font/woff2", ".map": "application/json"} # Not known on every system
+
+bundledAssets = {} # assetPath: True if it is bundled, checked once per asset since bundling needs a restart anyway
+
+def isBundled(assetPath: str):
+    """
+    Checks if an asset was bundled into assets/ by install/bundleAssets.py.
+    """
+    bundled = bundledAssets.get(assetPath)
+    if bundled is None:
+        filePath = safe_join(assetsDir, assetPath)
+        bundled = filePath is not None and os.path.exists(filePath)
+        bundledAssets[assetPath] = bundled
+    return bundled
+
+def assetUrl(assetPath: str):
+    """
+    Returns the URL of a front-end asset for themes, e.g. assetUrl("bootstrap@5.3.7/dist/css/bootstrap.min.css").
+    Bundled assets are served locally from /assets, others are loaded from jsDelivr.
+
+    args:
+        assetPath (str): <package>@<version>/<path in the package>, like in jsDelivr URLs. Can also be a directory.
+
+    returns:
+        str: The URL of the asset.
+    """
+    if isBundled(assetPath):
+        return f"/assets/{assetPath}"
+    return f"{cdnUrl}/{assetPath}"
+
+def getMimeType(assetPath: str):
+    extension = os.path.splitext(assetPath)[1].lower()
+    if extension in extraMimeTypes:
+        return extraMimeTypes[extension]
+    return mimetypes.guess_type(assetPath)[0] or "application/octet-stream"
+
+def getAssetFile(assetPath: str, acceptEncodings):
+    """
+    Selects the file to send for an asset. Precompressed variants are preferred if the browser accepts them.
+
+    args:
+        assetPath (str): The path of the asset below assets/.
+        acceptEncodings: The parsed Accept-Encoding header (request.accept_encodings).
+
+    returns:
+        tuple: (filePath, encoding) where encoding is None for the uncompressed file, or (None, None) if the asset does not exist.
+    """
+    filePath = safe_join(assetsDir, assetPath)
+    if filePath is None or not os.path.isfile(filePath):
+        return None, None
+    for encoding, extension in encodingExtensions:
+        if acceptEncodings.quality(encoding) > 0 and os.path.isfile(filePath + extension):
+            return filePath + extension, encoding
+    return filePath, None
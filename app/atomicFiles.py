@@ -0,0 +1,39 @@
+import os
+import tempfile
+
+def writeFileAtomic(filePath: str, content):
+    """
+    Replaces the content of a file atomically: the content is written to a unique temporary file in the same directory,
+    flushed to disk and then moved over the original file. Readers either see the old or the new file, never a partial one.
+
+    args:
+        filePath (str): The absolute path of the file.
+        content (str or bytes): The new content of the file.
+
+    returns:
+        None, raises OSError if writing failed. The original file is untouched in that case.
+    """
+    directory, fileName = os.path.split(filePath)
+    fileDescriptor, tempPath = tempfile.mkstemp(prefix=f".{fileName}.", suffix=".tmp", dir=directory)
+    try:
+        file = os.fdopen(fileDescriptor, "wb") if isinstance(content, bytes) else os.fdopen(fileDescriptor, "w", encoding="utf-8")
+        with file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        if os.path.exists(filePath):
+            os.chmod(tempPath, os.stat(filePath).st_mode & 0o7777) # Keep the permissions of the original file
+        os.replace(tempPath, filePath)
+    except BaseException:
+        try:
+            os.unlink(tempPath)
+        except OSError:
+            pass
+        raise
+
+    if hasattr(os, "O_DIRECTORY"): # Also flush the rename itself (not possible on Windows)
+        directoryDescriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directoryDescriptor)
+        finally:
+            os.close(directoryDescriptor)
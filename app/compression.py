@@ -0,0 +1,127 @@
+import gzip
+import re
+
+try:
+    import brotli
+except ImportError: # Brotli is optional, without it responses are only compressed with gzip
+    brotli = None
+
+minimumSize = 1024 # Smaller responses are sent as they are, compressing them saves less than it costs
+compressibleTypes = {"text/html", "text/css", "text/plain", "text/javascript", "application/javascript", "application/json", "image/svg+xml"}
+# Level per encoding: (for responses compressed once and cached, for responses compressed on every request)
+compressionLevels = {"br": (9, 4), "gzip": (9, 6)}
+etagSuffixPattern = re.compile(r'-(?:br|gzip)"') # Compressed responses have an ETag like "<etag>-br"
+
+def getEncodings():
+    """
+    Returns the supported encodings, preferred first.
+    """
+    if brotli is not None:
+        return ("br", "gzip")
+    return ("gzip",)
+
+def selectEncoding(acceptEncodings):
+    """
+    Selects the encoding to compress a response with.
+
+    args:
+        acceptEncodings: The parsed Accept-Encoding header (request.accept_encodings).
+
+    returns:
+        str: "br", "gzip" or None if the browser accepts neither.
+    """
+    for encoding in getEncodings():
+        if acceptEncodings.quality(encoding) > 0:
+            return encoding
+    return None
+
+def compress(data: bytes, encoding: str, cached: bool = False):
+    """
+    Compresses data with the given encoding.
+
+    args:
+        data (bytes): The response body.
+        encoding (str): "br" or "gzip".
+        cached (bool): True if the result gets cached, then it is compressed harder since that only happens once.
+
+    returns:
+        bytes: The compressed data.
+    """
+    level = compressionLevels[encoding][0 if cached else 1]
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+def getCompressedBody(page, encoding: str):
+    """
+    Returns the body of a cached page compressed with the given encoding. It is only compressed once and then kept with the page.
+
+    args:
+        page (CachedPage): The cached page, see pageCache.py.
+        encoding (str): "br" or "gzip".
+
+    returns:
+        bytes: The compressed body.
+    """
+    body = page.encodedBodies.get(encoding)
+    if body is None:
+        body = compress(page.body, encoding, cached=True)
+        page.encodedBodies[encoding] = body
+    return body
+
+def stripEtagSuffixes(environ):
+    """
+    Removes the encoding suffix from the ETags in If-None-Match, so conditional requests match the ETag of the uncompressed body.
+    Has to run before anything reads request.if_none_match.
+
+    args:
+        environ (dict): The WSGI environ of the request.
+
+    returns:
+        None
+    """
+    ifNoneMatch = environ.get("HTTP_IF_NONE_MATCH")
+    if ifNoneMatch:
+        environ["HTTP_IF_NONE_MATCH"] = etagSuffixPattern.sub('"', ifNoneMatch)
+
+def compressResponse(response, acceptEncodings, page = None):
+    """
+    Compresses a response if the browser accepts it and it is worth it.
+    Files sent with send_file() are skipped, they are either already compressed (images) or precompressed (/assets).
+
+    args:
+        response: The Flask response.
+        acceptEncodings: The parsed Accept-Encoding header (request.accept_encodings).
+        page (CachedPage): The cached page the response was created from, its compressed body gets cached with it.
+
+    returns:
+        The response.
+    """
+    if response.direct_passthrough or response.is_streamed or response.mimetype not in compressibleTypes:
+        return response
+    response.vary.add("Accept-Encoding")
+    if response.status_code == 304 and page is not None and len(page.body) >= minimumSize:
+        encoding = selectEncoding(acceptEncodings)
+        etag, weak = response.get_etag()
+        if encoding and etag:
+            response.set_etag(f"{etag}-{encoding}", weak=weak) # Same ETag as the compressed 200 response
+        return response
+    if response.status_code != 200 or "Content-Encoding" in response.headers or "no-transform" in response.headers.get("Cache-Control", ""):
+        return response
+
+    encoding = selectEncoding(acceptEncodings)
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < minimumSize:
+        return response
+
+    if page is not None and data == page.body:
+        response.set_data(getCompressedBody(page, encoding))
+    else:
+        response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak=weak) # The compressed body is a different representation
+    return response
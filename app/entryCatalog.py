@@ -0,0 +1,160 @@
+from collections.abc import Mapping
+
+# Fields of an entry in the order they are stored in, see validationModels/entries.py
+entryFields = ("url", "picture", "description")
+fieldPositions = {field: position for position, field in enumerate(entryFields)}
+emptyRow = (None,) * len(entryFields)
+
+class EntryRecord(Mapping):
+    """
+    Read-only, dict-like view of one entry, e.g. entry.get("url") or entry["url"].
+    Fields which are not set (None) behave like missing keys, just like in the dict the entry was parsed from.
+    Views are only created when an entry is accessed, the catalog itself only holds plain tuples.
+
+    Attributes:
+        row (tuple): The values of the entry in the order of entryFields.
+    """
+    __slots__ = ("row",)
+
+    def __init__(self, row: tuple):
+        self.row = row
+
+    def __getitem__(self, key):
+        position = fieldPositions.get(key)
+        if position is None or self.row[position] is None:
+            raise KeyError(key)
+        return self.row[position]
+
+    def get(self, key, default=None):
+        position = fieldPositions.get(key)
+        if position is None:
+            return default
+        value = self.row[position]
+        return default if value is None else value
+
+    def __iter__(self):
+        return (field for field, value in zip(entryFields, self.row) if value is not None)
+
+    def __len__(self):
+        return len(self.row) - self.row.count(None)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __eq__(self, other):
+        if isinstance(other, EntryRecord):
+            return self.row == other.row
+        return Mapping.__eq__(self, other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"EntryRecord({dict(self)!r})"
+
+    def toDict(self):
+        """
+        Returns the entry as a new dict, e.g. to write it as YAML.
+        """
+        return {field: value for field, value in zip(entryFields, self.row) if value is not None}
+
+class EntryCatalog(Mapping):
+    """
+    Compact, read-only mapping of entry name: EntryRecord in the order of entries.yaml.
+    Every entry is stored as a plain tuple of its field values instead of a dict with its own keys. Plain tuples of
+    strings take about half the memory of such dicts and are not tracked by the garbage collector, so large catalogs
+    neither grow the memory of every worker nor the time of garbage collections.
+    Like the dicts before, a catalog is shared by all requests and never modified, changes create a new catalog.
+
+    Attributes:
+        rows (dict): name: tuple of the values of the entry in the order of entryFields.
+    """
+    __slots__ = ("rows",)
+
+    def __init__(self, rows: dict = None):
+        self.rows = rows if rows is not None else {}
+
+    def __getitem__(self, name):
+        return EntryRecord(self.rows[name])
+
+    def get(self, name, default=None):
+        row = self.rows.get(name)
+        return default if row is None else EntryRecord(row)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, name):
+        return name in self.rows
+
+    def items(self):
+        return ((name, EntryRecord(row)) for name, row in self.rows.items())
+
+    def values(self):
+        return (EntryRecord(row) for row in self.rows.values())
+
+    def __repr__(self):
+        return f"EntryCatalog({len(self.rows)} entries)"
+
+    def withEntry(self, name: str, entryData):
+        """
+        Returns a new catalog with an entry added (at the end) or replaced (at its position).
+
+        args:
+            name (str): The name of the entry.
+            entryData: The validated entry as dict or EntryRecord.
+
+        returns:
+            EntryCatalog: The new catalog, this one is left unchanged.
+        """
+        rows = dict(self.rows) # Only copies the references to the rows
+        rows[name] = toRow(entryData)
+        return EntryCatalog(rows)
+
+    def withoutEntry(self, name: str):
+        """
+        Returns a new catalog without the given entry.
+        """
+        rows = dict(self.rows)
+        rows.pop(name, None)
+        return EntryCatalog(rows)
+
+    def toDicts(self):
+        """
+        Returns all entries as new dicts in their order, e.g. to write them as YAML.
+        """
+        return {name: EntryRecord(row).toDict() for name, row in self.rows.items()}
+
+def toRow(entryData):
+    """
+    Converts an entry to the tuple it is stored as.
+
+    args:
+        entryData: The entry as parsed (a dict or None) or an EntryRecord.
+
+    returns:
+        tuple: The values of the entry or None if it has fields which can't be stored (it is invalid then).
+    """
+    if entryData.__class__ is dict: # Checked first, this runs for every entry whenever entries.yaml gets validated
+        if entryData.keys() <= fieldPositions.keys():
+            return tuple(map(entryData.get, entryFields))
+        return None
+    if entryData is None:
+        return emptyRow
+    if isinstance(entryData, EntryRecord):
+        return entryData.row
+    return None
+
+def buildCatalog(entries: dict):
+    """
+    Builds a catalog from validated entries, e.g. the parsed content of entries.yaml.
+
+    args:
+        entries (dict): name: entry as dict (or None for entries without fields).
+
+    returns:
+        EntryCatalog: The catalog.
+    """
+    return EntryCatalog({name: toRow(entry) for name, entry in entries.items()})
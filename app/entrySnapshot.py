@@ -0,0 +1,136 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import marshal
+import os
+import sys
+import tempfile
+import threading
+from colorama import Fore
+from . import metrics
+from . import timing
+from .entryCatalog import EntryCatalog, entryFields
+from .validationModels import EntryModel
+
+baseDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # Base directory of the app
+snapshotPath = os.path.join(baseDir, "cache", "entries.snapshot")
+
+# A snapshot is: magic, sha256 of entries.yaml, sha256 of the format key, then the rows of the EntryCatalog in marshal format.
+# Only the header has to be read to know whether the snapshot matches.
+snapshotMagic = b"SBSNAP02"
+headerSize = len(snapshotMagic) + 32 + 32
+
+snapshotState = {"yamlHash": None} # Hash of the entries.yaml the snapshot on disk was made of (once known) and the pending snapshot
+formatKeyState = {"digest": None}
+snapshotLock = threading.Lock()
+workerPool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SiteBookSnapshot")
+
+def getFormatKey():
+    """
+    Returns a digest of everything besides entries.yaml a snapshot depends on: the marshal format of this Python version,
+    the validation model and the fields of the catalog. A snapshot made by another Python version or before one of them changed is never used.
+
+    returns:
+        bytes: The sha256 digest.
+    """
+    digest = formatKeyState["digest"]
+    if digest is None:
+        schema = json.dumps(EntryModel.model_json_schema(), sort_keys=True)
+        digest = hashlib.sha256(f"{sys.version}|{marshal.version}|{schema}|{entryFields}".encode("utf-8")).digest()
+        formatKeyState["digest"] = digest
+    return digest
+
+def hashYaml(rawYaml: str):
+    """
+    Returns the sha256 digest of the content of entries.yaml, the key of its snapshot.
+    """
+    return hashlib.sha256(rawYaml.encode("utf-8")).digest()
+
+@timing.timed("snapshotLoad")
+def loadSnapshot(yamlHash: bytes):
+    """
+    Loads the validated entries from the snapshot if it was made of the same entries.yaml.
+
+    args:
+        yamlHash (bytes): The hash of the current content of entries.yaml, see hashYaml().
+
+    returns:
+        EntryCatalog: The validated entries or None if there is no matching snapshot.
+    """
+    rows = None
+    try:
+        with open(snapshotPath, "rb") as file:
+            header = file.read(headerSize)
+            if header == snapshotMagic + yamlHash + getFormatKey():
+                rows = marshal.loads(file.read())
+            elif len(header) == headerSize:
+                snapshotState["yamlHash"] = header[len(snapshotMagic):len(snapshotMagic) + 32]
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, EOFError, TypeError) as exc: # Unreadable or corrupt, it gets replaced
+        print(Fore.YELLOW + f"Ignoring the snapshot of entries.yaml: {exc}")
+        rows = None
+
+    if not isinstance(rows, dict):
+        metrics.recordCacheLookup("entriesSnapshot", hit=False)
+        return None
+    snapshotState["yamlHash"] = yamlHash
+    metrics.recordCacheLookup("entriesSnapshot", hit=True)
+    return EntryCatalog(rows)
+
+def writeSnapshot(yamlHash: bytes, entries: dict):
+    """
+    Writes the snapshot atomically, readers either see the old or the new one.
+
+    args:
+        yamlHash (bytes): The hash of the entries.yaml the entries were validated from.
+        entries (EntryCatalog): The validated entries.
+
+    returns:
+        None, raises OSError or ValueError if the snapshot can't be written.
+    """
+    directory = os.path.dirname(snapshotPath)
+    os.makedirs(directory, exist_ok=True)
+    fileDescriptor, tempPath = tempfile.mkstemp(prefix=".entries.snapshot.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fileDescriptor, "wb") as file:
+            file.write(snapshotMagic + yamlHash + getFormatKey())
+            file.write(marshal.dumps(entries.rows))
+        os.replace(tempPath, snapshotPath)
+    except BaseException:
+        try:
+            os.unlink(tempPath)
+        except OSError:
+            pass
+        raise
+    snapshotState["yamlHash"] = yamlHash
+
+def queueSnapshot(entries: dict, rawYaml: str):
+    """
+    Writes a snapshot of newly published entries in the background, so the next start can skip parsing and validating.
+    Only the newest entries queued get written, and nothing is written if the snapshot is already up to date.
+    The entries have to be parsed from exactly rawYaml, the snapshot is stored under its hash.
+    Entries which were changed in memory (e.g. appended ones) are not snapshotted, the next full load does that.
+
+    args:
+        entries (EntryCatalog): The validated entries.
+        rawYaml (str): The content of entries.yaml the entries were parsed and validated from.
+
+    returns:
+        None
+    """
+    snapshotState["pending"] = (entries, rawYaml)
+    workerPool.submit(writePendingSnapshot)
+
+def writePendingSnapshot():
+    with snapshotLock:
+        pending = snapshotState.pop("pending", None)
+        if pending is None: # Already written by an earlier run
+            return
+        entries, rawYaml = pending
+        try:
+            yamlHash = hashYaml(rawYaml)
+            if yamlHash != snapshotState["yamlHash"]:
+                writeSnapshot(yamlHash, entries)
+        except Exception as exc:
+            print(Fore.RED + f"Could not write the snapshot of entries.yaml: {exc}")
@@ -0,0 +1,319 @@
+from contextlib import contextmanager
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from . import timing
+from .entryCatalog import EntryCatalog, EntryRecord, toRow
+
+baseDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # Base directory of the app
+defaultDatabasePath = "entries.db"
+busyTimeoutMs = 5000 # How long a connection waits for another writer before it fails with "database is locked"
+schemaVersion = 1
+
+# position is the rowid, so entries keep the order they were added in and reading them in that order needs no sorting.
+# name is indexed by its UNIQUE constraint, so single entries are found without scanning the table.
+# The meta table holds the id of the database and a version which gets incremented by every write.
+schemaStatements = (
+    "CREATE TABLE IF NOT EXISTS entries (position INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, data TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)"
+)
+
+# Replaced as a whole by configureStore()
+storeSettings = {"enabled": False, "databasePath": os.path.join(baseDir, defaultDatabasePath)}
+
+threadConnections = threading.local() # Every thread gets its own connection, sqlite3 connections must not be shared
+
+def configureStore(storageSettings):
+    """
+    Applies the storage settings of settings.yaml.
+
+    args:
+        storageSettings (StorageSettings): settings.storage, may be None.
+
+    returns:
+        bool: True if the backend or the database changed, so the entries have to be loaded again.
+    """
+    global storeSettings
+    enabled = False
+    databasePath = defaultDatabasePath
+    if storageSettings is not None:
+        enabled = storageSettings.backend == "sqlite"
+        if storageSettings.databasePath:
+            databasePath = storageSettings.databasePath
+
+    newSettings = {"enabled": enabled, "databasePath": os.path.join(baseDir, databasePath)} # Absolute paths stay as they are
+    changed = newSettings != storeSettings
+    storeSettings = newSettings
+    return changed
+
+def isEnabled():
+    """
+    Checks if the entries are stored in the SQLite database instead of entries.yaml.
+    """
+    return storeSettings["enabled"]
+
+def getDatabaseName():
+    """
+    Returns the file name of the database, used as origin of its errors.
+    """
+    return os.path.basename(storeSettings["databasePath"])
+
+def getConnection():
+    """
+    Returns the connection of the current thread, opening it (and creating the database) if needed.
+    Connections are in autocommit mode, reads and writes open their transactions explicitly.
+
+    args:
+        None
+
+    returns:
+        sqlite3.Connection: The connection. Raises sqlite3.Error if the database can't be opened.
+    """
+    databasePath = storeSettings["databasePath"]
+    connection = getattr(threadConnections, "connection", None)
+    if connection is not None:
+        if threadConnections.databasePath == databasePath:
+            return connection
+        connection.close() # The database changed in settings.yaml
+        threadConnections.connection = None
+
+    connection = sqlite3.connect(databasePath, timeout=busyTimeoutMs / 1000, isolation_level=None)
+    try:
+        connection.execute("PRAGMA journal_mode=WAL") # Readers never block the writer and the writer never blocks readers
+        connection.execute("PRAGMA synchronous=NORMAL") # With WAL a power loss can only lose the last transactions, never corrupt the database
+        if connection.execute("PRAGMA user_version").fetchone()[0] < schemaVersion:
+            with transaction(connection, write=True):
+                for statement in schemaStatements:
+                    connection.execute(statement)
+                connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('id', ?), ('version', 0)", (uuid.uuid4().hex,))
+                connection.execute(f"PRAGMA user_version = {schemaVersion}")
+    except BaseException:
+        connection.close()
+        raise
+    threadConnections.connection = connection
+    threadConnections.databasePath = databasePath
+    return connection
+
+@contextmanager
+def transaction(connection, write: bool = False):
+    """
+    Runs the body of the with statement in a transaction, which is rolled back if it raises.
+    Write transactions take the write lock right away, so they never fail halfway with "database is locked".
+    All reads in a transaction see the same snapshot of the database.
+    """
+    connection.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+    try:
+        yield connection
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+
+def readSignature(connection):
+    rows = dict(connection.execute("SELECT key, value FROM meta WHERE key IN ('id', 'version')").fetchall())
+    return ("sqlite", rows.get("id"), rows.get("version"))
+
+def bumpVersion(connection):
+    """
+    Increments the version of the database, has to be called in every write transaction.
+
+    returns:
+        tuple: The new signature of the database.
+    """
+    connection.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+    return readSignature(connection)
+
+def serializeEntry(entryData):
+    if isinstance(entryData, EntryRecord):
+        entryData = entryData.toDict()
+    return json.dumps(entryData, ensure_ascii=False, separators=(",", ":"))
+
+def getSignature():
+    """
+    Returns a signature of the database which changes with every write, like yamlServices.getFileSignature() does for files.
+
+    args:
+        None
+
+    returns:
+        tuple: ("sqlite", database id, version) or None if the database can't be read.
+    """
+    try:
+        return readSignature(getConnection())
+    except sqlite3.Error:
+        return None
+
+@timing.timed("entryStoreLoad")
+def loadEntries():
+    """
+    Reads all entries in the order they were added.
+
+    args:
+        None
+
+    returns:
+        tuple: (signature, EntryCatalog), the signature matches the returned entries.
+        Raises sqlite3.Error if the database can't be read.
+    """
+    connection = getConnection()
+    with transaction(connection):
+        signature = readSignature(connection)
+        rows = connection.execute("SELECT name, data FROM entries ORDER BY position").fetchall()
+    return signature, EntryCatalog({name: toRow(json.loads(data)) for name, data in rows})
+
+def getEntry(entryName: str):
+    """
+    Reads a single entry by its name.
+
+    args:
+        entryName (str): The name of the entry.
+
+    returns:
+        dict: The entry or None if it does not exist.
+    """
+    row = getConnection().execute("SELECT data FROM entries WHERE name = ?", (entryName,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def getEntryRange(afterPosition: int = 0, limit: int = 48, offset: int = 0):
+    """
+    Reads a page of entries in the order they were added.
+    Pages are addressed by the position of the last entry of the previous page instead of an offset,
+    so every page is a range scan of the primary key no matter how deep it is.
+
+    args:
+        afterPosition (int): The position of the last entry of the previous page, 0 for the first page.
+        limit (int): The maximum amount of entries.
+        offset (int): Entries skipped after afterPosition, they are still read. Only for clients without a cursor.
+
+    returns:
+        list: [(position, name, entry), ...]
+    """
+    rows = getConnection().execute(
+        "SELECT position, name, data FROM entries WHERE position > ? ORDER BY position LIMIT ? OFFSET ?", (afterPosition, limit, offset)
+    ).fetchall()
+    return [(position, name, json.loads(data)) for position, name, data in rows]
+
+def countEntries(untilPosition: int = None):
+    """
+    Returns the number of stored entries, or of the ones up to a position (a range count of the primary key).
+    """
+    if untilPosition is None:
+        return getConnection().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    return getConnection().execute("SELECT COUNT(*) FROM entries WHERE position <= ?", (untilPosition,)).fetchone()[0]
+
+def insertEntry(entryName: str, entryData: dict):
+    """
+    Adds an entry after all existing ones.
+
+    args:
+        entryName (str): The name of the new entry.
+        entryData (dict): The validated data of the new entry.
+
+    returns:
+        tuple: The new signature of the database.
+        Raises sqlite3.IntegrityError if an entry with this name already exists.
+    """
+    connection = getConnection()
+    with transaction(connection, write=True):
+        connection.execute("INSERT INTO entries (name, data) VALUES (?, ?)", (entryName, serializeEntry(entryData)))
+        return bumpVersion(connection)
+
+def updateEntry(entryName: str, entryData: dict):
+    """
+    Replaces the data of an entry, it keeps its position.
+
+    args:
+        entryName (str): The name of the entry.
+        entryData (dict): The validated new data of the entry.
+
+    returns:
+        tuple: The new signature of the database or None if the entry does not exist.
+    """
+    connection = getConnection()
+    with transaction(connection, write=True):
+        if connection.execute("UPDATE entries SET data = ? WHERE name = ?", (serializeEntry(entryData), entryName)).rowcount == 0:
+            return None
+        return bumpVersion(connection)
+
+def deleteEntry(entryName: str):
+    """
+    Deletes an entry.
+
+    args:
+        entryName (str): The name of the entry.
+
+    returns:
+        tuple: The new signature of the database or None if the entry does not exist.
+    """
+    connection = getConnection()
+    with transaction(connection, write=True):
+        if connection.execute("DELETE FROM entries WHERE name = ?", (entryName,)).rowcount == 0:
+            return None
+        return bumpVersion(connection)
+
+def getEntryChanges(previousEntries: EntryCatalog, entries: EntryCatalog):
+    """
+    Compares two catalogs and returns the rows which have to be written to get from the first to the second.
+    Positions can't be changed by single rows, so only changes which keep the order of the remaining entries
+    and only add entries after all of them can be written row by row.
+
+    returns:
+        tuple: (names of the deleted entries, {name: entry} of the changed ones, {name: entry} of the added ones)
+        or None if the order changed.
+    """
+    previousRows = previousEntries.rows
+    rows = entries.rows
+    keptNames = [name for name in previousRows if name in rows]
+    if keptNames != list(rows)[:len(keptNames)]: # Reordered, or added in between
+        return None
+    deletedNames = [name for name in previousRows if name not in rows]
+    changedEntries = {name: entries[name] for name in keptNames if rows[name] != previousRows[name]}
+    addedEntries = {name: entries[name] for name in list(rows)[len(keptNames):]}
+    return deletedNames, changedEntries, addedEntries
+
+def saveEntries(entries: EntryCatalog, previousEntries: EntryCatalog, previousSignature):
+    """
+    Stores the entries, e.g. when entries.yaml gets saved in the editor.
+    Only the deleted, changed and added entries are written, each by its key. If the order of the entries changed
+    or the database is not at previousSignature anymore, all entries get replaced instead, see replaceEntries().
+
+    args:
+        entries (EntryCatalog): The validated entries in the order they should be stored in.
+        previousEntries (EntryCatalog): The entries which were loaded from the database at previousSignature.
+        previousSignature (tuple): The signature of the database the previous entries were loaded at.
+
+    returns:
+        tuple: The new signature of the database.
+    """
+    changes = getEntryChanges(previousEntries, entries) if previousEntries is not None else None
+    if changes is None:
+        return replaceEntries(entries)
+    deletedNames, changedEntries, addedEntries = changes
+    connection = getConnection()
+    with transaction(connection, write=True):
+        if readSignature(connection) != previousSignature: # Written by another process in the meantime
+            connection.execute("DELETE FROM entries")
+            addedEntries = entries
+        else:
+            connection.executemany("DELETE FROM entries WHERE name = ?", ((name,) for name in deletedNames))
+            connection.executemany("UPDATE entries SET data = ? WHERE name = ?", ((serializeEntry(entry), name) for name, entry in changedEntries.items()))
+        connection.executemany("INSERT INTO entries (name, data) VALUES (?, ?)", ((name, serializeEntry(entry)) for name, entry in addedEntries.items()))
+        return bumpVersion(connection)
+
+def replaceEntries(entries: dict):
+    """
+    Replaces all entries in a single transaction, e.g. when entries.yaml gets imported or saved in the editor.
+
+    args:
+        entries (EntryCatalog): The validated entries in the order they should be stored in.
+
+    returns:
+        tuple: The new signature of the database.
+    """
+    connection = getConnection()
+    with transaction(connection, write=True):
+        connection.execute("DELETE FROM entries")
+        connection.executemany("INSERT INTO entries (name, data) VALUES (?, ?)", ((name, serializeEntry(entry)) for name, entry in entries.items()))
+        return bumpVersion(connection)
@@ -1,3 +1,6 @@
+import threading
+from . import metrics
+
 class Error:
     """
     Represents an error with an origin and a message.
@@ -11,7 +14,81 @@ class Error:
         self.origin = origin
         self.message = message
 
-errors = []
+class ErrorRegistry:
+    """
+    Holds all errors, shared by every thread. Errors are indexed by origin and by top category,
+    so checking for and removing errors does not need to go through all errors.
+
+    Attributes:
+        errors (dict): All errors as id: Error, in the order they were set.
+        byOrigin (dict): origin: set of error ids.
+        byTopCategory (dict): top category (e.g. VALIDATION): set of error ids.
+        lock (threading.Lock): Has to be held while changing or reading the errors.
+    """
+    def __init__(self):
+        self.errors = {}
+        self.byOrigin = {}
+        self.byTopCategory = {}
+        self.nextId = 0
+        self.lock = threading.Lock()
+
+    def add(self, error: Error):
+        with self.lock:
+            errorId = self.nextId
+            self.nextId += 1
+            self.errors[errorId] = error
+            self.byOrigin.setdefault(error.origin, set()).add(errorId)
+            self.byTopCategory.setdefault(error.category.split(".")[0], set()).add(errorId)
+
+    def removeWhere(self, errorIds, condition = None):
+        """
+        Removes the errors with the given ids, optionally only those for which condition(error) is True.
+        Has to be called while holding the lock.
+        """
+        for errorId in list(errorIds):
+            error = self.errors[errorId]
+            if condition is not None and not condition(error):
+                continue
+            del self.errors[errorId]
+            self.discardIndex(self.byOrigin, error.origin, errorId)
+            self.discardIndex(self.byTopCategory, error.category.split(".")[0], errorId)
+
+    def discardIndex(self, index: dict, key, errorId: int):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(errorId)
+            if not ids:
+                del index[key]
+
+    def removeByOrigin(self, origin: str, condition = None):
+        with self.lock:
+            self.removeWhere(self.byOrigin.get(origin, ()), condition)
+
+    def removeByTopCategory(self, topCategory: str, condition = None):
+        with self.lock:
+            self.removeWhere(self.byTopCategory.get(topCategory, ()), condition)
+
+    def clear(self):
+        with self.lock:
+            self.errors = {}
+            self.byOrigin = {}
+            self.byTopCategory = {}
+
+    def exists(self, origin: str = None, topCategory: str = None):
+        if origin is not None and topCategory is not None:
+            with self.lock:
+                return any(self.errors[errorId].category.split(".")[0] == topCategory for errorId in self.byOrigin.get(origin, ()))
+        if origin is not None:
+            return origin in self.byOrigin
+        if topCategory is not None:
+            return topCategory in self.byTopCategory
+        return len(self.errors) > 0
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.errors.values())
+
+registry = ErrorRegistry()
 errorPreventedStartState = False
 
 recoverableCategories = {'VALIDATION', 'CONFIG', 'SERVICES'} # These Categories of errors will be cleared on load
@@ -51,22 +128,20 @@ def setError(message: str, origin: str = "Unknown", category: str = "UNKNOWN"):
     if not checkIfTopCategoryExists(splitCategories[0]):
         raise ValueError(f"Category '{category}' does not exist. Please use one of the following: {', '.join(recoverableCategories.union(criticalCategories))}")
     error = Error(origin=origin, message=message, category=category)
-    errors.append(error)
+    registry.add(error)
 
-def errorExists():
+def errorExists(origin: str = None, category: str = None):
     """
-    Checks if there are any errors set.
+    Checks if there are any errors set, optionally only with the given origin and/or top category.
 
     args:
-        None
+        origin (str): Only check errors with this origin, e.g. entries.yaml. Defaults to None.
+        category (str): Only check errors with this top category, e.g. VALIDATION. Defaults to None.
 
     returns:
         bool: True if there are errors, False otherwise.
     """
-    if len(errors) > 0:
-        return True
-    else:
-        return False
+    return registry.exists(origin=origin, topCategory=category)
     
 def removeErrorByOrigin(origin: str, evenCritical: bool = False):
     """
@@ -79,14 +154,10 @@ def removeErrorByOrigin(origin: str, evenCritical: bool = False):
     returns:
         None
     """
-    global errors
-    for error in errors:
-        if error.origin == origin:
-            if not evenCritical:
-                if error.category not in criticalCategories:
-                    errors.remove(error)
-            else:
-                errors.remove(error)
+    if evenCritical:
+        registry.removeByOrigin(origin)
+    else:
+        registry.removeByOrigin(origin, condition=lambda error: error.category not in criticalCategories)
 
 def removeErrorByCategory(category: str):
     """
@@ -98,10 +169,7 @@ def removeErrorByCategory(category: str):
     returns:
         None
     """
-    global errors
-    for error in errors:
-        if error.category == category:
-            errors.remove(error)
+    registry.removeByTopCategory(category.split(".")[0], condition=lambda error: error.category == category)
 
 def removeAllRecoverableErrors():
     """
@@ -113,10 +181,8 @@ def removeAllRecoverableErrors():
     returns:
         None
     """
-    global errors
-    for error in errors:
-        if error.category in recoverableCategories:
-            errors.remove(error)
+    for topCategory in recoverableCategories: # The index only holds errors of this top category, so all of them get removed
+        registry.removeByTopCategory(topCategory)
 
 def removeAllErrors():
     """
@@ -128,8 +194,7 @@ def removeAllErrors():
     returns:
         None
     """
-    global errors
-    errors = []
+    registry.clear()
 
 def getErrors():
     """
@@ -143,9 +208,9 @@ def getErrors():
         None
 
     returns:
-        list: A list of all errors.
+        list: A copy of all errors, which does not change when errors get set or removed.
     """
-    return errors
+    return registry.snapshot()
 
 def getErrorsPrintable():
     """
@@ -158,7 +223,7 @@ def getErrorsPrintable():
         str: A string representation of all errors.
     """
     output = ""
-    for error in errors:
+    for error in registry.snapshot():
         output += f"{error.category} in {error.origin}:\n\t{error.message}\n"
     return output.strip()
 
@@ -186,4 +251,15 @@ def errorPreventedStart():
     returns:
         bool: True if an error prevented the correct startup, False otherwise.
     """
-    return errorPreventedStartState
\ No newline at end of file
+    return errorPreventedStartState
+
+def collectErrorCounts():
+    """
+    Returns the number of current errors per category for /metrics, see metrics.addCollector().
+    """
+    counts = {}
+    for error in registry.snapshot():
+        counts[error.category] = counts.get(error.category, 0) + 1
+    return [("sitebook_errors", (("category", category),), count) for category, count in counts.items()]
+
+metrics.addCollector(collectErrorCounts)
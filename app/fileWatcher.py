@@ -0,0 +1,323 @@
+from . import yamlServices, services, themeRegistry
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from colorama import Fore
+
+baseDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # Base directory of the app
+
+watchedFiles = {"entries.yaml", "settings.yaml"} # Files in the base directory
+watchedDirs = {"themes", "images"} # Directories in the base directory, watched recursively
+
+pollInterval = 0.5 # Seconds between two scans when inotify is not available
+settleTime = 0.1 # Seconds without new events before changes get handled, so editors can finish writing
+
+# inotify constants, see <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+watchMask = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+eventHeader = struct.Struct("iIII")
+
+listeners = {target: [] for target in watchedFiles | watchedDirs}
+revalidationRequested = threading.Event()
+watcherThread = None
+
+def addListener(target: str, callback):
+    """
+    Registers a function which gets called by the watcher thread after a watched file or directory changed.
+
+    args:
+        target (str): One of the watched files or directories, e.g. "entries.yaml" or "images".
+        callback: Function without arguments.
+
+    returns:
+        None
+    """
+    if target not in listeners:
+        raise ValueError(f"'{target}' is not watched. Please use one of the following: {', '.join(sorted(listeners))}")
+    listeners[target].append(callback)
+
+def revalidateYaml(fileName: str):
+    """
+    Validates a YAML file and publishes the result into the cache and errorHandling.
+    """
+    yamlServices.refreshCachedYaml(fileName)
+
+def handleChanges(targets):
+    """
+    Calls all listeners of the changed targets. Exceptions are printed so the watcher thread keeps running.
+
+    args:
+        targets (set): The changed files and directories.
+
+    returns:
+        None
+    """
+    for target in sorted(targets):
+        for callback in listeners[target]:
+            try:
+                callback()
+            except Exception as exc:
+                print(Fore.RED + f"Error while handling a change of {target}: {exc}")
+
+def requestRevalidation():
+    """
+    Asks the watcher thread to handle all targets again, e.g. when the error page is opened.
+    Returns immediately, the result is published once it is done.
+
+    args:
+        None
+
+    returns:
+        None
+    """
+    revalidationRequested.set()
+
+def isWatcherRunning():
+    """
+    Checks if the watcher thread is running, which means that requests can rely on the precomputed state.
+
+    args:
+        None
+
+    returns:
+        bool: True if the watcher thread is running, False otherwise.
+    """
+    return watcherThread is not None and watcherThread.is_alive()
+
+def getTargetOfPath(path: str):
+    """
+    Returns the watched file or directory a path belongs to or None if it isn't watched.
+    """
+    relativePath = os.path.relpath(path, baseDir)
+    topLevel = relativePath.split(os.sep)[0]
+    if relativePath in watchedFiles or topLevel in watchedDirs:
+        return relativePath if relativePath in watchedFiles else topLevel
+    return None
+
+def loadInotify():
+    """
+    Loads the inotify functions of the C library.
+
+    returns:
+        The C library or None if inotify is not available (e.g. not on Linux).
+    """
+    libcName = ctypes.util.find_library("c")
+    if not libcName:
+        return None
+    try:
+        libc = ctypes.CDLL(libcName, use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+def addInotifyWatches(libc, fd: int, path: str, watches: dict):
+    """
+    Adds an inotify watch for a directory and all of its subdirectories.
+
+    args:
+        libc: The C library returned by loadInotify().
+        fd (int): The inotify file descriptor.
+        path (str): The directory to watch.
+        watches (dict): Maps watch descriptors to the watched directory, gets updated.
+
+    returns:
+        None
+    """
+    for dirPath, dirNames, fileNames in os.walk(path):
+        wd = libc.inotify_add_watch(fd, os.fsencode(dirPath), watchMask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {dirPath}")
+        watches[wd] = dirPath
+
+def openInotify(libc):
+    """
+    Creates an inotify file descriptor and adds the watches of all targets. Changes are queued from then on.
+
+    args:
+        libc: The C library returned by loadInotify().
+
+    returns:
+        tuple: (fd, watches) with watches mapping watch descriptors to the watched directory.
+        Raises OSError if inotify can't be used, nothing is left open then.
+    """
+    fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+    try:
+        watches = {}
+        baseWd = libc.inotify_add_watch(fd, os.fsencode(baseDir), watchMask)
+        if baseWd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {baseDir}")
+        watches[baseWd] = baseDir
+        for dirName in watchedDirs:
+            dirPath = os.path.join(baseDir, dirName)
+            if os.path.isdir(dirPath):
+                addInotifyWatches(libc, fd, dirPath, watches)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd, watches
+
+def watchWithInotify(libc, fd: int, watches: dict):
+    """
+    Watches all targets with inotify. Only returns if inotify stops working, the file descriptor is closed then.
+
+    args:
+        libc: The C library returned by loadInotify().
+        fd (int): The inotify file descriptor returned by openInotify().
+        watches (dict): The watches returned by openInotify().
+
+    returns:
+        None
+    """
+    try:
+        changedTargets = set()
+        lastEventTime = 0
+        while True:
+            readable, _, _ = select.select([fd], [], [], settleTime)
+            if readable:
+                data = os.read(fd, 64 * 1024)
+                offset = 0
+                while offset < len(data):
+                    wd, mask, _, nameLength = eventHeader.unpack_from(data, offset)
+                    name = data[offset + eventHeader.size:offset + eventHeader.size + nameLength].rstrip(b"\0")
+                    offset += eventHeader.size + nameLength
+
+                    if mask & IN_Q_OVERFLOW: # Events were lost, so handle everything
+                        changedTargets.update(listeners)
+                        continue
+                    dirPath = watches.get(wd)
+                    if dirPath is None:
+                        continue
+                    path = os.path.join(dirPath, os.fsdecode(name)) if name else dirPath
+                    target = getTargetOfPath(path)
+                    if target is None:
+                        continue
+                    changedTargets.add(target)
+                    if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO): # Watch new subdirectories too
+                        addInotifyWatches(libc, fd, path, watches)
+                lastEventTime = time.monotonic()
+
+            if revalidationRequested.is_set():
+                revalidationRequested.clear()
+                changedTargets.update(listeners)
+            if changedTargets and time.monotonic() - lastEventTime >= settleTime:
+                targets, changedTargets = changedTargets, set()
+                handleChanges(targets)
+    finally:
+        os.close(fd)
+
+def scanTarget(target: str):
+    """
+    Returns a snapshot of a watched file or directory, which changes whenever something in it changes.
+    """
+    path = os.path.join(baseDir, target)
+    if target in watchedFiles:
+        return yamlServices.getFileSignature(path)
+    snapshot = []
+    for dirPath, dirNames, fileNames in os.walk(path):
+        for fileName in fileNames:
+            filePath = os.path.join(dirPath, fileName)
+            snapshot.append((filePath, yamlServices.getFileSignature(filePath)))
+    snapshot.sort()
+    return tuple(snapshot)
+
+def takeSnapshots():
+    """
+    Returns the snapshots of all targets, see scanTarget().
+    """
+    return {target: scanTarget(target) for target in listeners}
+
+def watchWithPolling(snapshots: dict):
+    """
+    Watches all targets by scanning them every pollInterval seconds and comparing them with the snapshots. Never returns.
+    """
+    while True:
+        if revalidationRequested.wait(pollInterval):
+            revalidationRequested.clear()
+            changedTargets = set(listeners)
+        else:
+            changedTargets = set()
+        for target in listeners:
+            snapshot = scanTarget(target)
+            if snapshot != snapshots[target]:
+                snapshots[target] = snapshot
+                changedTargets.add(target)
+        if changedTargets:
+            handleChanges(changedTargets)
+
+def prepareWatcher():
+    """
+    Starts recording changes: adds the inotify watches or, if inotify is not available, takes the snapshots to poll against.
+    Changes made after it returns are picked up by runWatcher(), even if they are made before the thread runs.
+
+    returns:
+        tuple: (libc, inotify (fd, watches) or None, snapshots or None), the arguments of runWatcher().
+    """
+    libc = loadInotify()
+    if libc is not None:
+        try:
+            return libc, openInotify(libc), None
+        except Exception as exc:
+            print(Fore.YELLOW + f"File watcher could not use inotify ({exc}). Falling back to polling.")
+    return libc, None, takeSnapshots()
+
+def runWatcher(libc, inotify, snapshots):
+    """
+    Entry point of the watcher thread, with the state of prepareWatcher(). Uses inotify if possible and falls back to polling.
+    """
+    if inotify is not None:
+        try:
+            watchWithInotify(libc, *inotify)
+        except Exception as exc:
+            print(Fore.YELLOW + f"File watcher could not use inotify ({exc}). Falling back to polling.")
+        snapshots = takeSnapshots()
+        requestRevalidation() # Changes since inotify stopped are not in the snapshots
+    watchWithPolling(snapshots)
+
+def startWatcher():
+    """
+    Validates the watched YAML files once and starts the background watcher thread.
+    From then on requests only read the precomputed state instead of checking the files themselves.
+    Changes are recorded before the files are validated, so none made during the startup get missed.
+
+    args:
+        None
+
+    returns:
+        None
+    """
+    global watcherThread
+    if isWatcherRunning():
+        return
+
+    watcherState = prepareWatcher()
+    for fileName in ("settings.yaml", "entries.yaml"): # settings.yaml decides where the entries are stored
+        revalidateYaml(fileName)
+    watcherThread = threading.Thread(target=runWatcher, args=watcherState, name="SiteBookFileWatcher", daemon=True)
+    watcherThread.start()
+    yamlServices.setCacheWatched(True)
+
+addListener("entries.yaml", lambda: revalidateYaml("entries.yaml"))
+addListener("settings.yaml", lambda: revalidateYaml("settings.yaml"))
+addListener("images", services.refreshPictureIndex)
+addListener("themes", themeRegistry.scanThemes)
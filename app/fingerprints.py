@@ -0,0 +1,61 @@
+import hashlib
+import os
+import threading
+
+fingerprintLength = 12 # Hex characters of the content hash used in URLs
+
+fingerprintCache = {} # filePath: (signature, fingerprint), only hashed again once the file changed
+fingerprintLock = threading.Lock()
+
+def getFileSignature(filePath: str):
+    """
+    Returns (mtime_ns, size, inode) of a file, which changes whenever the file gets written or replaced.
+    """
+    stat = os.stat(filePath)
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+def hashFile(filePath: str):
+    """
+    Hashes the content of a file in chunks, so large pictures do not get loaded into memory at once.
+    """
+    fileHash = hashlib.sha256()
+    with open(filePath, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            fileHash.update(chunk)
+    return fileHash.hexdigest()[:fingerprintLength]
+
+def getFingerprint(filePath: str):
+    """
+    Returns the content hash of a file, used to create URLs which change whenever the file changes.
+    Hashes are cached and only computed again once the signature of the file changed.
+
+    args:
+        filePath (str): The absolute path of the file.
+
+    returns:
+        str: The fingerprint or None if the file can't be read.
+    """
+    filePath = os.path.normpath(filePath) # The same file may be reached through "..", e.g. by Flask's static folder
+    try:
+        signature = getFileSignature(filePath)
+    except OSError:
+        return None
+
+    cached = fingerprintCache.get(filePath)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    try:
+        fingerprint = hashFile(filePath)
+    except OSError:
+        return None
+    with fingerprintLock:
+        fingerprintCache[filePath] = (signature, fingerprint)
+    return fingerprint
+
+def addFingerprint(url: str, fingerprint: str):
+    """
+    Adds a fingerprint to a URL as ?v=<fingerprint>, so it can be cached forever.
+    """
+    if not fingerprint:
+        return url
+    return f"{url}?v={fingerprint}"
@@ -0,0 +1,290 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from colorama import Fore
+from . import metrics
+from .atomicFiles import writeFileAtomic
+
+baseDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # Base directory of the app
+cacheDir = os.path.join(baseDir, "cache", "imageProxy")
+
+defaultCacheSizeMB = 200
+fetchTimeout = 10 # Seconds until a remote host is given up on
+maxImageBytes = 10 * 1024 * 1024 # Larger pictures are not cached
+revalidateAfter = 24 * 60 * 60 # Seconds until a cached picture gets checked again with a conditional request
+negativeCacheTime = 10 * 60 # Seconds until a failed picture gets fetched again
+touchInterval = 60 * 60 # Seconds until the last use of a picture is stored on disk again, it only keeps the order after a restart
+userAgent = "SiteBook image proxy"
+
+# Replaced as a whole by configureProxy()
+proxySettings = {"enabled": True, "cacheSizeBytes": defaultCacheSizeMB * 1024 * 1024}
+
+cacheIndex = OrderedDict() # key: metadata of the cached picture, ordered from least to most recently used
+cacheState = {"loaded": False, "bytes": 0}
+touchedAt = {} # key: when the last use of the cached picture was stored on disk (mtime of its metadata)
+cacheLock = threading.Lock()
+inFlight = {} # key: Future of the running fetch, so every picture is only fetched once at a time
+workerPool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="SiteBookImageProxy")
+
+def configureProxy(imageSettings):
+    """
+    Applies the images settings of settings.yaml.
+
+    args:
+        imageSettings (ImageSettings): settings.images, may be None.
+
+    returns:
+        bool: True if proxying got enabled or disabled, so the picture index has to be built again.
+    """
+    global proxySettings
+    enabled = True
+    cacheSizeMB = defaultCacheSizeMB
+    if imageSettings is not None:
+        if imageSettings.proxyRemote is not None:
+            enabled = imageSettings.proxyRemote
+        if imageSettings.cacheSizeMB is not None:
+            cacheSizeMB = max(imageSettings.cacheSizeMB, 0)
+
+    changed = enabled != proxySettings["enabled"]
+    shrunk = cacheSizeMB * 1024 * 1024 < proxySettings["cacheSizeBytes"]
+    proxySettings = {"enabled": enabled, "cacheSizeBytes": cacheSizeMB * 1024 * 1024}
+    if shrunk:
+        with cacheLock:
+            loadCacheIndex()
+            evictPictures()
+    return changed
+
+def isEnabled():
+    """
+    Checks if remote pictures get served from the local cache.
+    """
+    return proxySettings["enabled"]
+
+def canProxy(url: str):
+    """
+    Checks if a picture source is a remote http(s) URL.
+    """
+    return url.lower().startswith(("http://", "https://"))
+
+def getProxyKey(url: str):
+    """
+    Returns the key of a remote picture, used in the proxy URL and as file name in the cache.
+    """
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+
+def getProxyPath(url: str):
+    """
+    Returns the image source which serves a remote picture through the proxy.
+    """
+    return f"imageProxy/{getProxyKey(url)}"
+
+def getBodyPath(key: str):
+    return os.path.join(cacheDir, f"{key}.img")
+
+def getMetaPath(key: str):
+    return os.path.join(cacheDir, f"{key}.json")
+
+def loadCacheIndex():
+    """
+    Loads the metadata of all cached pictures, least recently used first. Needs cacheLock.
+    """
+    if cacheState["loaded"]:
+        return
+    cacheState["loaded"] = True
+    try:
+        fileNames = os.listdir(cacheDir)
+    except OSError:
+        return
+
+    loaded = []
+    for fileName in fileNames:
+        if not fileName.endswith(".json"):
+            continue
+        metaPath = os.path.join(cacheDir, fileName)
+        try:
+            with open(metaPath, "r", encoding="utf-8") as file:
+                meta = json.load(file)
+            loaded.append((os.stat(metaPath).st_mtime, fileName[:-len(".json")], meta))
+        except (OSError, ValueError):
+            continue
+    for lastUsed, key, meta in sorted(loaded, key=lambda item: item[0]):
+        cacheIndex[key] = meta
+        touchedAt[key] = lastUsed
+        cacheState["bytes"] += meta.get("size", 0)
+
+def removeCachedFiles(key: str):
+    for filePath in (getBodyPath(key), getMetaPath(key)):
+        try:
+            os.remove(filePath)
+        except OSError:
+            pass
+
+def storeMeta(key: str, meta: dict):
+    """
+    Stores the metadata of a picture and drops the least recently used pictures while the cache is too large.
+    """
+    os.makedirs(cacheDir, exist_ok=True)
+    writeFileAtomic(getMetaPath(key), json.dumps(meta))
+    with cacheLock:
+        loadCacheIndex()
+        previous = cacheIndex.pop(key, None)
+        if previous is not None:
+            cacheState["bytes"] -= previous.get("size", 0)
+        cacheIndex[key] = meta
+        cacheState["bytes"] += meta.get("size", 0)
+        touchedAt[key] = time.time()
+        evictPictures(keep=1)
+
+def evictPictures(keep: int = 0):
+    """
+    Drops the least recently used pictures while the cache is larger than allowed. Needs cacheLock.
+
+    args:
+        keep (int): The amount of most recently used pictures which are never dropped, e.g. the one just fetched.
+    """
+    while cacheState["bytes"] > proxySettings["cacheSizeBytes"] and len(cacheIndex) > keep:
+        evictedKey, evicted = cacheIndex.popitem(last=False)
+        cacheState["bytes"] -= evicted.get("size", 0)
+        touchedAt.pop(evictedKey, None)
+        removeCachedFiles(evictedKey)
+
+def lookupMeta(key: str):
+    """
+    Returns the metadata of a cached picture and marks it as recently used.
+    The order is kept in memory, on disk the last use is only stored every touchInterval seconds.
+    """
+    now = time.time()
+    with cacheLock:
+        loadCacheIndex()
+        meta = cacheIndex.get(key)
+        if meta is None:
+            return None
+        cacheIndex.move_to_end(key)
+        if now - touchedAt.get(key, 0) < touchInterval:
+            return meta
+        touchedAt[key] = now
+    try:
+        os.utime(getMetaPath(key)) # Keeps the order after a restart
+    except OSError:
+        pass
+    return meta
+
+def fetchImage(key: str, url: str):
+    """
+    Fetches a remote picture into the cache. Cached pictures are only downloaded again if they changed.
+    Failed fetches are remembered, so the remote host is not asked again for negativeCacheTime seconds.
+
+    args:
+        key (str): The key of the picture, see getProxyKey().
+        url (str): The remote URL of the picture.
+
+    returns:
+        dict: The new metadata of the picture.
+    """
+    meta = lookupMeta(key)
+    hasBody = bool(meta and meta.get("size"))
+    headers = {"User-Agent": userAgent}
+    if hasBody: # Conditional request, the host answers 304 if the picture did not change
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("lastModified"):
+            headers["If-Modified-Since"] = meta["lastModified"]
+
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=fetchTimeout) as response:
+            contentType = response.headers.get_content_type()
+            if not contentType.startswith("image/"):
+                raise ValueError(f"Not a picture but {contentType}")
+            body = response.read(maxImageBytes + 1)
+            if len(body) > maxImageBytes:
+                raise ValueError(f"Picture is larger than {maxImageBytes // (1024 * 1024)} MB")
+            os.makedirs(cacheDir, exist_ok=True)
+            writeFileAtomic(getBodyPath(key), body)
+            newMeta = {
+                "url": url,
+                "contentType": contentType,
+                "etag": response.headers.get("ETag"),
+                "lastModified": response.headers.get("Last-Modified"),
+                "size": len(body),
+                "fetchedAt": time.time(),
+                "failedAt": None
+            }
+    except urllib.error.HTTPError as exc:
+        if exc.code == 304 and hasBody:
+            newMeta = dict(meta, fetchedAt=time.time(), failedAt=None)
+        else:
+            newMeta = getFailedMeta(url, meta, f"HTTP {exc.code}")
+    except (urllib.error.URLError, OSError, ValueError) as exc:
+        newMeta = getFailedMeta(url, meta, str(exc))
+
+    storeMeta(key, newMeta)
+    return newMeta
+
+def getFailedMeta(url: str, meta: dict, reason: str):
+    """
+    Returns the metadata after a failed fetch. An already cached picture is kept and served until it can be fetched again.
+    """
+    print(Fore.YELLOW + f"Could not fetch picture {url}: {reason}")
+    if meta and meta.get("size"):
+        return dict(meta, failedAt=time.time())
+    return {"url": url, "size": 0, "fetchedAt": None, "failedAt": time.time()}
+
+def requestFetch(key: str, url: str):
+    """
+    Starts fetching a picture on the worker pool, unless it is already being fetched.
+
+    returns:
+        Future: Resolves to the new metadata of the picture.
+    """
+    with cacheLock:
+        future = inFlight.get(key)
+        if future is None:
+            future = workerPool.submit(fetchImage, key, url)
+            inFlight[key] = future
+            future.add_done_callback(lambda done: finishFetch(key, done))
+        return future
+
+def finishFetch(key: str, future):
+    with cacheLock:
+        if inFlight.get(key) is future:
+            del inFlight[key]
+
+def getImage(url: str):
+    """
+    Gets a remote picture from the cache, fetching it first if it is not cached yet.
+    Outdated pictures are served as they are and checked again in the background.
+
+    args:
+        url (str): The remote URL of the picture.
+
+    returns:
+        tuple: (path, contentType) of the cached picture, or (None, None) if it could not be fetched.
+    """
+    key = getProxyKey(url)
+    meta = lookupMeta(key)
+    now = time.time()
+    recentlyFailed = bool(meta and meta.get("failedAt") and now - meta["failedAt"] < negativeCacheTime)
+    metrics.recordCacheLookup("imageProxy", hit=bool(meta and meta.get("size")))
+    if meta and meta.get("size"):
+        if not recentlyFailed and now - (meta.get("fetchedAt") or 0) > revalidateAfter:
+            requestFetch(key, url)
+        return getBodyPath(key), meta["contentType"]
+    if recentlyFailed:
+        return None, None
+
+    try:
+        meta = requestFetch(key, url).result(timeout=fetchTimeout + 1)
+    except FutureTimeoutError:
+        return None, None
+    except Exception as exc:
+        print(Fore.RED + f"Could not fetch picture {url}: {exc}")
+        return None, None
+    if meta.get("size"):
+        return getBodyPath(key), meta["contentType"]
+    return None, None
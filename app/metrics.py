@@ -0,0 +1,194 @@
+import bisect
+import threading
+
+# Upper bounds of the histogram buckets in seconds, like the Prometheus client defaults
+defaultBuckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Help text and type of every metric, also defines the order of the /metrics output
+metricDefinitions = {
+    "sitebook_http_requests_total": ("counter", "HTTP requests by route, method and status."),
+    "sitebook_http_request_duration_seconds": ("histogram", "Duration of HTTP requests by route."),
+    "sitebook_yaml_parse_total": ("counter", "YAML parses by file."),
+    "sitebook_yaml_parse_duration_seconds": ("histogram", "Duration of YAML parsing by file."),
+    "sitebook_yaml_validation_total": ("counter", "Validations by file and result."),
+    "sitebook_yaml_validation_duration_seconds": ("histogram", "Duration of the pydantic validation by file."),
+    "sitebook_cache_requests_total": ("counter", "Cache lookups by cache and result (hit or miss)."),
+    "sitebook_cache_hit_ratio": ("gauge", "Share of cache lookups which were hits, by cache."),
+    "sitebook_entries": ("gauge", "Number of entries currently loaded."),
+    "sitebook_errors": ("gauge", "Current errors by category."),
+    "sitebook_waitress_queue_depth": ("gauge", "Requests waiting for a free waitress thread."),
+    "sitebook_waitress_threads": ("gauge", "Waitress threads by state (total or active).")
+}
+
+class MetricShard:
+    """
+    Holds the metrics recorded by one thread. Every thread only writes to its own shard, so recording needs no lock.
+    The shards are summed up when /metrics is requested.
+
+    Attributes:
+        counters (dict): (name, labels): value
+        histograms (dict): (name, labels): [bucket counts..., sum, count]
+    """
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+shards = [] # All shards ever created, shards of finished threads are kept since their counts stay valid
+shardsLock = threading.Lock() # Only held while creating a shard or collecting all of them
+threadShard = threading.local()
+collectors = [] # Functions returning samples of gauges, computed when /metrics is requested
+waitressState = {"dispatcher": None}
+
+def getShard():
+    shard = getattr(threadShard, "shard", None)
+    if shard is None:
+        shard = MetricShard()
+        threadShard.shard = shard
+        with shardsLock:
+            shards.append(shard)
+    return shard
+
+def increment(name: str, labels: tuple = (), amount: float = 1):
+    """
+    Increments a counter.
+
+    args:
+        name (str): The name of the metric, see metricDefinitions.
+        labels (tuple): (label, value) pairs, e.g. (("file", "entries.yaml"),)
+        amount (float): How much to increment by.
+
+    returns:
+        None
+    """
+    counters = getShard().counters
+    key = (name, labels)
+    counters[key] = counters.get(key, 0) + amount
+
+def observe(name: str, value: float, labels: tuple = ()):
+    """
+    Records a value, usually a duration in seconds, in a histogram.
+
+    args:
+        name (str): The name of the metric, see metricDefinitions.
+        value (float): The observed value.
+        labels (tuple): (label, value) pairs.
+
+    returns:
+        None
+    """
+    histograms = getShard().histograms
+    key = (name, labels)
+    histogram = histograms.get(key)
+    if histogram is None:
+        histogram = [0] * (len(defaultBuckets) + 3) # One count per bucket, +Inf, sum and count
+        histograms[key] = histogram
+    histogram[bisect.bisect_left(defaultBuckets, value)] += 1
+    histogram[-2] += value
+    histogram[-1] += 1
+
+def recordCacheLookup(cacheName: str, hit: bool):
+    """
+    Counts a cache lookup as hit or miss.
+    """
+    increment("sitebook_cache_requests_total", (("cache", cacheName), ("result", "hit" if hit else "miss")))
+
+def addCollector(collector):
+    """
+    Registers a function which returns gauge samples as a list of (name, labels, value) when /metrics is requested.
+    """
+    collectors.append(collector)
+
+def setWaitressDispatcher(dispatcher):
+    """
+    Sets the task dispatcher of the waitress server, so its queue depth can be reported.
+
+    args:
+        dispatcher: server.task_dispatcher of the server created with waitress.create_server().
+
+    returns:
+        None
+    """
+    waitressState["dispatcher"] = dispatcher
+
+def collectWaitress():
+    dispatcher = waitressState["dispatcher"]
+    if dispatcher is None:
+        return []
+    return [
+        ("sitebook_waitress_queue_depth", (), len(dispatcher.queue)),
+        ("sitebook_waitress_threads", (("state", "total"),), len(dispatcher.threads)),
+        ("sitebook_waitress_threads", (("state", "active"),), dispatcher.active_count)
+    ]
+
+def collectHitRatios(counters: dict):
+    totals = {}
+    for (name, labels), value in counters.items():
+        if name != "sitebook_cache_requests_total":
+            continue
+        labelDict = dict(labels)
+        hits, lookups = totals.get(labelDict["cache"], (0, 0))
+        totals[labelDict["cache"]] = (hits + (value if labelDict["result"] == "hit" else 0), lookups + value)
+    return [("sitebook_cache_hit_ratio", (("cache", cacheName),), hits / lookups) for cacheName, (hits, lookups) in totals.items() if lookups]
+
+def formatLabels(labels: tuple):
+    if not labels:
+        return ""
+    escaped = []
+    for label, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{label}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+def formatValue(value: float):
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+def renderMetrics():
+    """
+    Sums up all shards and renders them together with the collected gauges in the Prometheus text format.
+
+    args:
+        None
+
+    returns:
+        str: The content for /metrics.
+    """
+    counters = {}
+    histograms = {}
+    with shardsLock:
+        currentShards = list(shards)
+    for shard in currentShards:
+        for key, value in dict(shard.counters).items(): # Copying a dict is atomic, so the owning thread can keep writing
+            counters[key] = counters.get(key, 0) + value
+        for key, histogram in dict(shard.histograms).items():
+            summed = histograms.setdefault(key, [0] * len(histogram))
+            for position, value in enumerate(list(histogram)):
+                summed[position] += value
+
+    samples = {}
+    for (name, labels), value in counters.items():
+        samples.setdefault(name, []).append((labels, value))
+    for collector in [collectWaitress, lambda: collectHitRatios(counters)] + collectors:
+        for name, labels, value in collector():
+            samples.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name, (metricType, helpText) in metricDefinitions.items():
+        lines.append(f"# HELP {name} {helpText}")
+        lines.append(f"# TYPE {name} {metricType}")
+        if metricType == "histogram":
+            for (histogramName, labels), histogram in sorted(histograms.items()):
+                if histogramName != name:
+                    continue
+                cumulative = 0
+                for position, bound in enumerate(defaultBuckets + (float("inf"),)):
+                    cumulative += histogram[position]
+                    bucketLabel = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{formatLabels(labels + (('le', bucketLabel),))} {cumulative}")
+                lines.append(f"{name}_sum{formatLabels(labels)} {formatValue(histogram[-2])}")
+                lines.append(f"{name}_count{formatLabels(labels)} {histogram[-1]}")
+        else:
+            for labels, value in sorted(samples.get(name, []), key=lambda sample: sample[0]):
+                lines.append(f"{name}{formatLabels(labels)} {formatValue(value)}")
+    return "\n".join(lines) + "\n"
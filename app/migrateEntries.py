@@ -0,0 +1,79 @@
+"""
+Moves the entries between entries.yaml and the SQLite database and switches storage.backend in settings.yaml.
+Run it while SiteBook is stopped:
+    python -m app.migrateEntries sqlite    # entries.yaml -> database, entries.yaml is kept as a backup
+    python -m app.migrateEntries yaml      # database -> entries.yaml
+"""
+import argparse
+import sqlite3
+import sys
+import yaml
+from pydantic import ValidationError
+from colorama import Fore, init
+from . import entryStore
+from . import errorHandling
+from . import yamlServices
+from .settingHandling import getSettings, setAndWriteSetting
+from .atomicFiles import writeFileAtomic
+from .yamlCodec import dumpYaml
+
+def migrateToSqlite():
+    """
+    Imports entries.yaml into the database and switches the backend to sqlite.
+
+    returns:
+        int: The amount of migrated entries.
+    """
+    with open(yamlServices.getYamlFilePath("entries.yaml"), "r", encoding="utf-8") as file:
+        entries = yamlServices.parseEntriesYaml(file.read())
+    entryStore.replaceEntries(entries)
+    setAndWriteSetting(settingsName="storage.backend", value="sqlite")
+    return len(entries)
+
+def migrateToYaml():
+    """
+    Exports the database into entries.yaml and switches the backend to yaml. The database is kept.
+
+    returns:
+        int: The amount of migrated entries.
+    """
+    entries = entryStore.loadEntries()[1]
+    rawYaml = dumpYaml(entries.toDicts(), sortKeys=False) if entries else ""
+    writeFileAtomic(yamlServices.getYamlFilePath("entries.yaml"), rawYaml)
+    setAndWriteSetting(settingsName="storage.backend", value="yaml")
+    return len(entries)
+
+if __name__ == "__main__": # python -m app.migrateEntries
+    init(autoreset=True) #colorama init
+    parser = argparse.ArgumentParser(description="Moves the entries of SiteBook between entries.yaml and the SQLite database.")
+    parser.add_argument("backend", choices=["sqlite", "yaml"], help="The backend to move the entries to.")
+    arguments = parser.parse_args()
+
+    getSettings() # Validating settings.yaml applies storage.backend and storage.databasePath
+    if errorHandling.errorExists(origin="settings.yaml"):
+        print(Fore.RED + f"settings.yaml is invalid: {errorHandling.getErrorsPrintable()}")
+        sys.exit(1)
+    databasePath = entryStore.storeSettings["databasePath"]
+    currentBackend = "sqlite" if entryStore.isEnabled() else "yaml"
+    if currentBackend == arguments.backend:
+        print(Fore.YELLOW + f"The entries are already stored in {arguments.backend}, nothing to do.")
+        sys.exit(0)
+
+    try:
+        if arguments.backend == "sqlite":
+            count = migrateToSqlite()
+            print(Fore.GREEN + f"Moved {count} entries from entries.yaml to {databasePath}.")
+            print(Fore.YELLOW + "entries.yaml was kept as a backup, it is no longer read. Edit the entries in the editor of SiteBook.")
+        else:
+            count = migrateToYaml()
+            print(Fore.GREEN + f"Moved {count} entries from {databasePath} to entries.yaml.")
+    except (yaml.YAMLError, ValidationError) as exc:
+        print(Fore.RED + f"entries.yaml is invalid, nothing was migrated: {exc}")
+        sys.exit(1)
+    except (sqlite3.Error, OSError) as exc:
+        print(Fore.RED + f"Migration failed: {exc}")
+        sys.exit(1)
+
+    if errorHandling.errorExists(origin="settings.yaml"):
+        print(Fore.RED + f"Could not set storage.backend in settings.yaml, please set it to {arguments.backend} yourself: {errorHandling.getErrorsPrintable()}")
+        sys.exit(1)
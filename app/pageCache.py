@@ -0,0 +1,84 @@
+from collections import OrderedDict
+import hashlib
+import threading
+from . import metrics
+
+maxCachedPages = 16 # Older pages get dropped once more pages are cached
+
+cachedPages = OrderedDict() # cacheKey: CachedPage, ordered from least to most recently used
+cacheLock = threading.Lock()
+
+class CachedPage:
+    """
+    Represents a rendered page with the strong ETag of its content.
+
+    Attributes:
+        body (bytes): The rendered page, encoded as UTF-8.
+        etag (str): The hash of the body, used as ETag.
+        encodedBodies (dict): encoding: the compressed body, filled by compression.getCompressedBody().
+    """
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.encodedBodies = {}
+
+def makeCacheKey(*inputs):
+    """
+    Creates a cache key from everything a page is rendered from.
+
+    args:
+        *inputs: Hashable values which change whenever the rendered page would change, e.g. file signatures.
+
+    returns:
+        str: The cache key.
+    """
+    return hashlib.sha256(repr(inputs).encode("utf-8")).hexdigest()
+
+def getCachedPage(cacheKey: str):
+    """
+    Gets a cached page.
+
+    args:
+        cacheKey (str): The key created by makeCacheKey().
+
+    returns:
+        CachedPage: The cached page or None if it isn't cached.
+    """
+    with cacheLock:
+        page = cachedPages.get(cacheKey)
+        if page is not None:
+            cachedPages.move_to_end(cacheKey)
+    metrics.recordCacheLookup("page", hit=page is not None)
+    return page
+
+def storePage(cacheKey: str, html: str):
+    """
+    Caches a rendered page.
+
+    args:
+        cacheKey (str): The key created by makeCacheKey().
+        html (str): The rendered page.
+
+    returns:
+        CachedPage: The cached page.
+    """
+    page = CachedPage(html.encode("utf-8"))
+    with cacheLock:
+        cachedPages[cacheKey] = page
+        cachedPages.move_to_end(cacheKey)
+        while len(cachedPages) > maxCachedPages:
+            cachedPages.popitem(last=False)
+    return page
+
+def clearPageCache():
+    """
+    Drops all cached pages.
+
+    args:
+        None
+
+    returns:
+        None
+    """
+    with cacheLock:
+        cachedPages.clear()
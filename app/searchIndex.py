@@ -0,0 +1,379 @@
+from concurrent.futures import ThreadPoolExecutor
+import bisect
+import heapq
+import re
+import threading
+from colorama import Fore
+
+fieldWeights = {"name": 3.0, "url": 1.0, "description": 1.5} # How much a match in each field counts
+minSimilarity = 0.4 # Minimum trigram similarity for a fuzzy match
+maxFuzzyCandidates = 64 # Most similar tokens considered per query token
+maxPrefixMatches = 256 # Most tokens considered per query token when matching prefixes
+maxSubstringMatches = 256 # Most tokens considered per query token when matching substrings
+maxTrigramTokens = 5000 # Trigrams contained in more tokens are ignored for fuzzy matches
+namePrefixBonus = 2.0 # Added to entries whose name starts with the query
+matchedTokenRank = 1000.0 # Per matched query token, larger than any score, so entries matching more query tokens rank first
+tokenPattern = re.compile(r"[^\W_]+", re.UNICODE)
+
+class SearchIndex:
+    """
+    In-memory search index over the names, URLs and descriptions of the entries.
+    Exact matches are looked up in a token index. Typos are matched with a trigram index over the known tokens,
+    prefixes (while typing) with the sorted list of known tokens.
+    An index is never modified while it is searched: updates are made on a copy (see copy()), which replaces it once it is done.
+
+    Attributes:
+        entries (dict): The entries the index was last updated with.
+        entryTokens (dict): entry name: (fingerprint, {token: weight}) of every indexed entry.
+        tokenIndex (dict): token: {weight: set of the names of the entries containing it with that weight}
+        tokenCounts (dict): token: number of entries containing it.
+        sortedTokens (list): All known tokens, sorted for prefix lookups.
+        sortedNames (list): (lowercase name, name) of all entries, sorted for prefix lookups.
+        trigramIndex (dict): trigram: set of tokens containing it.
+        ownedPostings (set): Tokens whose postings (in tokenIndex) belong to this index and not to the one it was copied from.
+        ownedTrigrams (set): The same for the token sets of trigramIndex.
+    """
+    def __init__(self):
+        self.entries = None
+        self.entryTokens = {}
+        self.tokenIndex = {}
+        self.tokenCounts = {}
+        self.sortedTokens = []
+        self.sortedNames = []
+        self.trigramIndex = {}
+        self.ownedPostings = set()
+        self.ownedTrigrams = set()
+
+    def copy(self):
+        """
+        Returns a copy which can be updated while this index is still searched.
+        Only the outer containers are copied, the postings and trigram sets are copied once they get modified.
+        """
+        index = SearchIndex()
+        index.entries = self.entries
+        index.entryTokens = dict(self.entryTokens)
+        index.tokenIndex = dict(self.tokenIndex)
+        index.tokenCounts = dict(self.tokenCounts)
+        index.sortedTokens = list(self.sortedTokens)
+        index.sortedNames = list(self.sortedNames)
+        index.trigramIndex = dict(self.trigramIndex)
+        return index
+
+    def update(self, entries: dict):
+        """
+        Updates the index to the given entries. Only entries which were added, changed or removed are (re)indexed.
+        Must not be called on an index which is searched, see updateSearchIndex().
+
+        args:
+            entries (dict): The validated entries.
+
+        returns:
+            None
+        """
+        if entries is self.entries:
+            return
+        for name in list(self.entryTokens):
+            if name not in entries:
+                self.removeEntry(name)
+        for name, entry in entries.items():
+            fingerprint = (entry.get("url"), entry.get("description"))
+            indexed = self.entryTokens.get(name)
+            if indexed is not None and indexed[0] == fingerprint:
+                continue
+            if indexed is not None:
+                self.removeEntry(name)
+            self.addEntry(name, entry, fingerprint)
+        self.entries = entries
+
+    def getOwnPostings(self, token: str):
+        postings = self.tokenIndex.get(token)
+        if token not in self.ownedPostings:
+            postings = {weight: set(names) for weight, names in postings.items()} if postings else {}
+            self.tokenIndex[token] = postings
+            self.ownedPostings.add(token)
+        return postings
+
+    def getOwnTrigramTokens(self, trigram: str):
+        trigramTokens = self.trigramIndex.get(trigram)
+        if trigram not in self.ownedTrigrams:
+            trigramTokens = set(trigramTokens) if trigramTokens else set()
+            self.trigramIndex[trigram] = trigramTokens
+            self.ownedTrigrams.add(trigram)
+        return trigramTokens
+
+    def addEntry(self, name: str, entry: dict, fingerprint):
+        tokens = {}
+        for fieldName, weight in fieldWeights.items():
+            value = name if fieldName == "name" else entry.get(fieldName)
+            for token in tokenize(value):
+                tokens[token] = max(tokens.get(token, 0.0), weight)
+
+        self.entryTokens[name] = (fingerprint, tokens)
+        bisect.insort(self.sortedNames, (name.lower(), name))
+        for token, weight in tokens.items():
+            self.getOwnPostings(token).setdefault(weight, set()).add(name)
+            count = self.tokenCounts.get(token, 0)
+            self.tokenCounts[token] = count + 1
+            if count == 0: # New token
+                bisect.insort(self.sortedTokens, token)
+                for trigram in getTrigrams(token):
+                    self.getOwnTrigramTokens(trigram).add(token)
+
+    def removeEntry(self, name: str):
+        fingerprint, tokens = self.entryTokens.pop(name)
+        del self.sortedNames[bisect.bisect_left(self.sortedNames, (name.lower(), name))]
+        for token, weight in tokens.items():
+            postings = self.getOwnPostings(token)
+            names = postings[weight]
+            names.discard(name)
+            if not names:
+                del postings[weight]
+            if not postings:
+                del self.tokenIndex[token]
+                self.ownedPostings.discard(token)
+            self.tokenCounts[token] -= 1
+            if self.tokenCounts[token] == 0: # Token does not exist anymore
+                del self.tokenCounts[token]
+                del self.sortedTokens[bisect.bisect_left(self.sortedTokens, token)]
+                for trigram in getTrigrams(token):
+                    trigramTokens = self.getOwnTrigramTokens(trigram)
+                    trigramTokens.discard(token)
+                    if not trigramTokens:
+                        del self.trigramIndex[trigram]
+                        self.ownedTrigrams.discard(trigram)
+
+    def matchToken(self, queryToken: str, matchPrefix: bool = True):
+        """
+        Finds all indexed tokens matching a query token.
+        Prefixes and substrings (e.g. "assist" in "homeassistant", found with the trigram index) are only matched
+        for the last query token, since that is the one still being typed.
+        Typos are only matched if the token does not exist as it is, and not for numbers.
+
+        returns:
+            dict: token: how well it matches (1 exact, 0.8 prefix, 0.7 substring, otherwise the trigram similarity scaled to 0.6)
+        """
+        matches = {}
+        if queryToken in self.tokenIndex:
+            matches[queryToken] = 1.0
+
+        if matchPrefix:
+            position = bisect.bisect_left(self.sortedTokens, queryToken)
+            lastPosition = min(position + maxPrefixMatches, len(self.sortedTokens))
+            while position < lastPosition and self.sortedTokens[position].startswith(queryToken):
+                token = self.sortedTokens[position]
+                if token not in matches:
+                    matches[token] = 0.8
+                position += 1
+
+        if matchPrefix and len(queryToken) >= 3:
+            for token in self.findSubstringTokens(queryToken):
+                if token not in matches:
+                    matches[token] = 0.7
+
+        if len(queryToken) >= 3 and queryToken not in self.tokenIndex and not queryToken.isdigit():
+            queryTrigrams = getTrigrams(queryToken)
+            sharedCounts = {}
+            for trigram in queryTrigrams:
+                trigramTokens = self.trigramIndex.get(trigram, ())
+                if len(trigramTokens) > maxTrigramTokens: # Too common to tell tokens apart, e.g. " 1"
+                    continue
+                for token in trigramTokens:
+                    sharedCounts[token] = sharedCounts.get(token, 0) + 1
+            candidates = sorted(sharedCounts.items(), key=lambda item: item[1], reverse=True)[:maxFuzzyCandidates]
+            for token, shared in candidates:
+                similarity = 2 * shared / (len(queryTrigrams) + len(getTrigrams(token))) # Dice coefficient
+                if similarity >= minSimilarity and token not in matches:
+                    matches[token] = 0.6 * similarity
+        return matches
+
+    def findSubstringTokens(self, queryToken: str):
+        """
+        Returns the tokens containing a query token of at least 3 characters, the shortest ones first.
+        Only tokens containing all trigrams inside of the query token can contain it, so the trigram sets are intersected
+        starting with the smallest one. Query tokens without a trigram rare enough to narrow them down are skipped.
+        """
+        trigramSets = sorted((self.trigramIndex.get(queryToken[i:i + 3], ()) for i in range(len(queryToken) - 2)), key=len)
+        if not trigramSets[0] or len(trigramSets[0]) > maxTrigramTokens:
+            return []
+        candidates = set(trigramSets[0])
+        for trigramTokens in trigramSets[1:]:
+            candidates.intersection_update(trigramTokens)
+        found = [token for token in candidates if queryToken in token]
+        found.sort(key=lambda token: (len(token), token))
+        return found[:maxSubstringMatches]
+
+    def search(self, query: str, limit: int = 20):
+        """
+        Searches the entries. Entries matching more query tokens rank first, then entries with better matches.
+        The query token with the fewest matching entries is looked up first, the others only score those candidates,
+        so common tokens (e.g. "http") do not make every search go through all entries.
+
+        args:
+            query (str): The search query, e.g. "home asistant".
+            limit (int): The maximum number of results.
+
+        returns:
+            list: (entry name, score) tuples, best match first.
+        """
+        queryTokens = list(dict.fromkeys(tokenize(query)))
+        if not queryTokens:
+            return []
+        tokenMatches = []
+        for position, queryToken in enumerate(queryTokens):
+            matches = self.matchToken(queryToken, matchPrefix=position == len(queryTokens) - 1)
+            matchCount = sum(self.tokenCounts[token] for token in matches)
+            tokenMatches.append((matchCount, queryToken, matches))
+        tokenMatches.sort(key=lambda item: item[0])
+
+        scores = {}
+        matchedTokens = {}
+        for matchCount, queryToken, matches in tokenMatches:
+            bestScores = {}
+            if len(scores) < limit: # Not enough candidates yet, so look up all entries matching this token
+                groups = [(quality * weight, names) for token, quality in matches.items() for weight, names in self.tokenIndex[token].items()]
+                groups.sort(key=lambda group: group[0], reverse=True)
+                for score, names in groups: # Strongest matches first, so every entry keeps its best score
+                    newNames = names.difference(bestScores)
+                    if newNames:
+                        bestScores.update(dict.fromkeys(newNames, score))
+            elif len(scores) * len(matches) <= matchCount: # Only score the candidates, looking them up is cheaper
+                for name in scores:
+                    for token, quality in matches.items():
+                        for weight, names in self.tokenIndex[token].items():
+                            if name in names and quality * weight > bestScores.get(name, 0.0):
+                                bestScores[name] = quality * weight
+            else: # Only score the candidates, going through the matching entries is cheaper
+                for token, quality in matches.items():
+                    for weight, names in self.tokenIndex[token].items():
+                        score = quality * weight
+                        for name in names:
+                            if name in scores and score > bestScores.get(name, 0.0):
+                                bestScores[name] = score
+            if not scores: # First query token, all of its matches are candidates
+                scores = bestScores
+                if len(tokenMatches) > 1:
+                    matchedTokens = dict.fromkeys(bestScores, 1)
+                continue
+            for name, score in bestScores.items():
+                scores[name] = scores.get(name, 0.0) + score
+                matchedTokens[name] = matchedTokens.get(name, 0) + 1
+        if not scores:
+            return []
+
+        loweredQuery = query.strip().lower()
+        position = bisect.bisect_left(self.sortedNames, (loweredQuery,))
+        while position < len(self.sortedNames) and self.sortedNames[position][0].startswith(loweredQuery):
+            name = self.sortedNames[position][1]
+            if name in scores: # Typing the start of a name should find it first
+                scores[name] += namePrefixBonus
+            position += 1
+        return rankScores(scores, matchedTokens, len(tokenMatches), limit)
+
+def rankScores(scores: dict, matchedTokens: dict, queryTokenCount: int, limit: int):
+    """
+    Returns the best scored entries: entries matching more query tokens first, then the ones with higher scores, then by name.
+    Only the entries reaching the score of the limit-th best one get sorted, the others are skipped in C.
+
+    args:
+        scores (dict): entry name: score
+        matchedTokens (dict): entry name: number of query tokens it matched.
+        queryTokenCount (int): The number of query tokens, with a single one every entry matched it.
+        limit (int): The maximum number of results.
+
+    returns:
+        list: (entry name, score) tuples, best match first.
+    """
+    if queryTokenCount > 1:
+        rankValues = {name: matchedTokens[name] * matchedTokenRank + score for name, score in scores.items()}
+    else:
+        rankValues = scores
+    threshold = heapq.nlargest(limit, rankValues.values())[-1]
+    ranked = sorted([name for name, value in rankValues.items() if value > threshold], key=lambda name: (-rankValues[name], name))
+    if len(ranked) < limit: # Entries with the same score are ordered by name
+        ranked += heapq.nsmallest(limit - len(ranked), [name for name, value in rankValues.items() if value == threshold])
+    return [(name, round(scores[name], 3)) for name in ranked]
+
+def tokenize(value):
+    """
+    Splits a value into lowercase alphanumeric tokens.
+    """
+    if not value:
+        return []
+    return tokenPattern.findall(str(value).lower())
+
+def getTrigrams(token: str):
+    """
+    Returns the trigrams of a token, padded so short tokens and word starts get trigrams too.
+    """
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+indexState = {"index": SearchIndex()} # Replaced as a whole by updateSearchIndex(), searches never wait for an update
+indexUpdateLock = threading.Lock() # Only serializes the updates
+workerPool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SiteBookSearchIndex")
+
+def updateSearchIndex(entries: dict):
+    """
+    Updates a copy of the search index to the given entries and replaces the index with it.
+    Searches keep using the old index until the new one is complete.
+
+    args:
+        entries (dict): The currently loaded entries.
+
+    returns:
+        SearchIndex: The index of the entries.
+    """
+    with indexUpdateLock:
+        index = indexState["index"]
+        if index.entries is entries: # Updated by another thread in the meantime
+            return index
+        index = index.copy()
+        index.update(entries)
+        indexState["index"] = index
+        return index
+
+def queueIndexUpdate(entries: dict):
+    """
+    Updates the search index to newly published entries in the background, so searches don't have to.
+    Only the newest entries queued get indexed.
+
+    args:
+        entries (dict): The published entries.
+
+    returns:
+        None
+    """
+    indexState["pending"] = entries
+    workerPool.submit(updatePendingIndex)
+
+def updatePendingIndex():
+    entries = indexState.pop("pending", None)
+    if entries is None: # Already indexed by an earlier run
+        return
+    try:
+        updateSearchIndex(entries)
+    except Exception as exc:
+        print(Fore.RED + f"Could not update the search index: {exc}")
+
+def searchEntries(entries: dict, query: str, limit: int = 20):
+    """
+    Searches the entries with the current search index, see queueIndexUpdate().
+    While the index of newer entries is still being built, the previous index is searched and entries
+    which do not exist anymore are left out. Only if there is no index at all yet, it is built right away.
+
+    args:
+        entries (dict): The currently loaded entries.
+        query (str): The search query.
+        limit (int): The maximum number of results.
+
+    returns:
+        list: (entry name, score) tuples, best match first.
+    """
+    index = indexState["index"]
+    if index.entries is entries:
+        return index.search(query, limit=limit)
+    if index.entries is None: # Waits for the first update if it is already running
+        return updateSearchIndex(entries).search(query, limit=limit)
+    if indexState.get("pending") is not entries:
+        queueIndexUpdate(entries) # Not queued when they were published, e.g. because the search was disabled
+    return [(name, score) for name, score in index.search(query, limit=limit) if name in entries]
@@ -1,6 +1,14 @@
 from typing import get_type_hints, get_origin, get_args, Union
 from .validationModels.entries import Entry
+from .entryCatalog import EntryRecord, toRow
+from . import entryStore
 from . import errorHandling
+from . import thumbnails
+from . import imageProxy
+from . import fingerprints
+from . import timing
+import base64
+import json
 import os
 
 def getInputTypeFromHint(hint):
@@ -87,9 +95,277 @@ def getEntryOptions():
     """
     return entryOptions
 
+baseDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+imagesDir = os.path.join(baseDir, "images")
+
+# Resolved picture sources of the currently loaded entries. Gets replaced as a whole, so readers never see a half built index
+pictureIndex = {
+    "version": 0, # Increases with every build
+    "entries": None, # The entries the index was built from
+    "imagesVersion": None, # mtime of the images directory when the index was built
+    "byName": {}, # entry name: picture sources (see getPictureSources()) or None
+    "byPicture": {}, # picture entry: picture sources or None
+    "byProxyKey": {} # key: remote URL of every picture served through the imageProxy
+}
+
+def getImagesVersion():
+    """
+    Returns the mtime of the images directory, which changes whenever a picture gets added, renamed or removed.
+    """
+    try:
+        return os.stat(imagesDir).st_mtime_ns
+    except OSError:
+        return None
+
+def listImageFiles():
+    """
+    Lists all files in the images directory.
+
+    args:
+        None
+
+    returns:
+        set: The paths of all images relative to the images directory, e.g. {"logo.png", "sub/logo.png"}
+    """
+    imageFiles = set()
+    for dirPath, dirNames, fileNames in os.walk(imagesDir):
+        relativeDir = os.path.relpath(dirPath, imagesDir)
+        for fileName in fileNames:
+            if relativeDir == ".":
+                imageFiles.add(fileName)
+            else:
+                imageFiles.add(os.path.join(relativeDir, fileName).replace(os.sep, "/"))
+    return imageFiles
+
+def resolvePicture(pictureEntry, imageFiles = None):
+    """
+    Resolves what is set in entry.picture to an image source.
+
+    args:
+        pictureEntry: What is set in entry.picture
+        imageFiles (set): The files in the images directory, see listImageFiles(). If None the filesystem is checked directly.
+
+    returns:
+        tuple: (source, error) where source can be directly used as image source and error is a (message, category) tuple or None
+    """
+    if not pictureEntry:
+        return None, ("No Picture Entry was provided when trying to get Link", "SERVICES.TYPE")
+    if "http" in pictureEntry.lower(): # Is a link to a picture
+        return pictureEntry, None
+    # Is not a link but a image name
+    sliced = pictureEntry.split(".")
+    if len(sliced) < 2:
+        return None, (f"Picture file name is wrongly formatted: {pictureEntry}", "CONFIG.SYNTAX")
+
+    editedPictureEntry = pictureEntry.replace(" ", "_") # Replace all spaces with underlines
+    if imageFiles is None:
+        exists = os.path.exists(os.path.join(imagesDir, editedPictureEntry))
+    else:
+        exists = editedPictureEntry in imageFiles
+    if not exists:
+        return None, (f"Picture: {pictureEntry} does not exist", "CONFIG.MISSING")
+    return f"images/{editedPictureEntry}", None
+
+def getPictureSources(source, imageFiles = None):
+    """
+    Looks up the thumbnails of a resolved picture, see thumbnails.py.
+    Remote pictures are served through the imageProxy while it is enabled, pictures without thumbnails keep their original source.
+
+    args:
+        source (str): The source returned by resolvePicture().
+        imageFiles (set): The files in the images directory, see listImageFiles(). If None the filesystem is checked directly.
+
+    returns:
+        dict: {"src": str, "srcset": str or None, "webpSrcset": str or None} or None if source is None.
+              src is the smallest thumbnail in the fallback format, the srcsets add the larger one for high density screens.
+    """
+    if source is None:
+        return None
+    if not source.startswith("images/"):
+        if imageProxy.isEnabled() and imageProxy.canProxy(source):
+            return {"src": imageProxy.getProxyPath(source), "srcset": None, "webpSrcset": None}
+        return {"src": source, "srcset": None, "webpSrcset": None}
+
+    def exists(fileName):
+        if imageFiles is None:
+            return os.path.exists(os.path.join(imagesDir, fileName))
+        return fileName in imageFiles
+
+    fileName = source[len("images/"):]
+    thumbnailNames = list(thumbnails.getThumbnailNames(fileName).values()) # Smallest height first
+    smallNames, largeNames = thumbnailNames[0], thumbnailNames[-1]
+    original = getImageUrl(fileName)
+    if not exists(smallNames["fallback"]): # Picture is too small for thumbnails or they were not created yet
+        return {"src": original, "srcset": None, "webpSrcset": None}
+    smallFallback = getImageUrl(smallNames["fallback"])
+    largeFallback = getImageUrl(largeNames["fallback"]) if exists(largeNames["fallback"]) else original # Otherwise the original is not larger
+    largeWebp = getImageUrl(largeNames["webp"]) if exists(largeNames["webp"]) else original
+    return {
+        "src": smallFallback,
+        "srcset": f"{smallFallback} 1x, {largeFallback} 2x",
+        "webpSrcset": f"{getImageUrl(smallNames['webp'])} 1x, {largeWebp} 2x" if exists(smallNames["webp"]) else None
+    }
+
+def getImageUrl(fileName: str):
+    """
+    Returns the URL of a file in the images directory with the hash of its content, e.g. "images/logo.png?v=3f2a9c01b7de".
+    The URL changes whenever the file changes, so browsers can cache it forever (see app.py's cacheImagesForever()).
+
+    args:
+        fileName (str): Path of the file relative to the images directory.
+
+    returns:
+        str: The fingerprinted URL, or the plain URL if the file can't be read.
+    """
+    return fingerprints.addFingerprint(f"images/{fileName}", fingerprints.getFingerprint(os.path.join(imagesDir, fileName)))
+
+@timing.timed("pictureIndex")
+def buildPictureIndex(entries):
+    """
+    Resolves the pictures of all entries at once, so rendering them does not need any filesystem calls.
+    Missing or wrongly formatted pictures are set as errors with the origin "images".
+
+    args:
+        entries (dict): The validated entries.
+
+    returns:
+        None
+    """
+    global pictureIndex
+    imagesVersion = getImagesVersion()
+    imageFiles = listImageFiles()
+    byName = {}
+    byPicture = {}
+    byProxyKey = {}
+    pictureErrors = []
+    for name, entry in entries.items():
+        pictureEntry = entry.get("picture")
+        if not pictureEntry:
+            continue
+        if pictureEntry not in byPicture:
+            source, error = resolvePicture(pictureEntry, imageFiles)
+            sources = getPictureSources(source, imageFiles)
+            byPicture[pictureEntry] = sources
+            if sources and sources["src"] != source and imageProxy.canProxy(source): # Served through the imageProxy
+                byProxyKey[imageProxy.getProxyKey(source)] = source
+            if error:
+                pictureErrors.append(error)
+        byName[name] = byPicture[pictureEntry]
+
+    pictureIndex = {"version": pictureIndex["version"] + 1, "entries": entries, "imagesVersion": imagesVersion, "byName": byName, "byPicture": byPicture, "byProxyKey": byProxyKey}
+    errorHandling.removeErrorByOrigin(origin="images")
+    for message, category in pictureErrors:
+        errorHandling.setError(message=message, origin="images", category=category)
+
+def addToPictureIndex(entryName: str, entry: dict, entries):
+    """
+    Adds the picture of a single new entry to the picture index, without resolving all other pictures again.
+
+    args:
+        entryName (str): The name of the new entry.
+        entry (dict): The validated data of the new entry.
+        entries (EntryCatalog): All entries including the new one.
+
+    returns:
+        None
+    """
+    global pictureIndex
+    pictureEntry = entry.get("picture")
+    if not pictureEntry:
+        return
+    source, error = resolvePicture(pictureEntry)
+    sources = getPictureSources(source)
+    byName = dict(pictureIndex["byName"])
+    byName[entryName] = sources
+    byPicture = dict(pictureIndex["byPicture"])
+    byPicture[pictureEntry] = sources
+    byProxyKey = pictureIndex["byProxyKey"]
+    if sources and sources["src"] != source and imageProxy.canProxy(source): # Served through the imageProxy
+        byProxyKey = dict(byProxyKey)
+        byProxyKey[imageProxy.getProxyKey(source)] = source
+    pictureIndex = {"version": pictureIndex["version"] + 1, "entries": entries, "imagesVersion": pictureIndex["imagesVersion"], "byName": byName, "byPicture": byPicture, "byProxyKey": byProxyKey}
+    if error:
+        message, category = error
+        errorHandling.setError(message=message, origin="images", category=category)
+
+def refreshPictureIndex():
+    """
+    Builds the picture index again for the same entries, e.g. after the images directory changed.
+
+    args:
+        None
+
+    returns:
+        None
+    """
+    entries = pictureIndex["entries"]
+    if entries is not None:
+        buildPictureIndex(entries)
+
+def refreshPictureIndexIfStale():
+    """
+    Builds the picture index again if the images directory changed since it was built.
+    Only needed while the fileWatcher is not running, otherwise it refreshes the index itself.
+
+    args:
+        None
+
+    returns:
+        None
+    """
+    if pictureIndex["imagesVersion"] != getImagesVersion():
+        refreshPictureIndex()
+
+def getPictureIndexVersion():
+    """
+    Returns the version of the picture index, which changes whenever it gets built again.
+    """
+    return pictureIndex["version"]
+
+def getEntryPicture(entryName: str):
+    """
+    Gets the image source of an entry's picture from the picture index.
+
+    args:
+        entryName (str): The name of the entry.
+
+    returns:
+        str: Which can be directly used as image source or None if the entry has no (existing) picture
+    """
+    sources = pictureIndex["byName"].get(entryName)
+    return sources["src"] if sources else None
+
+def getEntryPictureSources(entryName: str):
+    """
+    Gets the image source of an entry's picture with the srcsets of its thumbnails from the picture index.
+
+    args:
+        entryName (str): The name of the entry.
+
+    returns:
+        dict: {"src": str, "srcset": str or None, "webpSrcset": str or None} or None if the entry has no (existing) picture
+    """
+    return pictureIndex["byName"].get(entryName)
+
+def getProxiedUrl(proxyKey: str):
+    """
+    Gets the remote URL of a picture served through the imageProxy.
+    Only pictures of the loaded entries can be served, so the proxy can't be used to fetch arbitrary URLs.
+
+    args:
+        proxyKey (str): The key in the proxy URL, see imageProxy.getProxyKey().
+
+    returns:
+        str: The remote URL or None if no entry has this picture.
+    """
+    return pictureIndex["byProxyKey"].get(proxyKey)
+
+@timing.timed("getPictureLink")
 def getPictureLink(pictureEntry):
     """
     Gets the filepath of the image if pictureEntry is not a link.
+    Local pictures with thumbnails return the path of the smallest thumbnail, use getPictureSources() for the srcsets.
+    Pictures of the loaded entries are looked up in the picture index, others are checked directly.
 
     args:
         pictureEntry: What is set in entry.picture
@@ -97,25 +373,128 @@ def getPictureLink(pictureEntry):
     returns:
         str: Which can be directly used as image source
     """
+    byPicture = pictureIndex["byPicture"]
+    if pictureEntry in byPicture:
+        sources = byPicture[pictureEntry]
+        return sources["src"] if sources else None
     try:
-        if not pictureEntry:
-            errorHandling.setError(message="No Picture Entry was provided when trying to get Link", category="SERVICES.TYPE")
-            return None
-        if "http" in pictureEntry.lower(): # Is a link to a picture
-            return pictureEntry
-        else: # Is not a link but a image name
-            sliced = pictureEntry.split(".")
-            if len(sliced) < 2:
-                errorHandling.setError(message=f"Picture file name is wrongly formatted: {pictureEntry}", category="CONFIG.SYNTAX")
-                return None
-            
-            baseDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            imageDir = os.path.join(baseDir, "images")
-            editedPictureEntry = pictureEntry.replace(" ", "_") # Replace all spaces with underlines
-            imagePath = os.path.join(imageDir, editedPictureEntry)
-            if not os.path.exists(imagePath):
-                errorHandling.setError(message=f"Picture: {pictureEntry} does not exist", category="CONFIG.MISSING")
-                return None
-            return f"images/{editedPictureEntry}"
+        source, error = resolvePicture(pictureEntry)
+        if error:
+            message, category = error
+            errorHandling.setError(message=message, category=category)
+        if source and not source.startswith("images/"): # Not in the picture index, so the imageProxy would not serve it
+            return source
+        sources = getPictureSources(source)
+        return sources["src"] if sources else None
     except Exception as e:
-        print(e)
\ No newline at end of file
+        print(e)
+
+# Order of the currently loaded entries, used to page through them
+entryOrder = {"entries": None, "names": [], "positions": {}}
+
+def getEntryOrder(entries: dict):
+    """
+    Returns the names of the entries in the order of entries.yaml and the position of every name.
+    Only computed again once the entries changed.
+
+    args:
+        entries (dict): The loaded entries.
+
+    returns:
+        dict: {"entries": entries, "names": [name, ...], "positions": {name: position}}
+    """
+    global entryOrder
+    currentOrder = entryOrder
+    if currentOrder["entries"] is not entries:
+        names = list(entries)
+        currentOrder = {"entries": entries, "names": names, "positions": {name: position for position, name in enumerate(names)}}
+        entryOrder = currentOrder
+    return currentOrder
+
+def encodeCursor(position: int, entryName: str):
+    """
+    Encodes the position and name of the last returned entry into an opaque cursor.
+    """
+    return base64.urlsafe_b64encode(json.dumps([position, entryName]).encode("utf-8")).decode("ascii").rstrip("=")
+
+def decodeCursor(cursor: str):
+    """
+    Decodes a cursor created by encodeCursor().
+
+    returns:
+        tuple: (position, entryName), raises ValueError if the cursor is invalid.
+    """
+    try:
+        position, entryName = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(position, int) or not isinstance(entryName, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return position, entryName
+
+def getEntryPage(entries: dict, offset: int = 0, limit: int = 48, cursor: str = None):
+    """
+    Returns a page of the entries in the order of entries.yaml.
+    With a cursor the page starts after the entry the cursor points to, even if entries were added or removed before it.
+    With the SQLite backend the page is read from the database instead, see getStoredEntryPage().
+
+    args:
+        entries (dict): The loaded entries.
+        offset (int): Position of the first entry, ignored if a cursor is given.
+        limit (int): The maximum amount of entries.
+        cursor (str): The nextCursor of the previous page.
+
+    returns:
+        dict: {"total": int, "offset": int, "entries": [(name, entry), ...], "nextOffset": int or None, "nextCursor": str or None}
+        Raises ValueError if the cursor is invalid.
+    """
+    if entryStore.isEnabled():
+        return getStoredEntryPage(offset, limit, cursor)
+    order = getEntryOrder(entries)
+    names = order["names"]
+    if cursor:
+        position, entryName = decodeCursor(cursor)
+        currentPosition = order["positions"].get(entryName)
+        offset = currentPosition + 1 if currentPosition is not None else position # Entry was removed, its successor moved up
+    offset = min(max(offset, 0), len(names))
+
+    pageNames = names[offset:offset + limit]
+    nextOffset = offset + len(pageNames)
+    hasMore = nextOffset < len(names)
+    return {
+        "total": len(names),
+        "offset": offset,
+        "entries": [(name, entries[name]) for name in pageNames],
+        "nextOffset": nextOffset if hasMore else None,
+        "nextCursor": encodeCursor(nextOffset - 1, pageNames[-1]) if hasMore and pageNames else None
+    }
+
+def getStoredEntryPage(offset: int = 0, limit: int = 48, cursor: str = None):
+    """
+    Returns a page of the entries stored in the SQLite database, see getEntryPage().
+    The cursors hold the position (primary key) of the last returned entry, so every page is a range scan
+    of the primary key no matter how deep it is. Entries which were removed before it do not shift the page.
+
+    returns:
+        dict: Like getEntryPage(). Raises ValueError if the cursor is invalid, sqlite3.Error if the database can't be read.
+    """
+    afterPosition = 0
+    if cursor:
+        afterPosition, entryName = decodeCursor(cursor)
+        offset = entryStore.countEntries(untilPosition=afterPosition)
+        rows = entryStore.getEntryRange(afterPosition=afterPosition, limit=limit + 1)
+    else:
+        offset = max(offset, 0)
+        rows = entryStore.getEntryRange(limit=limit + 1, offset=offset)
+    total = entryStore.countEntries()
+
+    hasMore = len(rows) > limit # One more entry than needed was read to know if there is a next page
+    rows = rows[:limit]
+    nextOffset = offset + len(rows)
+    return {
+        "total": total,
+        "offset": offset,
+        "entries": [(name, EntryRecord(toRow(entry))) for position, name, entry in rows],
+        "nextOffset": nextOffset if hasMore else None,
+        "nextCursor": encodeCursor(rows[-1][0], rows[-1][1]) if hasMore and rows else None
+    }
@@ -1,23 +1,25 @@
 from .yamlServices import loadSettingsYaml, writeYamlFile
 from .validationModels import SettingsModel
 
+emptySettings = SettingsModel() # Returned while settings.yaml is invalid
 
 def getSettings():
     """
-    Loads the settings from settings.yaml and returns them. 
+    Returns the settings snapshot of settings.yaml. 
+    The file is only parsed again once it changed, so this is cheap to call multiple times per request.
     Example usage: settings = getSettings() settings.foo or settings.bar
 
     args:
         None
 
     returns:
-        SettingsModel: An instance of SettingsModel containing the settings.
+        SettingsModel: An immutable instance of SettingsModel containing the settings.
     If settings.yaml does not exist or is invalid, it returns an empty SettingsModel.
     """
     settings = loadSettingsYaml()
     if settings is None:
-        return SettingsModel()  # Return empty SettingsModel instead of dict
-    return SettingsModel(**settings)
+        return emptySettings
+    return settings
 
 def checkIfSettingExistsOrIsEmpty(settingsName):
     """
@@ -60,16 +62,30 @@ def setAndWriteSetting(settingsName, value):
     Returns:
         none
     """
-    allSettingNames = settingsName.split('.')
+    setAndWriteSettings({settingsName: value})
+
+def setAndWriteSettings(settingValues):
+    """
+    Sets multiple settings and writes them to settings.yaml at once, so the file is validated and written a single time.
+
+    Args:
+        settingValues (dict): settingsName: value, e.g. {'server.port': 5000, 'server.host': '127.0.0.1'}.
+
+    Returns:
+        none
+    """
     settings = getSettings()
-    
+
     settingsDict = settings.model_dump() if hasattr(settings, 'model_dump') else settings.__dict__
-    parentObj = settingsDict
 
-    for key in allSettingNames[:-1]:
-        if key not in parentObj or parentObj[key] is None:
-            parentObj[key] = {}
-        parentObj = parentObj[key]
+    for settingsName, value in settingValues.items():
+        allSettingNames = settingsName.split('.')
+        parentObj = settingsDict
+
+        for key in allSettingNames[:-1]:
+            if key not in parentObj or parentObj[key] is None:
+                parentObj[key] = {}
+            parentObj = parentObj[key]
 
-    parentObj[allSettingNames[-1]] = value
+        parentObj[allSettingNames[-1]] = value
     writeYamlFile(fileName="settings.yaml", data=settingsDict, filterNoneValues=True)
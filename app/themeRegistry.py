@@ -0,0 +1,137 @@
+import os
+import threading
+
+baseDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # Base directory of the app
+themesDir = os.path.join(baseDir, "themes")
+themeFolders = ("base", "main", "error", "edit") # Every theme needs one file per folder
+defaultTheme = "standard"
+
+# Replaced as a whole whenever themes/ gets scanned again
+registry = {
+    "version": 0, # Increases with every scan
+    "folderVersions": None, # mtimes of the theme folders at the time of the scan
+    "themes": {} # theme name: frozenset of the folders which contain a file of the theme
+}
+selection = {"key": None, "theme": defaultTheme} # The theme selected for (theme setting, registry version)
+registryLock = threading.Lock()
+
+def getFolderVersions():
+    """
+    Returns the mtimes of all theme folders, which change whenever a theme file gets added, renamed or removed.
+    """
+    versions = []
+    for folder in themeFolders:
+        try:
+            versions.append(os.stat(os.path.join(themesDir, folder)).st_mtime_ns)
+        except OSError:
+            versions.append(None)
+    return tuple(versions)
+
+def scanThemes():
+    """
+    Scans themes/ and indexes which theme has a file in which theme folder.
+
+    args:
+        None
+
+    returns:
+        None
+    """
+    global registry
+    with registryLock:
+        folderVersions = getFolderVersions()
+        themeFolderSets = {}
+        for folder in themeFolders:
+            try:
+                fileNames = os.listdir(os.path.join(themesDir, folder))
+            except OSError:
+                continue
+            for fileName in fileNames:
+                themeName, extension = os.path.splitext(fileName)
+                if extension == ".html":
+                    themeFolderSets.setdefault(themeName, set()).add(folder)
+
+        themes = {themeName: frozenset(folders) for themeName, folders in themeFolderSets.items()}
+        registry = {"version": registry["version"] + 1, "folderVersions": folderVersions, "themes": themes}
+
+def rescanIfChanged():
+    """
+    Scans themes/ again if a theme folder changed since the last scan.
+    Only needed while the fileWatcher is not running, otherwise it scans again by itself.
+
+    args:
+        None
+
+    returns:
+        None
+    """
+    if registry["folderVersions"] != getFolderVersions():
+        scanThemes()
+
+def getRegistryVersion():
+    """
+    Returns the version of the registry, which increases with every scan of themes/.
+    While the fileWatcher is running it scans again whenever a theme file changes, also when it gets edited in place.
+    """
+    return registry["version"]
+
+def getThemeVersion(themeName: str):
+    """
+    Returns the stat signatures (mtime and size) of the files of a theme, which change whenever one of them gets edited.
+    Editing a file in place does not change the mtime of its folder, so the registry can't tell.
+    Only needed while the fileWatcher is not running, otherwise use getRegistryVersion().
+
+    args:
+        themeName (str): The name of the theme.
+
+    returns:
+        tuple: (mtime_ns, size) per theme folder, None for missing files.
+    """
+    versions = []
+    for folder in themeFolders:
+        try:
+            stat = os.stat(os.path.join(themesDir, folder, f"{themeName}.html"))
+        except OSError:
+            versions.append(None)
+            continue
+        versions.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(versions)
+
+def getCompleteThemes():
+    """
+    Returns the names of all themes which have a file in every theme folder.
+
+    args:
+        None
+
+    returns:
+        list: The sorted names of the complete themes.
+    """
+    return sorted(themeName for themeName, folders in registry["themes"].items() if len(folders) == len(themeFolders))
+
+def selectTheme(themeName: str):
+    """
+    Selects the theme to render with. Falls back to the default theme if a file of the theme is missing.
+    The result is cached until the theme setting or themes/ changes.
+
+    args:
+        themeName (str): The theme set in settings.yaml.
+
+    returns:
+        tuple: (theme, missingPaths) where theme is the theme to use and missingPaths lists the missing files.
+               missingPaths is only returned the first time, afterwards it is None, so it only gets reported once.
+    """
+    global selection
+    currentRegistry = registry
+    key = (themeName, currentRegistry["version"])
+    currentSelection = selection
+    if currentSelection["key"] == key:
+        return currentSelection["theme"], None
+
+    folders = currentRegistry["themes"].get(themeName, frozenset())
+    missingPaths = [os.path.join(themesDir, folder, f"{themeName}.html") for folder in themeFolders if folder not in folders]
+    theme = defaultTheme if missingPaths else themeName
+    selection = {"key": key, "theme": theme}
+    return theme, missingPaths or None
+
+scanThemes()
@@ -0,0 +1,193 @@
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
+import io
+import os
+import sys
+from colorama import Fore
+from .atomicFiles import writeFileAtomic
+
+# Pillow is optional, without it the original pictures are used.
+# It is only imported once the first thumbnail gets created, so it does not slow down the startup.
+pillowInstalled = find_spec("PIL") is not None
+
+baseDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # Base directory of the app
+imagesDir = os.path.join(baseDir, "images")
+thumbnailsDirName = "thumbnails" # Inside of images/
+thumbnailsDir = os.path.join(imagesDir, thumbnailsDirName)
+
+thumbnailHeights = (190, 380) # Height of the picture section of a card, and twice that for high density screens
+thumbnailExtensions = {".png", ".jpg", ".jpeg", ".gif"} # SVGs are already small and scale by themselves
+webpQuality = 80
+jpegQuality = 85
+
+workerPool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="SiteBookThumbnails")
+
+def thumbnailsAvailable():
+    """
+    Checks if thumbnails can be created, which needs Pillow.
+
+    args:
+        None
+
+    returns:
+        bool: True if Pillow is installed, False otherwise.
+    """
+    return pillowInstalled
+
+def canHaveThumbnails(fileName: str):
+    """
+    Checks if thumbnails get created for a picture.
+
+    args:
+        fileName (str): Path of the picture relative to images/, e.g. "logo.png".
+
+    returns:
+        bool: True if the picture is a raster image outside of the thumbnails directory.
+    """
+    if fileName.split("/")[0] == thumbnailsDirName:
+        return False
+    return os.path.splitext(fileName)[1].lower() in thumbnailExtensions
+
+def getFallbackFormat(fileName: str):
+    """
+    Returns the format of the thumbnails for browsers without WebP support: JPEG for JPEGs, otherwise PNG to keep transparency.
+    """
+    if os.path.splitext(fileName)[1].lower() in {".jpg", ".jpeg"}:
+        return "jpg"
+    return "png"
+
+def getThumbnailNames(fileName: str):
+    """
+    Returns the paths of all thumbnails of a picture, relative to images/.
+    The original extension is kept in the name, so logo.png and logo.jpg do not share thumbnails.
+
+    args:
+        fileName (str): Path of the picture relative to images/, e.g. "logo.png".
+
+    returns:
+        dict: height: {"webp": path, "fallback": path}
+    """
+    fallbackFormat = getFallbackFormat(fileName)
+    return {
+        height: {
+            "webp": f"{thumbnailsDirName}/{fileName}.{height}.webp",
+            "fallback": f"{thumbnailsDirName}/{fileName}.{height}.{fallbackFormat}"
+        }
+        for height in thumbnailHeights
+    }
+
+def createThumbnails(fileName: str):
+    """
+    Creates the thumbnails of a picture, one WebP and one fallback per height.
+    Thumbnails which are newer than the picture are kept, heights the picture is not larger than are skipped
+    and their thumbnails of a previous, larger version of the picture are removed.
+
+    args:
+        fileName (str): Path of the picture relative to images/, e.g. "logo.png".
+
+    returns:
+        int: The amount of thumbnails created or removed.
+    """
+    if not thumbnailsAvailable() or not canHaveThumbnails(fileName):
+        return 0
+    from PIL import Image, ImageOps
+
+    picturePath = os.path.join(imagesDir, fileName)
+    pictureModified = os.stat(picturePath).st_mtime_ns
+    changed = 0
+    with Image.open(picturePath) as picture:
+        picture = ImageOps.exif_transpose(picture) # Keep photos upright, the orientation is lost with the metadata
+        fallbackFormat = getFallbackFormat(fileName)
+        if fallbackFormat == "png" or picture.mode not in ("RGB", "L"):
+            picture = picture.convert("RGBA")
+        for height, names in getThumbnailNames(fileName).items():
+            if picture.height <= height:
+                for name in names.values(): # Otherwise getPictureSources() would still offer them
+                    try:
+                        os.remove(os.path.join(imagesDir, name))
+                        changed += 1
+                    except FileNotFoundError:
+                        pass
+                continue
+            resized = None
+            for kind, name in names.items():
+                thumbnailPath = os.path.join(imagesDir, name)
+                try:
+                    if os.stat(thumbnailPath).st_mtime_ns >= pictureModified:
+                        continue
+                except OSError:
+                    pass
+                if resized is None:
+                    resized = picture.copy()
+                    resized.thumbnail((height * 4, height), Image.LANCZOS)
+                encoded = io.BytesIO()
+                if kind == "webp":
+                    resized.save(encoded, format="WEBP", quality=webpQuality, method=4)
+                elif fallbackFormat == "jpg":
+                    resized.convert("RGB").save(encoded, format="JPEG", quality=jpegQuality, optimize=True, progressive=True)
+                else:
+                    resized.save(encoded, format="PNG", optimize=True)
+                os.makedirs(os.path.dirname(thumbnailPath), exist_ok=True)
+                writeFileAtomic(thumbnailPath, encoded.getvalue()) # Never serve half written thumbnails, even if the picture is queued twice
+                changed += 1
+    return changed
+
+def queueThumbnails(fileName: str, onDone = None):
+    """
+    Creates the thumbnails of a picture on the background worker pool.
+
+    args:
+        fileName (str): Path of the picture relative to images/, e.g. "logo.png".
+        onDone: Optional function without arguments, called after thumbnails were created or removed.
+
+    returns:
+        None
+    """
+    if not thumbnailsAvailable() or not canHaveThumbnails(fileName):
+        return
+
+    def run():
+        try:
+            if createThumbnails(fileName) and onDone is not None:
+                onDone()
+        except Exception as exc:
+            print(Fore.RED + f"Could not create thumbnails of {fileName}: {exc}")
+
+    workerPool.submit(run)
+
+def backfillThumbnails():
+    """
+    Creates the missing thumbnails of all pictures in images/.
+
+    args:
+        None
+
+    returns:
+        tuple: (amount of thumbnails created or removed, amount of pictures which failed)
+    """
+    created = 0
+    failed = 0
+    for dirPath, dirNames, fileNames in os.walk(imagesDir):
+        if os.path.abspath(dirPath) == os.path.abspath(imagesDir) and thumbnailsDirName in dirNames:
+            dirNames.remove(thumbnailsDirName)
+        for fileName in fileNames:
+            relativePath = os.path.relpath(os.path.join(dirPath, fileName), imagesDir).replace(os.sep, "/")
+            if not canHaveThumbnails(relativePath):
+                continue
+            try:
+                created += createThumbnails(relativePath)
+            except Exception as exc:
+                failed += 1
+                print(Fore.RED + f"Could not create thumbnails of {relativePath}: {exc}")
+    return created, failed
+
+if __name__ == "__main__": # python -m app.thumbnails
+    if not thumbnailsAvailable():
+        print(Fore.RED + "Pillow is not installed. Install it with: pip install -r install/requirements.txt")
+        sys.exit(1)
+    print("Creating thumbnails of all pictures in images/ ...")
+    createdCount, failedCount = backfillThumbnails()
+    print(Fore.GREEN + f"Created or removed {createdCount} thumbnail(s).")
+    if failedCount:
+        print(Fore.RED + f"{failedCount} picture(s) failed.")
+        sys.exit(1)
@@ -0,0 +1,115 @@
+from contextlib import contextmanager
+from functools import wraps
+import json
+import threading
+import time
+
+# Spans of the request handled by the current thread. Waitress handles every request in a single thread, so a
+# thread local is enough. Outside of requests (e.g. in the fileWatcher) spans is None and nothing gets recorded.
+requestState = threading.local()
+
+def startRequest():
+    """
+    Starts collecting spans for the request handled by the current thread.
+
+    args:
+        None
+
+    returns:
+        None
+    """
+    requestState.spans = {}
+
+def finishRequest():
+    """
+    Stops collecting spans for the current thread.
+
+    args:
+        None
+
+    returns:
+        dict: name: [total seconds, count] of all spans recorded during the request.
+    """
+    spans = getattr(requestState, "spans", None)
+    requestState.spans = None
+    return spans or {}
+
+def record(name: str, seconds: float):
+    """
+    Adds the duration of a phase to the spans of the current request. Phases recorded multiple times are summed up.
+
+    args:
+        name (str): The name of the phase, e.g. "yamlParse".
+        seconds (float): How long it took.
+
+    returns:
+        None
+    """
+    spans = getattr(requestState, "spans", None)
+    if spans is None:
+        return
+    recorded = spans.get(name)
+    if recorded is None:
+        spans[name] = [seconds, 1]
+    else:
+        recorded[0] += seconds
+        recorded[1] += 1
+
+@contextmanager
+def span(name: str):
+    """
+    Records how long the body of the with statement took, e.g. with timing.span("render"): ...
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+def timed(name: str):
+    """
+    Decorator which records how long every call of the function took as a span.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+def formatServerTiming(spans: dict, totalSeconds: float):
+    """
+    Formats spans as Server-Timing header, which browsers show in the network tab of their devtools.
+
+    args:
+        spans (dict): The spans returned by finishRequest().
+        totalSeconds (float): The duration of the whole request.
+
+    returns:
+        str: The header value, e.g. 'yamlParse;dur=1.20;desc="1x", total;dur=3.40'
+    """
+    parts = [f'{name};dur={seconds * 1000:.2f};desc="{count}x"' for name, (seconds, count) in spans.items()]
+    parts.append(f"total;dur={totalSeconds * 1000:.2f}")
+    return ", ".join(parts)
+
+def formatSlowRequest(method: str, path: str, route: str, status: int, spans: dict, totalSeconds: float):
+    """
+    Formats a slow request as a single JSON line with the duration of every phase.
+
+    returns:
+        str: The JSON line.
+    """
+    return json.dumps({
+        "event": "slowRequest",
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "method": method,
+        "path": path,
+        "route": route,
+        "status": status,
+        "durationMs": round(totalSeconds * 1000, 2),
+        "spans": {name: {"durationMs": round(seconds * 1000, 2), "count": count} for name, (seconds, count) in spans.items()}
+    })
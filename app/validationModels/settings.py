@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 
 class FlaskSettings(BaseModel):
     secretKey: Optional[str] = None
@@ -7,20 +7,42 @@ class FlaskSettings(BaseModel):
     host: Optional[str] = None
     debug: Optional[bool] = None
     threads: Optional[int] = None
+    slowRequestThresholdMs: Optional[int] = None # Requests taking longer get logged with their timing breakdown
 
     class Config:
         extra = 'forbid'
+        frozen = True
 
 class ThemeSettings(BaseModel):
     name: Optional[str] = None
 
     class Config:
         extra = 'allow'
+        frozen = True
+
+class ImageSettings(BaseModel):
+    proxyRemote: Optional[bool] = None # Serve remote pictures from a local cache, default True
+    cacheSizeMB: Optional[int] = None # Size of that cache, default 200
+
+    class Config:
+        extra = 'forbid'
+        frozen = True
+
+class StorageSettings(BaseModel):
+    backend: Optional[Literal["yaml", "sqlite"]] = None # Where the entries are stored, default yaml (entries.yaml)
+    databasePath: Optional[str] = None # The SQLite database, relative to the SiteBook directory, default entries.db
+
+    class Config:
+        extra = 'forbid'
+        frozen = True
 
 class SettingsModel(BaseModel):
     server: Optional[FlaskSettings] = None
     theme: Optional[ThemeSettings] = None
     searchbar: Optional[bool] = None
+    images: Optional[ImageSettings] = None
+    storage: Optional[StorageSettings] = None
     
     class Config:
         extra = 'forbid'
+        frozen = True
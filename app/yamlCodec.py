@@ -0,0 +1,78 @@
+import yaml
+
+# libyaml's C implementation is about 10x faster, but PyYAML can be installed without it
+fastLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+fastDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+usingLibyaml = fastLoader is not yaml.SafeLoader
+
+def loadYaml(rawYaml: str):
+    """
+    Parses YAML, with libyaml if it is available.
+    If the YAML is invalid it is parsed again with the pure Python loader, so error messages stay the same
+    with and without libyaml (the C loader has no snippet of the problematic line in its marks).
+
+    args:
+        rawYaml (str): The YAML to parse.
+
+    returns:
+        The parsed data. Raises yaml.YAMLError if the YAML is invalid.
+    """
+    try:
+        return yaml.load(rawYaml, Loader=fastLoader)
+    except yaml.YAMLError:
+        if not usingLibyaml:
+            raise
+    return yaml.load(rawYaml, Loader=yaml.SafeLoader) # Raises the same error with the pure Python marks
+
+def dumpYaml(data, sortKeys: bool = True):
+    """
+    Emits data as block style YAML, with libyaml if it is available.
+
+    args:
+        data: Plain data (dicts, lists, strings, numbers, booleans and None).
+        sortKeys (bool): Whether the keys of mappings get sorted, False keeps their order (e.g. the order of the entries).
+
+    returns:
+        str: The YAML.
+    """
+    return yaml.dump(data, Dumper=fastDumper, default_flow_style=False, allow_unicode=True, sort_keys=sortKeys)
+
+def isOnlyComments(rawYaml: str):
+    """
+    Checks if YAML consists of nothing but comments and blank lines.
+    """
+    return all(not line.strip() or line.lstrip().startswith("#") for line in rawYaml.splitlines())
+
+def isAppendable(rawYaml: str):
+    """
+    Checks if keys can be appended to YAML as text, e.g. a new entry written to the end of entries.yaml.
+    That is the case if the document is a block mapping starting in the first column, nothing but comments follow it
+    and its last value is no block scalar which keeps its trailing newlines (|+ or >+), which the appended text would change.
+    Flow style ({a: {url: x}}), an explicit document end (...) or an indented mapping would break instead.
+    YAML without a document is appendable if it only consists of comments.
+
+    args:
+        rawYaml (str): The YAML, it has to be valid.
+
+    returns:
+        bool: True if a block mapping appended after a newline is parsed as more keys of the same mapping.
+    """
+    loader = fastLoader(rawYaml)
+    try:
+        root = loader.get_single_node()
+    finally:
+        loader.dispose()
+    if root is None: # No entries yet, only comments can be kept
+        return isOnlyComments(rawYaml)
+    if not isinstance(root, yaml.MappingNode) or root.flow_style or root.start_mark.column != 0:
+        return False
+    if not isOnlyComments(rawYaml[root.end_mark.index:]):
+        return False
+
+    node = root
+    while isinstance(node, (yaml.MappingNode, yaml.SequenceNode)) and not node.flow_style and node.value: # Follow the last values to the end of the document
+        node = node.value[-1][1] if isinstance(node, yaml.MappingNode) else node.value[-1]
+    if isinstance(node, yaml.ScalarNode) and node.style in ("|", ">"):
+        header = rawYaml[node.start_mark.index:].split("\n", 1)[0].split("#", 1)[0]
+        return "+" not in header
+    return True
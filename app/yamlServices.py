@@ -1,11 +1,32 @@
-from pydantic import ValidationError
-from typing import Dict
+from pydantic import ConfigDict, TypeAdapter, ValidationError
+from typing import Dict, Optional
 from .validationModels import EntryModel, SettingsModel
+from .validationModels.entries import Entry
+from .entryCatalog import EntryCatalog, toRow
 from . import errorHandling
-from .services import getPictureLink
+from . import entrySnapshot
+from . import entryStore
+from . import imageProxy
+from . import metrics
+from . import searchIndex
+from . import timing
+from .yamlCodec import loadYaml, dumpYaml, isAppendable
+from .atomicFiles import writeFileAtomic
+from .services import buildPictureIndex, addToPictureIndex, refreshPictureIndex
 import yaml
 import os
-from colorama import Fore
+import sqlite3
+import threading
+import time
+
+yamlCache = {} # Holds the last successfully validated data per file as fileName: (signature, data)
+yamlCacheLock = threading.Lock()
+cacheIsWatched = False # True while the fileWatcher keeps the cache up to date, then the files are not checked on access
+fileWriteLocks = {} # fileName: Lock which serializes the writers of the file, readers are never blocked
+fileWriteLocksLock = threading.Lock()
+entriesAdapter = TypeAdapter(Dict[str, Optional[Entry]], config=ConfigDict(title="EntryModel")) # Built once, validates the changed entries, see validateEntryModel()
+lastValidEntries = EntryCatalog() # The entries of the last successful validation
+appendState = {"signature": None, "appendable": False} # Whether entries.yaml with this signature can be appended to, see appendEntry()
 
 def getYamlFilePath(fileName: str) -> str:
     """
@@ -23,6 +44,116 @@ def getYamlFilePath(fileName: str) -> str:
     baseDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     return os.path.join(baseDir, fileName)
 
+def getFileSignature(filePath: str):
+    """
+    Returns a signature of a file which changes whenever the file gets rewritten.
+
+    args:
+        filePath (str): The absolute path of the file.
+
+    returns:
+        tuple: (mtime_ns, size, inode) of the file or None if it does not exist.
+    """
+    try:
+        stat = os.stat(filePath)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+def isStoredInDatabase(fileName: str):
+    """
+    Checks if the data of a YAML file is stored in the SQLite database instead, see entryStore.py.
+    Only entries.yaml can be and only if storage.backend is set to sqlite in settings.yaml.
+    """
+    return fileName == "entries.yaml" and entryStore.isEnabled()
+
+def getSourceSignature(fileName: str):
+    """
+    Returns the signature of the source of a YAML file's data: the file itself or the SQLite database.
+
+    args:
+        fileName (str): The name of the YAML file (e.g. "entries.yaml").
+
+    returns:
+        The signature or None if the source does not exist.
+    """
+    if isStoredInDatabase(fileName):
+        return entryStore.getSignature()
+    return getFileSignature(getYamlFilePath(fileName))
+
+def getCachedYaml(fileName: str, signature):
+    """
+    Returns the cached data of a YAML file if it was cached under the given signature.
+    The returned data is shared between all requests and must not be modified.
+
+    args:
+        fileName (str): The name of the YAML file (e.g. "entries.yaml").
+        signature: The current signature of the file, see getFileSignature().
+
+    returns:
+        The cached data or None if nothing (or outdated data) is cached.
+    """
+    cached = yamlCache.get(fileName)
+    if signature is None or cached is None or cached[0] != signature:
+        return None
+    return cached[1]
+
+def getCachedYamlVersion(fileName: str):
+    """
+    Returns the signature the cached data of a YAML file was loaded with.
+    It changes whenever the cached data changes, so it can be used to build other caches on top of it.
+
+    args:
+        fileName (str): The name of the YAML file (e.g. "entries.yaml").
+
+    returns:
+        The signature or None if nothing is cached.
+    """
+    cached = yamlCache.get(fileName)
+    if cached is None:
+        return None
+    return cached[0]
+
+def setCachedYaml(fileName: str, signature, data):
+    """
+    Caches the validated data of a YAML file under the given signature.
+
+    args:
+        fileName (str): The name of the YAML file (e.g. "entries.yaml").
+        signature: The signature the file had before it was read, see getFileSignature().
+        data: The validated data.
+
+    returns:
+        None
+    """
+    yamlCache[fileName] = (signature, data)
+
+def setCacheWatched(watched: bool):
+    """
+    Sets whether the cache is kept up to date by the fileWatcher.
+    While it is, loading a YAML file only reads the cache and never touches the file itself.
+
+    args:
+        watched (bool): True if the fileWatcher is running.
+
+    returns:
+        None
+    """
+    global cacheIsWatched
+    cacheIsWatched = watched
+
+def dropCachedYaml(fileName: str):
+    """
+    Drops the cached data of a YAML file, e.g. after it was written.
+
+    args:
+        fileName (str): The name of the YAML file (e.g. "entries.yaml").
+
+    returns:
+        None
+    """
+    yamlCache.pop(fileName, None)
+
 def createExampleEntriesYaml():
     """
     Creates an example entries.yaml file if it does not exist.
@@ -120,35 +251,219 @@ def createExampleSettingsYaml():
         )
         return False
 
+def parseYaml(rawYaml: str, fileName: str):
+    """
+    Parses YAML and records how often and how long each file gets parsed, see metrics.py.
+
+    args:
+        rawYaml (str): The content of the YAML file.
+        fileName (str): The name of the YAML file (e.g. "entries.yaml").
+
+    returns:
+        The parsed data. Raises yaml.YAMLError if the content is invalid.
+    """
+    labels = (("file", fileName),)
+    started = time.perf_counter()
+    try:
+        return loadYaml(rawYaml)
+    finally:
+        duration = time.perf_counter() - started
+        metrics.increment("sitebook_yaml_parse_total", labels)
+        metrics.observe("sitebook_yaml_parse_duration_seconds", duration, labels)
+        timing.record("yamlParse", duration)
+
+def validateEntryModel(data):
+    """
+    Validates entries like EntryModel.model_validate(), but only the entries which were added or changed since the last validation.
+    Every entry is converted to the row it is stored as in the catalog and compared with the row of the same name in
+    lastValidEntries (a C level tuple comparison), the changed ones are validated together in a single call of the prebuilt entriesAdapter.
+    Its errors are the same as the ones of EntryModel (titled EntryModel, located by the names of the invalid entries),
+    so nothing has to be validated again if an entry is invalid.
+    lastValidEntries is only replaced once validated entries get published, see publishYaml().
+
+    args:
+        data: The parsed content of entries.yaml.
+
+    returns:
+        EntryCatalog: The validated entries. Raises ValidationError if the data is invalid.
+    """
+    if not isinstance(data, dict):
+        return EntryModel.model_validate(data) # Raises, only mappings are valid
+
+    previousRow = lastValidEntries.rows.get
+    rows = {}
+    changedEntries = {}
+    for name, entry in data.items():
+        row = toRow(entry)
+        rows[name] = row
+        if row is None or previousRow(name) != row:
+            changedEntries[name] = entry
+    entriesAdapter.validate_python(changedEntries) # Raises the same errors as EntryModel, the unchanged entries were valid before
+
+    catalog = EntryCatalog(rows)
+    metrics.increment("sitebook_cache_requests_total", (("cache", "entryValidation"), ("result", "hit")), len(data) - len(changedEntries))
+    metrics.increment("sitebook_cache_requests_total", (("cache", "entryValidation"), ("result", "miss")), len(changedEntries))
+    return catalog
+
+def validateModel(model, data, fileName: str):
+    """
+    Validates parsed YAML with a pydantic model and records how often, how long and with which result, see metrics.py.
+    Entries are validated incrementally, see validateEntryModel().
+
+    args:
+        model: The pydantic model, e.g. EntryModel.
+        data: The parsed data.
+        fileName (str): The name of the YAML file (e.g. "entries.yaml").
+
+    returns:
+        The validated model (an EntryCatalog for EntryModel). Raises ValidationError if the data is invalid.
+    """
+    started = time.perf_counter()
+    result = "error"
+    try:
+        validated = validateEntryModel(data) if model is EntryModel else model.model_validate(data)
+        result = "ok"
+        return validated
+    finally:
+        duration = time.perf_counter() - started
+        metrics.increment("sitebook_yaml_validation_total", (("file", fileName), ("result", result)))
+        metrics.observe("sitebook_yaml_validation_duration_seconds", duration, (("file", fileName),))
+        timing.record("yamlValidate", duration)
+
+def parseEntriesYaml(rawYaml: str):
+    """
+    Parses and validates the content of entries.yaml in memory.
+
+    args:
+        rawYaml (str): The content of entries.yaml.
+
+    returns:
+        EntryCatalog: The validated entries, see entryCatalog.py.
+        Raises yaml.YAMLError or ValidationError if the content is invalid.
+    """
+    data = parseYaml(rawYaml, "entries.yaml")
+
+    if data is None:
+        data = {}
+
+    return validateModel(EntryModel, data, "entries.yaml")
+
+def parseSettingsYaml(rawYaml: str):
+    """
+    Parses and validates the content of settings.yaml in memory.
+
+    args:
+        rawYaml (str): The content of settings.yaml.
+
+    returns:
+        SettingsModel: The validated settings.
+        Raises yaml.YAMLError or ValidationError if the content is invalid.
+    """
+    data = parseYaml(rawYaml, "settings.yaml")
+
+    if data is None:
+        data = {}
+
+    return validateModel(SettingsModel, data, "settings.yaml")
+
+def publishYaml(fileName: str, signature, data):
+    """
+    Makes validated data of a YAML file available to all requests.
+
+    args:
+        fileName (str): The name of the YAML file (e.g. "entries.yaml").
+        signature: The signature the file had before it was read, see getFileSignature().
+        data: The validated data.
+
+    returns:
+        None
+    """
+    global lastValidEntries
+    if fileName == "entries.yaml":
+        buildPictureIndex(data)
+        lastValidEntries = data # Entries which were only checked (e.g. in the editor) are never compared against
+    setCachedYaml(fileName, signature, data)
+    if fileName == "entries.yaml":
+        queueSearchIndexUpdate(data)
+    if fileName == "settings.yaml" and data.searchbar and yamlCache.get("entries.yaml") is not None: # The search may just have been enabled
+        queueSearchIndexUpdate(yamlCache["entries.yaml"][1])
+    if fileName == "settings.yaml" and entryStore.configureStore(data.storage):
+        dropCachedYaml("entries.yaml") # The entries get loaded again from the new backend on their next access
+    if fileName == "settings.yaml" and imageProxy.configureProxy(data.images):
+        refreshPictureIndex() # Remote pictures switch between the imageProxy and their original URL
+
+def queueSearchIndexUpdate(entries):
+    """
+    Updates the search index to published entries in the background while the search is enabled, see searchIndex.queueIndexUpdate().
+    """
+    cachedSettings = yamlCache.get("settings.yaml")
+    if entries is not None and cachedSettings is not None and cachedSettings[1] is not None and cachedSettings[1].searchbar:
+        searchIndex.queueIndexUpdate(entries)
+
+def loadStoredEntries():
+    """
+    Loads the entries from the SQLite database and caches them, see entryStore.py.
+    They were validated before they were written, so they are not validated again.
+
+    args:
+        None
+
+    returns:
+        dict: The entries or None if the database can't be read.
+    """
+    databaseName = entryStore.getDatabaseName()
+    try:
+        signature, data = entryStore.loadEntries()
+    except sqlite3.Error as exc:
+        errorHandling.setError(
+            message=exc,
+            origin=databaseName,
+            category="SERVICES.DATABASE"
+        )
+        return None
+
+    errorHandling.removeErrorByOrigin(origin=databaseName)
+    errorHandling.removeErrorByOrigin(origin="entries.yaml") # entries.yaml is not read while the database is used
+    publishYaml("entries.yaml", signature, data)
+    return data
+
 def validateEntries():
     """
     Validates the entries.yaml file, checking if it exists and if it is valid.
     If it does not exist, it creates a new example file.
+    Valid entries get cached, so loadEntriesYaml() does not need to parse the file again.
+    They are also kept in a snapshot (see entrySnapshot.py), so the file is not parsed again after a restart either.
+    With the SQLite backend the entries are loaded from the database instead.
 
     args:
         None
 
     returns:
-        None
+        EntryCatalog: The validated entries or None if the file is invalid.
     """
+    if entryStore.isEnabled():
+        return loadStoredEntries()
+
     try:
         entriesPath = getYamlFilePath("entries.yaml")
 
         if not os.path.exists(entriesPath):
-            createExampleEntriesYaml()
+            if createExampleEntriesYaml():
+                return EntryCatalog()
             return
 
+        signature = getFileSignature(entriesPath)
         with open(entriesPath, "r", encoding="utf-8") as file:
             errorHandling.removeErrorByOrigin(origin="entries.yaml")
+            rawYaml = file.read()
 
-            data = yaml.safe_load(file)
-
-            if data is None:
-                return
+        data = entrySnapshot.loadSnapshot(entrySnapshot.hashYaml(rawYaml)) # Unchanged since the last start, skip parsing and validating
+        if data is None:
+            data = parseEntriesYaml(rawYaml)
+            entrySnapshot.queueSnapshot(data, rawYaml)
 
-            EntryModel.model_validate(data)
-
-            return
+        publishYaml("entries.yaml", signature, data)
+        return data
 
     except yaml.YAMLError as exc:
         errorHandling.setError(
@@ -182,31 +497,30 @@ def validateSettings():
     """
     Validates the settings.yaml file, checking if it exists and if it is valid.
     If it does not exist, it creates a new example file.
+    Valid settings get cached as an immutable snapshot, which is shared by all threads.
 
     args:
         None
 
     returns:
-        None
+        SettingsModel: The validated settings or None if the file is invalid.
     """
     try:
         settingsPath = getYamlFilePath("settings.yaml")
 
         if not os.path.exists(settingsPath):
-            createExampleSettingsYaml()
+            if createExampleSettingsYaml():
+                return SettingsModel()
             return
 
+        signature = getFileSignature(settingsPath)
         with open(settingsPath, "r", encoding="utf-8") as file:
             errorHandling.removeErrorByOrigin(origin="settings.yaml")
 
-            data = yaml.safe_load(file)
-
-            if data is None:
-                return
+            settings = parseSettingsYaml(file.read())
 
-            SettingsModel.model_validate(data)
-
-            return None
+        publishYaml("settings.yaml", signature, settings)
+        return settings
 
     except yaml.YAMLError as exc:
         errorHandling.setError(
@@ -248,20 +562,29 @@ def validateYaml():
     """
     print("Validating YAML files...")
 
+    validateSettings() # First, since it decides where the entries are stored
     validateEntries()
-    validateSettings()
+
+yamlValidators = {"entries.yaml": validateEntries, "settings.yaml": validateSettings}
+yamlParsers = {"entries.yaml": parseEntriesYaml, "settings.yaml": parseSettingsYaml}
 
 def validateYamlFromUser(data: str, yamlFileName: str):
+    """
+    Parses and validates YAML from the editor, without publishing it.
+
+    args:
+        data (str): The content from the editor.
+        yamlFileName (str): The name of the YAML file (e.g. "entries.yaml").
+
+    returns:
+        tuple: (validated data, None) or (None, dict describing the error) if the content is invalid.
+        The validated data can be passed on to writeRawYaml(), so it is not validated again. It is None for unknown files.
+    """
     try:
-        parsedData = yaml.safe_load(data)
-        
-        if yamlFileName == "entries" or yamlFileName == "entries.yaml":
-            EntryModel.model_validate(parsedData)
-            
-        elif yamlFileName == "settings" or yamlFileName == "settings.yaml":
-            SettingsModel.model_validate(parsedData)
-            
-        return False
+        parser = yamlParsers.get(yamlFileName) or yamlParsers.get(f"{yamlFileName}.yaml")
+        if parser is None:
+            return None, None
+        return parser(data), None
     
     except yaml.YAMLError as exc:
         errorHandling.setError(
@@ -276,7 +599,7 @@ def validateYamlFromUser(data: str, yamlFileName: str):
             column = exc.problem_mark.column + 1
             error_msg = f"Line {line}, Column {column}: {exc.problem or 'YAML syntax error'}"
         
-        return {"success": False, "reason": "YAML syntax error", "details": error_msg}
+        return None, {"success": False, "reason": "YAML syntax error", "details": error_msg}
 
     except ValidationError as exc:
         errorHandling.setError(
@@ -291,7 +614,7 @@ def validateYamlFromUser(data: str, yamlFileName: str):
             error_details.append(f"Field '{location}': {error['msg']}")
         
         formatted_details = "\n".join(error_details)
-        return {"success": False, "reason": "Validation error", "details": formatted_details}
+        return None, {"success": False, "reason": "Validation error", "details": formatted_details}
 
     except PermissionError as exc:
         errorHandling.setError(
@@ -299,7 +622,7 @@ def validateYamlFromUser(data: str, yamlFileName: str):
             origin=yamlFileName,
             category="FILESYSTEM.PERMISSION"
         )
-        return {"success": False, "reason": "Permission error", "details": str(exc)}
+        return None, {"success": False, "reason": "Permission error", "details": str(exc)}
 
     except Exception as exc:
         errorHandling.setError(
@@ -307,11 +630,59 @@ def validateYamlFromUser(data: str, yamlFileName: str):
             origin=yamlFileName,
             category="UNKNOWN"
         )
-        return {"success": False, "reason": "Unknown error", "details": str(exc)}
+        return None, {"success": False, "reason": "Unknown error", "details": str(exc)}
+
+def loadCachedYaml(fileName: str, validator):
+    """
+    Returns the cached data of a YAML file or validates it again if it changed since it was cached.
+
+    args:
+        fileName (str): The name of the YAML file (e.g. "entries.yaml").
+        validator: The function which validates, caches and returns the data of the file.
+
+    returns:
+        The validated data or None if the file is invalid.
+    """
+    if cacheIsWatched and not isStoredInDatabase(fileName): # The database is not watched, other processes can write it too
+        cached = yamlCache.get(fileName)
+        if cached is not None:
+            metrics.recordCacheLookup(fileName, hit=True)
+            return cached[1]
+
+    data = getCachedYaml(fileName, getSourceSignature(fileName))
+    if data is None:
+        with yamlCacheLock: # Only one thread parses the file, the others wait for its result
+            data = getCachedYaml(fileName, getSourceSignature(fileName))
+            if data is None:
+                metrics.recordCacheLookup(fileName, hit=False)
+                return validator()
+    metrics.recordCacheLookup(fileName, hit=True)
+    return data
+
+def refreshCachedYaml(fileName: str):
+    """
+    Validates a YAML file again and replaces its cached data, e.g. after it was written.
+    A failed validation is cached too, so it is not repeated until the file changes again.
+
+    args:
+        fileName (str): The name of the YAML file (e.g. "entries.yaml").
+
+    returns:
+        None
+    """
+    validator = yamlValidators.get(fileName)
+    if validator is None:
+        return
+    with yamlCacheLock:
+        dropCachedYaml(fileName)
+        if validator() is None:
+            setCachedYaml(fileName, None, None)
 
 def loadEntriesYaml():
     """
     Loads, validates and returns all entries from entries.yaml
+    As long as the file is unchanged, the cached entries are returned without parsing the file again.
+    The returned entries are shared between all requests and must not be modified.
 
     args:
         none
@@ -319,72 +690,34 @@ def loadEntriesYaml():
     returns:
         the parsed entries or None if an error occurred
     """
-    validateEntries()
+    entries = loadCachedYaml("entries.yaml", validateEntries)
     if errorHandling.errorExists():
         return
-    
-    baseDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    entriesPath = os.path.join(baseDir, "entries.yaml")
-    with open(entriesPath, "r") as file:
-        try:
-            entries = yaml.safe_load(file)
-
-            if entries is None:
-                return {}
-
-            for name, entry in entries.items():
-                if entry is None:
-                    entries[name] = {}
-
-            return entries
-        except yaml.YAMLError as exc:
-            errorHandling.setError(
-                message=exc,
-                origin="entries.yaml",
-                category="CONFIG.SYNTAX"
-            )
-            return None
-        
-        except PermissionError as exc:
-            errorHandling.setError(
-                message=exc,
-                origin="entries.yaml",
-                category="FILESYSTEM.PERMISSION"
-            )
-            return None
-
-        except Exception as exc:
-            errorHandling.setError(
-                message=exc,
-                origin="entries.yaml",
-                category="UNKNOWN"
-            )
-            return None
+    return entries
 
 def loadSettingsYaml():
     """
-    Loads, validates and returns all settings from settings.yaml
+    Loads, validates and returns the settings snapshot of settings.yaml
+    As long as the file is unchanged, the same immutable snapshot is returned without parsing the file again.
 
     args:
         none
 
     returns:
-        the parsed settings or None if an error occurred
+        SettingsModel: the settings or None if settings.yaml is invalid
     """
-    validateSettings()
-    if errorHandling.errorExists():
-        return
-    
-    baseDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    settingsPath = os.path.join(baseDir, "settings.yaml")
-    with open(settingsPath, "r") as file:
-        try:
-            settings = yaml.safe_load(file)
-            return settings
-        except yaml.YAMLError as exc:
-            print(f"Error loading YAML file: {exc}")
-            errorHandling.setError(message=f"Error loading YAML file: {exc}", origin="settings.yaml")
-            return None
+    return loadCachedYaml("settings.yaml", validateSettings)
+
+def collectEntryCount():
+    """
+    Returns the number of loaded entries for /metrics, see metrics.addCollector().
+    """
+    cached = yamlCache.get("entries.yaml")
+    if cached is None or cached[1] is None:
+        return []
+    return [("sitebook_entries", (), len(cached[1]))]
+
+metrics.addCollector(collectEntryCount)
 
 def filterNoneOut(data: Dict):
     """
@@ -420,57 +753,48 @@ def filterNoneOut(data: Dict):
                 filtered[key] = value
     return filtered
 
-def restoreYaml(fileName: str, data = None, truncatePosition = None):
+def getFileWriteLock(fileName: str):
     """
-    Method to restore Yaml file contents. Automatically handles further exceptions.
+    Returns the lock which serializes all writers of a file.
 
     args:
-        filename: the name of the file to restore (e.g. "settings.yaml")
-        Either:
-        - data: the data to write to the file. Truncates the file and then writes the data.
-        - truncatePosition: the position to trucate the file. (NO DATA BEING WRITEN)
-
-        If both are set an exception is raised
+        fileName (str): The name of the file (e.g. "entries.yaml").
 
     returns:
-        none or raises RuntimeError if restoration fails
-
+        threading.RLock: The lock of the file, it can be acquired again by the thread holding it.
     """
-    print("Restoring ...")
-    filePath = getYamlFilePath(fileName)
-    try:
-        if data is None and truncatePosition is None:
-            raise ValueError("Provided data for restoration is None and truncatePosition is also None")
-        
-        if data is not None and truncatePosition is not None:
-            raise ValueError("Both data and truncatePosition are set, only set one of them. If you have data to write, set only data.")
-        
-        if not filePath:
-            raise ValueError(f"The filename: {fileName} did not return a valid path")
-
-        if truncatePosition is None:
-            fileMode = "w"
-        else:
-            fileMode = "r+"
+    with fileWriteLocksLock:
+        return fileWriteLocks.setdefault(fileName, threading.RLock())
 
-        with open(filePath, fileMode, encoding="utf-8") as file:
-            if truncatePosition is not None:
-                file.seek(truncatePosition)
-                file.truncate()
-            else:
-                file.write(data)
+def writeYamlAtomic(fileName: str, rawYaml: str, data = None):
+    """
+    Validates the new content of a YAML file in memory, writes it atomically and publishes it to all requests.
+    Writers of the same file are serialized, readers keep using the old content until the new one is published.
+    With the SQLite backend only the changed entries are written to the database instead, see entryStore.saveEntries().
 
-    except Exception as exc:
-        print(Fore.RED + f"""
-Critical error was raised. What happend:
-\t1. Write to {fileName} was called
-\t2. An error was raised while writing, which let to a restoration of the original content
-\t3. Then this critical error occured while writing the original content: {exc}
+    args:
+        fileName (str): The name of the YAML file (e.g. "entries.yaml").
+        rawYaml (str): The new content of the file.
+        data: The content already parsed and validated, e.g. by validateYamlFromUser(). Parsed from rawYaml if None.
 
-Current Errors:
-\t{errorHandling.getErrorsPrintable()}
-""")
-        raise RuntimeError(f"Failed to restore {fileName}, stopping application.")
+    returns:
+        None, raises yaml.YAMLError or ValidationError if the content is invalid and OSError if writing failed.
+        The file is left untouched in all of these cases.
+    """
+    filePath = getYamlFilePath(fileName)
+    if data is None:
+        data = yamlParsers[fileName](rawYaml)
+    with getFileWriteLock(fileName):
+        if isStoredInDatabase(fileName):
+            previousSignature = entryStore.getSignature()
+            signature = entryStore.saveEntries(data, getCachedYaml(fileName, previousSignature), previousSignature)
+        else:
+            writeFileAtomic(filePath, rawYaml)
+            signature = getFileSignature(filePath)
+            if fileName == "entries.yaml":
+                entrySnapshot.queueSnapshot(data, rawYaml)
+        errorHandling.removeErrorByOrigin(origin=fileName)
+        publishYaml(fileName, signature, data)
 
 def writeYamlFile(fileName: str, data: Dict, filterNoneValues: bool = True):
     """
@@ -484,7 +808,6 @@ def writeYamlFile(fileName: str, data: Dict, filterNoneValues: bool = True):
     returns:
         none
     """
-    currentData = None
     try:
         filePath = getYamlFilePath(fileName)
 
@@ -497,21 +820,10 @@ def writeYamlFile(fileName: str, data: Dict, filterNoneValues: bool = True):
                 )
             return
 
-        # Read file to restore in case of error
-        with open(filePath, "r", encoding="utf-8") as file:
-            currentData = file.read()
-
         if filterNoneValues:
             data = filterNoneOut(data)
 
-        with open(filePath, "w", encoding="utf-8") as file:
-            yaml.dump(data, file, default_flow_style=False, allow_unicode=True)
-
-        # Validate the written file
-        validateYaml()
-        if errorHandling.errorExists(): # Check if an error was raised.
-            restoreYaml(fileName="settings.yaml", data=currentData) # Restore the original content
-        return
+        writeYamlAtomic(fileName, dumpYaml(data))
 
     except yaml.YAMLError as exc:
         errorHandling.setError(
@@ -520,6 +832,13 @@ def writeYamlFile(fileName: str, data: Dict, filterNoneValues: bool = True):
             category='CONFIG.SYNTAX'
             )
 
+    except ValidationError as exc:
+        errorHandling.setError(
+            message=exc,
+            origin=fileName,
+            category='VALIDATION.STRUCTURE'
+            )
+
     except PermissionError as exc:
         errorHandling.setError(
             message=exc,
@@ -533,39 +852,83 @@ def writeYamlFile(fileName: str, data: Dict, filterNoneValues: bool = True):
             origin=fileName,
             category='UNKNOWN'
             )
-    
-    restoreYaml(fileName="settings.yaml", data=currentData) # Also restore if an exception occured.
+
+def loadEntriesForWrite():
+    """
+    Returns the cached entries if they match the current entries.yaml (or database), otherwise validates it again.
+    Has to be called while holding the write lock of entries.yaml.
+
+    args:
+        None
+
+    returns:
+        dict: The current entries or None if they are invalid.
+    """
+    entries = getCachedYaml("entries.yaml", getSourceSignature("entries.yaml"))
+    if entries is None:
+        entries = validateEntries()
+    return entries
 
 def appendEntry(entryName: str, entryData: Dict):
     """
     Appends a new entry to the entries.yaml file.
+    Only the new entry is validated and appended, the rest of the file is neither read nor parsed again.
+    Only files ending in a block mapping (see yamlCodec.isAppendable()) are appended to, others are written again as a whole.
+    With the SQLite backend it is inserted as a single row instead.
 
     args:
         entryName (str): The name of the entry to append.
         entryData (Dict): The data of the entry to append.
 
     returns:
-        None
+        bool: True if the entry was appended, False otherwise.
     """
     entry = {}
     entry[entryName] = entryData
 
     filePath = getYamlFilePath("entries.yaml")
 
-    currentPosition = None
     try:
-        with open(filePath, "r+", encoding="UTF-8") as file:
-            currentPosition = file.tell()  # Get the current end of the file
-            existingContent = file.read().strip()  # Read and strip trailing whitespace
-            file.seek(0, os.SEEK_END)  # Move to the end of the file
-            if existingContent:  # Add a newline only if the file is not empty
-                file.write("\n")
-            yaml.dump(entry, file, default_flow_style=False, allow_unicode=True)
-
-        validateYaml()
-        if errorHandling.errorExists():
-            restoreYaml(fileName="entries.yaml", truncatePosition=currentPosition)
-        return
+        Entry.model_validate(entryData)
+        newContent = dumpYaml(entry)
+
+        with getFileWriteLock("entries.yaml"):
+            entries = loadEntriesForWrite()
+            if entries is None:
+                return False
+            if entryName in entries:
+                errorHandling.setError(
+                    message=f"An entry with the name '{entryName}' already exists",
+                    origin="entries.yaml",
+                    category='VALIDATION.DUPLICATE'
+                    )
+                return False
+
+            if entryStore.isEnabled():
+                signature = entryStore.insertEntry(entryName, entryData)
+            else:
+                signature = getFileSignature(filePath)
+                if appendState["signature"] != signature: # Changed by someone else (or not known yet), check its layout once
+                    with open(filePath, "r", encoding="UTF-8") as file:
+                        appendState["appendable"] = isAppendable(file.read())
+                    appendState["signature"] = signature
+                if not appendState["appendable"]: # e.g. flow style, write the whole file again validated (without its comments)
+                    writeYamlAtomic("entries.yaml", dumpYaml(entries.withEntry(entryName, entryData).toDicts(), sortKeys=False))
+                    return True
+
+                with open(filePath, "a", encoding="UTF-8") as file:
+                    file.write("\n" + newContent)
+                    file.flush()
+                    os.fsync(file.fileno())
+                signature = getFileSignature(filePath)
+                appendState["signature"] = signature
+                appendState["appendable"] = isAppendable(newContent) # The end of the file is the new entry now
+
+            updatedEntries = entries.withEntry(entryName, entryData) # Requests still using the old entries are not affected
+            addToPictureIndex(entryName, entryData, updatedEntries)
+            setCachedYaml("entries.yaml", signature, updatedEntries) # Not snapshotted, they were not parsed from the file
+            queueSearchIndexUpdate(updatedEntries)
+        return True
     
     except yaml.YAMLError as exc:
         errorHandling.setError(
@@ -574,6 +937,20 @@ def appendEntry(entryName: str, entryData: Dict):
             category='CONFIG.SYNTAX'
             )
 
+    except ValidationError as exc:
+        errorHandling.setError(
+            message=exc,
+            origin="entries.yaml",
+            category='VALIDATION.STRUCTURE'
+            )
+
+    except sqlite3.Error as exc:
+        errorHandling.setError(
+            message=exc,
+            origin=entryStore.getDatabaseName(),
+            category='SERVICES.DATABASE'
+            )
+
     except PermissionError as exc:
         errorHandling.setError(
             message=exc,
@@ -587,12 +964,109 @@ def appendEntry(entryName: str, entryData: Dict):
             origin="entries.yaml",
             category='UNKNOWN'
             )
-    
-    restoreYaml(fileName="entries.yaml", truncatePosition=currentPosition)
+    return False
+
+def changeEntry(entryName: str, entryData):
+    """
+    Updates or deletes an existing entry.
+    With the SQLite backend only its row gets written, otherwise entries.yaml gets written again as a whole (without its comments).
+
+    args:
+        entryName (str): The name of the entry.
+        entryData (Dict): The new data of the entry or None to delete it.
+
+    returns:
+        bool: True if the entry was changed, False otherwise.
+    """
+    try:
+        if entryData is not None:
+            Entry.model_validate(entryData)
+
+        with getFileWriteLock("entries.yaml"):
+            entries = loadEntriesForWrite()
+            if entries is None:
+                return False
+            if entryName not in entries:
+                errorHandling.setError(
+                    message=f"There is no entry with the name '{entryName}'",
+                    origin="entries.yaml",
+                    category='VALIDATION.MISSING'
+                    )
+                return False
+
+            if entryData is None: # Requests still using the old entries are not affected
+                updatedEntries = entries.withoutEntry(entryName)
+            else:
+                updatedEntries = entries.withEntry(entryName, entryData)
+
+            if not entryStore.isEnabled():
+                writeYamlAtomic("entries.yaml", dumpYaml(updatedEntries.toDicts(), sortKeys=False))
+                return True
+            if entryData is None:
+                signature = entryStore.deleteEntry(entryName)
+            else:
+                signature = entryStore.updateEntry(entryName, entryData)
+            if signature is None: # Deleted by another process in the meantime
+                dropCachedYaml("entries.yaml")
+                errorHandling.setError(
+                    message=f"There is no entry with the name '{entryName}'",
+                    origin="entries.yaml",
+                    category='VALIDATION.MISSING'
+                    )
+                return False
+            publishYaml("entries.yaml", signature, updatedEntries)
+        return True
+
+    except ValidationError as exc:
+        errorHandling.setError(
+            message=exc,
+            origin="entries.yaml",
+            category='VALIDATION.STRUCTURE'
+            )
+
+    except sqlite3.Error as exc:
+        errorHandling.setError(
+            message=exc,
+            origin=entryStore.getDatabaseName(),
+            category='SERVICES.DATABASE'
+            )
+
+    except PermissionError as exc:
+        errorHandling.setError(
+            message=exc,
+            origin="entries.yaml",
+            category='FILESYSTEM.PERMISSION'
+            )
+
+    except Exception as exc:
+        errorHandling.setError(
+            message=exc,
+            origin="entries.yaml",
+            category='UNKNOWN'
+            )
+    return False
+
+def updateEntry(entryName: str, entryData: Dict):
+    """
+    Replaces the data of an existing entry, it keeps its position. See changeEntry().
+    """
+    return changeEntry(entryName, entryData)
+
+def deleteEntry(entryName: str):
+    """
+    Deletes an existing entry. See changeEntry().
+    """
+    return changeEntry(entryName, None)
 
 def getRawYaml(fileName: str):
     try:
         filePath = getYamlFilePath(fileName=fileName)
+
+        if isStoredInDatabase(fileName): # Exported from the database, so it can still be edited as YAML
+            entries = loadCachedYaml(fileName, validateEntries)
+            if entries is None:
+                return None
+            return dumpYaml(entries.toDicts(), sortKeys=False) if entries else ""
         
         if not os.path.exists(filePath):
             errorHandling.setError(message=f"Whilst trying to get raw yaml the given fileName: ({fileName}) did not return an existing file at {filePath}", origin=fileName, category="FILESYSTEM.MISSING")
@@ -617,17 +1091,40 @@ def getRawYaml(fileName: str):
         )
         return None
     
-def writeRawYaml(fileName: str, rawYaml: str):
+def writeRawYaml(fileName: str, rawYaml: str, data = None):
     try:
         filePath = getYamlFilePath(fileName=fileName)
         
-        if not os.path.exists(filePath):
+        if not os.path.exists(filePath) and not isStoredInDatabase(fileName):
             errorHandling.setError(message=f"Whilst trying to write raw yaml the given fileName: ({fileName}) did not return an existing file at {filePath}", category="FILESYSTEM.MISSING")
             return None
         
-        with open(file=filePath, mode="w", encoding="UTF-8") as file:
-            file.write(rawYaml)
-            
+        writeYamlAtomic(fileName, rawYaml, data)
+
+    except yaml.YAMLError as exc:
+        errorHandling.setError(
+            message=exc,
+            origin=fileName,
+            category="CONFIG.SYNTAX"
+        )
+        return None
+
+    except ValidationError as exc:
+        errorHandling.setError(
+            message=exc,
+            origin=fileName,
+            category="VALIDATION.STRUCTURE"
+        )
+        return None
+
+    except sqlite3.Error as exc:
+        errorHandling.setError(
+            message=exc,
+            origin=entryStore.getDatabaseName(),
+            category="SERVICES.DATABASE"
+        )
+        return None
+
     except PermissionError as exc:
             errorHandling.setError(
                 message=exc,
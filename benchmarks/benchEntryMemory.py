@@ -0,0 +1,100 @@
+"""
+Benchmarks the memory of the loaded entries: the dicts PyYAML parses entries.yaml into against the EntryCatalog (app/entryCatalog.py).
+Also measures how long a full garbage collection takes while the entries are loaded.
+
+Usage:
+    python benchmarks/benchEntryMemory.py                       # All sizes, JSON to stdout
+    python benchmarks/benchEntryMemory.py --sizes 10000 50000 --output results.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repoDir)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.entryCatalog import buildCatalog
+from app.yamlCodec import loadYaml
+from benchHotPaths import generateEntriesYaml
+
+defaultSizes = [100, 1000, 10000, 50000]
+representations = {
+    "dicts": loadYaml,
+    "EntryCatalog": lambda rawYaml: buildCatalog(loadYaml(rawYaml))
+}
+
+def measureRepresentation(rawYaml: str, load, collections: int):
+    """
+    Loads the entries and measures the memory they keep and the duration of full garbage collections while they are loaded.
+
+    returns:
+        dict: bytes, trackedObjects and gcMs (median of the collections)
+    """
+    gc.collect()
+    tracemalloc.start()
+    entries = load(rawYaml)
+    gc.collect() # Untracks what can be untracked, like a long running worker would have done by now
+    retainedBytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    durations = []
+    for _ in range(collections):
+        started = time.perf_counter()
+        gc.collect()
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+    result = {
+        "bytes": retainedBytes,
+        "trackedObjects": len(gc.get_objects()),
+        "gcMs": round(durations[len(durations) // 2] * 1000, 3)
+    }
+    del entries
+    return result
+
+def runSize(size: int, collections: int):
+    """
+    Measures all representations with a synthetic entries.yaml of the given size.
+
+    returns:
+        dict: The results of this size.
+    """
+    rawYaml = generateEntriesYaml(size)
+    gc.collect()
+    baselineObjects = len(gc.get_objects())
+    results = {}
+    for name, load in representations.items():
+        result = measureRepresentation(rawYaml, load, collections)
+        result["trackedObjects"] -= baselineObjects
+        result["bytesPerEntry"] = round(result["bytes"] / size, 1)
+        results[name] = result
+    results["memorySaved"] = round(1 - results["EntryCatalog"]["bytes"] / results["dicts"]["bytes"], 3)
+    return {"size": size, "benchmarks": results}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the memory of the entries of SiteBook.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=defaultSizes, help="Catalog sizes to benchmark.")
+    parser.add_argument("--output", help="Writes the JSON results to this file instead of stdout.")
+    parser.add_argument("--collections", type=int, default=9, help="Full garbage collections timed per representation and size.")
+    arguments = parser.parse_args()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "sizes": []
+    }
+    for catalogSize in arguments.sizes:
+        print(f"Benchmarking {catalogSize} entries...", file=sys.stderr)
+        report["sizes"].append(runSize(catalogSize, arguments.collections))
+
+    output = json.dumps(report, indent=2)
+    if arguments.output:
+        with open(arguments.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
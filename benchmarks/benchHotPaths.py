@@ -0,0 +1,280 @@
+"""
+Benchmarks the request hot paths of SiteBook against synthetic entries.yaml files.
+
+Every catalog size runs in its own process with a fresh copy of app/ and themes/ in a temporary directory,
+so the real entries.yaml and settings.yaml are never touched.
+
+Usage:
+    python benchmarks/benchHotPaths.py                          # All sizes, JSON to stdout
+    python benchmarks/benchHotPaths.py --sizes 100 1000 --output results.json
+    python benchmarks/benchHotPaths.py --compare old.json new.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+defaultSizes = [100, 1000, 10000, 50000]
+localPictureCount = 20 # Number of distinct local pictures the entries point to
+
+def generateEntriesYaml(size: int):
+    """
+    Generates the content of an entries.yaml with the given amount of entries.
+    Every second entry has a remote picture, every fourth a local one and every fourth none.
+
+    args:
+        size (int): The amount of entries.
+
+    returns:
+        str: The content of entries.yaml
+    """
+    lines = []
+    for i in range(size):
+        lines.append(f"Service {i}:")
+        lines.append(f"  url: http://10.0.{i // 250 % 256}.{i % 250}:{8000 + i % 1000}")
+        lines.append(f"  description: Synthetic service number {i} for benchmarking")
+        if i % 2 == 0:
+            lines.append(f"  picture: https://cdn.example.com/logos/service-{i % 500}.png")
+        elif i % 4 == 1:
+            lines.append(f"  picture: bench-{i % localPictureCount}.png")
+        lines.append("")
+    return "\n".join(lines)
+
+def createWorkDir(size: int):
+    """
+    Creates a temporary copy of SiteBook with a synthetic catalog of the given size.
+
+    args:
+        size (int): The amount of entries.
+
+    returns:
+        str: The path of the temporary directory.
+    """
+    workDir = tempfile.mkdtemp(prefix=f"sitebook-bench-{size}-")
+    shutil.copytree(os.path.join(repoDir, "app"), os.path.join(workDir, "app"), ignore=shutil.ignore_patterns("__pycache__"))
+    shutil.copytree(os.path.join(repoDir, "themes"), os.path.join(workDir, "themes"))
+    imagesDir = os.path.join(workDir, "images")
+    os.makedirs(imagesDir)
+    for i in range(localPictureCount):
+        with open(os.path.join(imagesDir, f"bench-{i}.png"), "wb") as file:
+            file.write(b"\x89PNG\r\n\x1a\n")
+
+    with open(os.path.join(workDir, "entries.yaml"), "w", encoding="utf-8") as file:
+        file.write(generateEntriesYaml(size))
+    with open(os.path.join(workDir, "settings.yaml"), "w", encoding="utf-8") as file:
+        file.write("server:\n  host: 127.0.0.1\n  port: 5000\n  threads: 4\n  secretKey: benchmark\ntheme:\n  name: standard\n")
+    return workDir
+
+def percentile(sortedValues, fraction: float):
+    """
+    Returns the value at the given fraction (0-1) of the sorted values, interpolating linearly.
+    """
+    if len(sortedValues) == 1:
+        return sortedValues[0]
+    position = (len(sortedValues) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sortedValues) - 1)
+    return sortedValues[lower] + (sortedValues[upper] - sortedValues[lower]) * (position - lower)
+
+def measure(function, minIterations: int = 5, maxIterations: int = 2000, timeBudget: float = 2.0):
+    """
+    Calls function repeatedly and measures the duration of each call.
+    Stops after maxIterations or once timeBudget seconds are used up, but never before minIterations.
+
+    args:
+        function: Function without arguments, which gets benchmarked.
+
+    returns:
+        dict: iterations, requests/sec and mean/p50/p95/p99/max latency in milliseconds
+    """
+    durations = []
+    started = time.perf_counter()
+    while len(durations) < maxIterations:
+        callStarted = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - callStarted)
+        if len(durations) >= minIterations and time.perf_counter() - started >= timeBudget:
+            break
+    total = sum(durations)
+    durations.sort()
+    return {
+        "iterations": len(durations),
+        "requestsPerSecond": round(len(durations) / total, 2) if total else None,
+        "meanMs": round(total / len(durations) * 1000, 4),
+        "p50Ms": round(percentile(durations, 0.50) * 1000, 4),
+        "p95Ms": round(percentile(durations, 0.95) * 1000, 4),
+        "p99Ms": round(percentile(durations, 0.99) * 1000, 4),
+        "maxMs": round(durations[-1] * 1000, 4)
+    }
+
+def runWorker(size: int, workDir: str, resultPath: str, startWatcher: bool, timeBudget: float):
+    """
+    Runs all benchmarks for one catalog size inside the temporary copy and writes the results as JSON.
+    """
+    sys.path.insert(0, workDir)
+    from app.app import app, getTheme
+    from app import yamlServices, settingHandling, services, pageCache, fileWatcher
+
+    app.secret_key = "benchmark"
+    client = app.test_client()
+    if startWatcher:
+        fileWatcher.startWatcher()
+
+    results = {}
+    entries = yamlServices.loadEntriesYaml()
+    pictures = [entry.get("picture") for entry in entries.values() if entry.get("picture")]
+
+    def loadEntriesCold():
+        yamlServices.dropCachedYaml("entries.yaml")
+        yamlServices.loadCachedYaml("entries.yaml", yamlServices.validateEntries)
+
+    def getThemeInRequest():
+        with app.test_request_context("/"):
+            getTheme()
+
+    def getAllPictureLinks():
+        for picture in pictures:
+            services.getPictureLink(picture)
+
+    def getHome():
+        response = client.get("/")
+        assert response.status_code == 200, response.status_code
+
+    def getHomeUncached():
+        pageCache.clearPageCache()
+        getHome()
+
+    def getHomeConditional():
+        response = client.get("/", headers={"If-None-Match": etag})
+        assert response.status_code == 304, response.status_code
+
+    addCounter = [0]
+    def postAdd():
+        addCounter[0] += 1
+        response = client.post("/add", data={"name": f"Added {addCounter[0]}", "url": "http://added.local", "description": "Added by the benchmark"})
+        assert response.status_code == 302, response.status_code
+
+    rawSettingsYaml = yamlServices.getRawYaml("settings.yaml")
+    def postWriteSettingsYaml():
+        response = client.post("/writeYaml", data={"fileName": "settings.yaml", "data": rawSettingsYaml})
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    rawEntriesYaml = yamlServices.getRawYaml("entries.yaml")
+    def postWriteEntriesYaml():
+        response = client.post("/writeYaml", data={"fileName": "entries.yaml", "data": rawEntriesYaml})
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    getHome()
+    etag = client.get("/").headers.get("ETag")
+
+    benchmarks = [
+        ("loadEntriesYaml", yamlServices.loadEntriesYaml),
+        ("loadEntriesYaml (cold)", loadEntriesCold),
+        ("getSettings", settingHandling.getSettings),
+        ("getTheme", getThemeInRequest),
+        ("getPictureLink (all entries)", getAllPictureLinks),
+        ("GET /", getHome),
+        ("GET / (uncached render)", getHomeUncached),
+        ("GET / (If-None-Match)", getHomeConditional),
+        ("POST /writeYaml settings.yaml", postWriteSettingsYaml),
+        ("POST /writeYaml entries.yaml", postWriteEntriesYaml),
+        ("POST /add", postAdd) # Last, since it grows the catalog
+    ]
+    for name, function in benchmarks:
+        results[name] = measure(function, timeBudget=timeBudget)
+
+    with open(resultPath, "w", encoding="utf-8") as file:
+        json.dump({"size": size, "pictures": len(pictures), "benchmarks": results}, file)
+
+def getCommit():
+    """
+    Returns the current git commit of the repository or None if it can't be determined.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=repoDir, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def runAll(sizes, startWatcher: bool, timeBudget: float):
+    """
+    Runs the benchmarks for every size in a separate process.
+
+    returns:
+        dict: The results of all sizes with some information about the environment.
+    """
+    import yaml
+    report = {
+        "commit": getCommit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "libyaml": bool(getattr(yaml, "__with_libyaml__", False)),
+        "watcher": startWatcher,
+        "sizes": []
+    }
+    for size in sizes:
+        print(f"Benchmarking {size} entries...", file=sys.stderr)
+        workDir = createWorkDir(size)
+        resultPath = os.path.join(workDir, "result.json")
+        try:
+            command = [sys.executable, os.path.abspath(__file__), "--worker", str(size), "--workdir", workDir, "--result", resultPath, "--time-budget", str(timeBudget)]
+            if startWatcher:
+                command.append("--watcher")
+            subprocess.run(command, cwd=workDir, check=True, stdout=subprocess.DEVNULL)
+            with open(resultPath, "r", encoding="utf-8") as file:
+                report["sizes"].append(json.load(file))
+        finally:
+            shutil.rmtree(workDir, ignore_errors=True)
+    return report
+
+def compareReports(oldPath: str, newPath: str):
+    """
+    Prints the change of the p50 and p99 latency of every benchmark between two reports.
+    """
+    with open(oldPath, "r", encoding="utf-8") as file:
+        old = {result["size"]: result["benchmarks"] for result in json.load(file)["sizes"]}
+    with open(newPath, "r", encoding="utf-8") as file:
+        new = {result["size"]: result["benchmarks"] for result in json.load(file)["sizes"]}
+
+    for size in sorted(set(old) & set(new)):
+        print(f"{size} entries:")
+        for name in new[size]:
+            if name not in old[size]:
+                continue
+            changes = []
+            for key in ("p50Ms", "p99Ms"):
+                before, after = old[size][name][key], new[size][name][key]
+                change = (after - before) / before * 100 if before else 0
+                changes.append(f"{key} {before:.3f} -> {after:.3f} ({change:+.1f}%)")
+            print(f"  {name:32} " + "  ".join(changes))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the request hot paths of SiteBook.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=defaultSizes, help="Catalog sizes to benchmark.")
+    parser.add_argument("--output", help="Writes the JSON results to this file instead of stdout.")
+    parser.add_argument("--watcher", action="store_true", help="Starts the file watcher like start.py does.")
+    parser.add_argument("--time-budget", type=float, default=2.0, help="Seconds spent per benchmark and size.")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compares two JSON results.")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.compare:
+        compareReports(*arguments.compare)
+    elif arguments.worker is not None:
+        runWorker(arguments.worker, arguments.workdir, arguments.result, arguments.watcher, arguments.time_budget)
+    else:
+        report = runAll(arguments.sizes, arguments.watcher, arguments.time_budget)
+        output = json.dumps(report, indent=2)
+        if arguments.output:
+            with open(arguments.output, "w", encoding="utf-8") as file:
+                file.write(output + "\n")
+        else:
+            print(output)
@@ -0,0 +1,70 @@
+"""
+Benchmarks parsing and emitting entries.yaml with PyYAML's pure Python implementation against libyaml (app/yamlCodec.py).
+
+Usage:
+    python benchmarks/benchYamlCodec.py                         # All sizes, JSON to stdout
+    python benchmarks/benchYamlCodec.py --sizes 1000 10000 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import yaml
+
+repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repoDir)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import yamlCodec
+from benchHotPaths import generateEntriesYaml, measure
+
+defaultSizes = [100, 1000, 10000, 50000]
+
+def runSize(size: int, timeBudget: float):
+    """
+    Times loading and dumping a synthetic entries.yaml of the given size with both implementations.
+
+    returns:
+        dict: The results of this size.
+    """
+    rawYaml = generateEntriesYaml(size)
+    data = yaml.load(rawYaml, Loader=yaml.SafeLoader)
+    results = {
+        "load (pure Python)": measure(lambda: yaml.load(rawYaml, Loader=yaml.SafeLoader), minIterations=3, timeBudget=timeBudget),
+        "load (yamlCodec)": measure(lambda: yamlCodec.loadYaml(rawYaml), minIterations=3, timeBudget=timeBudget),
+        "dump (pure Python)": measure(lambda: yaml.dump(data, Dumper=yaml.SafeDumper, default_flow_style=False, allow_unicode=True), minIterations=3, timeBudget=timeBudget),
+        "dump (yamlCodec)": measure(lambda: yamlCodec.dumpYaml(data), minIterations=3, timeBudget=timeBudget)
+    }
+    for operation in ("load", "dump"):
+        pure = results[f"{operation} (pure Python)"]["p50Ms"]
+        codec = results[f"{operation} (yamlCodec)"]["p50Ms"]
+        results[f"{operation} speedup"] = round(pure / codec, 2) if codec else None
+    return {"size": size, "bytes": len(rawYaml.encode("utf-8")), "benchmarks": results}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the YAML codec of SiteBook.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=defaultSizes, help="Catalog sizes to benchmark.")
+    parser.add_argument("--output", help="Writes the JSON results to this file instead of stdout.")
+    parser.add_argument("--time-budget", type=float, default=2.0, help="Seconds spent per benchmark and size.")
+    arguments = parser.parse_args()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "pyyaml": yaml.__version__,
+        "libyaml": yamlCodec.usingLibyaml,
+        "sizes": []
+    }
+    for catalogSize in arguments.sizes:
+        print(f"Benchmarking {catalogSize} entries...", file=sys.stderr)
+        report["sizes"].append(runSize(catalogSize, arguments.time_budget))
+
+    output = json.dumps(report, indent=2)
+    if arguments.output:
+        with open(arguments.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
@@ -0,0 +1,153 @@
+"""
+Downloads the front-end packages used by the themes (Bootstrap, Bootstrap Icons and the Monaco editor) into assets/,
+so SiteBook works without reaching cdn.jsdelivr.net at runtime. Text files get precompressed gzip and brotli variants.
+
+The files keep the layout of jsDelivr (assets/<package>@<version>/<path>), so themes can fall back to the CDN with the same path,
+see assetUrl() in app/assets.py.
+
+Usage:
+    python install/bundleAssets.py          # Skips packages which are already bundled
+    python install/bundleAssets.py --force  # Downloads all packages again
+"""
+import argparse
+import base64
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import urllib.request
+
+try:
+    import brotli
+except ImportError: # Brotli is optional, without it only gzip variants are created
+    brotli = None
+
+repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+assetsDir = os.path.join(repoDir, "assets")
+registryUrl = "https://registry.npmjs.org"
+
+# Keep in sync with the assetUrl() calls in themes/
+assetPackages = [
+    {"name": "bootstrap", "version": "5.3.7", "paths": ["dist/css/bootstrap.min.css", "dist/js/bootstrap.bundle.min.js"]},
+    {"name": "bootstrap-icons", "version": "1.11.3", "paths": ["font/bootstrap-icons.css", "font/bootstrap-icons.min.css", "font/fonts/"]},
+    {"name": "monaco-editor", "version": "0.44.0", "paths": ["min/vs/"]}
+]
+compressedExtensions = {".css", ".js", ".json", ".svg", ".ttf", ".txt", ".html"} # woff2, png etc. are already compressed
+markerFileName = ".bundled.json"
+
+def fetch(url: str):
+    with urllib.request.urlopen(urllib.request.Request(url, headers={"User-Agent": "SiteBook asset bundler"}), timeout=60) as response:
+        return response.read()
+
+def downloadPackage(name: str, version: str):
+    """
+    Downloads the tarball of an npm package and checks it against the integrity hash of the registry.
+
+    returns:
+        tuple: (tarball bytes, integrity string)
+    """
+    metadata = json.loads(fetch(f"{registryUrl}/{name}/{version}"))
+    integrity = metadata["dist"]["integrity"]
+    tarball = fetch(metadata["dist"]["tarball"])
+    algorithm, expected = integrity.split("-", 1)
+    actual = base64.b64encode(hashlib.new(algorithm, tarball).digest()).decode("ascii")
+    if actual != expected:
+        raise ValueError(f"Integrity check of {name}@{version} failed")
+    return tarball, integrity
+
+def isWanted(memberPath: str, paths):
+    """
+    Checks if a file of the package is listed in paths. Paths ending with / include everything below them.
+    """
+    return any(memberPath == path or (path.endswith("/") and memberPath.startswith(path)) for path in paths)
+
+def compressFile(filePath: str):
+    """
+    Writes the .gz and, if brotli is installed, .br variant next to a file, unless they are not smaller.
+
+    returns:
+        int: The amount of variants written.
+    """
+    with open(filePath, "rb") as file:
+        content = file.read()
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content, quality=11)
+
+    written = 0
+    for extension, compressed in variants.items():
+        if len(compressed) < len(content):
+            with open(filePath + extension, "wb") as file:
+                file.write(compressed)
+            written += 1
+    return written
+
+def bundlePackage(package: dict, force: bool = False):
+    """
+    Extracts the wanted files of a package into assets/<name>@<version>/ and precompresses them.
+    The package directory gets replaced at once, so the app never serves a half extracted package.
+
+    returns:
+        bool: True if the package was bundled, False if it already was.
+    """
+    packageDirName = f"{package['name']}@{package['version']}"
+    packageDir = os.path.join(assetsDir, packageDirName)
+    if not force and os.path.exists(os.path.join(packageDir, markerFileName)):
+        print(f"{packageDirName} is already bundled.")
+        return False
+
+    print(f"Downloading {packageDirName}...")
+    tarball, integrity = downloadPackage(package["name"], package["version"])
+    os.makedirs(assetsDir, exist_ok=True)
+    temporaryDir = tempfile.mkdtemp(prefix=f".{packageDirName}.", dir=assetsDir)
+    try:
+        fileCount = 0
+        variantCount = 0
+        with tarfile.open(fileobj=io.BytesIO(tarball), mode="r:gz") as archive:
+            for member in archive.getmembers():
+                memberPath = member.name.split("/", 1)[1] if "/" in member.name else member.name # Strip "package/"
+                if not member.isfile() or not isWanted(memberPath, package["paths"]):
+                    continue
+                targetPath = os.path.normpath(os.path.join(temporaryDir, memberPath))
+                if not targetPath.startswith(temporaryDir + os.sep): # Never write outside of the package directory
+                    continue
+                os.makedirs(os.path.dirname(targetPath), exist_ok=True)
+                with archive.extractfile(member) as source, open(targetPath, "wb") as target:
+                    shutil.copyfileobj(source, target)
+                fileCount += 1
+                if os.path.splitext(targetPath)[1] in compressedExtensions:
+                    variantCount += compressFile(targetPath)
+
+        with open(os.path.join(temporaryDir, markerFileName), "w", encoding="utf-8") as file:
+            json.dump({"name": package["name"], "version": package["version"], "integrity": integrity}, file)
+        if os.path.exists(packageDir):
+            shutil.rmtree(packageDir)
+        os.replace(temporaryDir, packageDir)
+    finally:
+        shutil.rmtree(temporaryDir, ignore_errors=True)
+
+    print(f"Bundled {fileCount} file(s) of {packageDirName} with {variantCount} precompressed variant(s).")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bundles the front-end assets of the themes into assets/.")
+    parser.add_argument("--force", action="store_true", help="Downloads all packages again.")
+    arguments = parser.parse_args()
+
+    if brotli is None:
+        print("Brotli is not installed, only gzip variants will be created.")
+    failed = False
+    for assetPackage in assetPackages:
+        try:
+            bundlePackage(assetPackage, force=arguments.force)
+        except Exception as exc:
+            failed = True
+            print(f"Could not bundle {assetPackage['name']}@{assetPackage['version']}: {exc}")
+    if failed:
+        print("Some assets could not be bundled. SiteBook will load them from cdn.jsdelivr.net instead.")
+        sys.exit(1)
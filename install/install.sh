@@ -19,6 +19,9 @@ pip install --upgrade pip
 echo "Installing required packages..."
 pip install -r install/requirements.txt
 
+echo "Bundling front-end assets..."
+python3 install/bundleAssets.py || echo "Continuing without them, they will be loaded from cdn.jsdelivr.net instead."
+
 echo "Done!"
 echo "To start SiteBook, run:"
 echo "source venv/bin/activate && python3 start.py"
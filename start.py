@@ -1,33 +1,65 @@
-from colorama import Fore, init
-import waitress
+import os
+import time
+
+bootPhases = [("start", time.perf_counter())] # (phase, perf_counter when it ended), printed once SiteBook listens
+
+def markBootPhase(name: str):
+    """
+    Records the end of a phase of the startup, it lasted since the previous phase ended.
+    """
+    bootPhases.append((name, time.perf_counter()))
+
+def getInterpreterStartup():
+    """
+    Returns how long the Python interpreter took to start before start.py ran.
+
+    returns:
+        float: Seconds (at the resolution of the clock ticks of the kernel) or None if it can't be measured outside of Linux.
+    """
+    try:
+        with open("/proc/self/stat", "rb") as file:
+            startTicks = int(file.read().rsplit(b")", 1)[1].split()[19]) # starttime, in clock ticks after boot
+        processAge = time.clock_gettime(time.CLOCK_BOOTTIME) - startTicks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+    return max(processAge - (time.perf_counter() - bootPhases[0][1]), 0.0)
+
+def getBootBreakdown():
+    """
+    Returns how long the startup took in total and per phase.
+    """
+    phases = [(name, ended - started) for (_, started), (name, ended) in zip(bootPhases, bootPhases[1:])]
+    interpreterStartup = getInterpreterStartup()
+    if interpreterStartup is not None:
+        phases.insert(0, ("interpreter", interpreterStartup))
+    total = sum(duration for _, duration in phases)
+    return f"Started in {total * 1000:.0f} ms: " + ", ".join(f"{name} {duration * 1000:.0f} ms" for name, duration in phases)
 
-from app.yamlServices import validateYaml, createExampleEntriesYaml, createExampleSettingsYaml
-from app import errorHandling
-from app.settingHandling import getSettings, checkIfSettingExistsOrIsEmpty, setAndWriteSetting
+print("Starting SiteBook...")
 
-def restart():
-    import sys, os
-    print(Fore.YELLOW + "Restarting SiteBook...")
-    pythonInterpreter = sys.executable
-    os.execl(pythonInterpreter, pythonInterpreter, *sys.argv)
+from colorama import Fore, init
 
-print("Starting SiteBook...")
+from app.yamlServices import createExampleEntriesYaml, createExampleSettingsYaml
+from app import errorHandling, fileWatcher, metrics
+from app.settingHandling import getSettings, checkIfSettingExistsOrIsEmpty, setAndWriteSettings
 
 init(autoreset=True) #colorama init
+markBootPhase("imports")
 
-# Create example entries.yaml if it does not exist
+# Create example entries.yaml and settings.yaml if they do not exist, they get validated like existing ones right after
 if createExampleEntriesYaml():
     print(Fore.YELLOW + "Created example entries.yaml.")
-    restart()
 
 if createExampleSettingsYaml():
     print(Fore.YELLOW + "Created example settings.yaml.")
-    restart()
 
-validateYaml() # Validate YAML files
+print("Validating YAML files...")
+fileWatcher.startWatcher() # Validate YAML files and revalidate them in the background whenever they change
+markBootPhase("validation")
 
 # Start flask to either run normally or show the validation error(s)
 from app.app import app
+markBootPhase("flask")
 
 if errorHandling.errorExists():
     print(Fore.RED + f"Error in YAML file(s): {errorHandling.getErrorsPrintable()}")
@@ -36,41 +68,49 @@ else:
 print("Starting Flask app...")
 
 # Initialization of flask app here
-# Settings which will get writtent if they do not exist
+# Settings which will get written if they do not exist, all of them at once so settings.yaml is only validated and written once
 try:
     settings = getSettings()
+    missingSettings = {}
 
     if not checkIfSettingExistsOrIsEmpty('server.port'):
         print(Fore.YELLOW + "No port set. Setting to 5000...")
-        setAndWriteSetting(settingsName='server.port', value=5000)
-        settings = getSettings()
+        missingSettings['server.port'] = 5000
 
     if not checkIfSettingExistsOrIsEmpty('server.secretKey'):
         print(Fore.YELLOW + "No secretKey set. Generating a new one...")
         import secrets
-        setAndWriteSetting(settingsName='server.secretKey', value=secrets.token_urlsafe(32))
-        settings = getSettings()
-    app.secret_key = settings.server.secretKey
+        missingSettings['server.secretKey'] = secrets.token_urlsafe(32)
 
     if not checkIfSettingExistsOrIsEmpty('server.host'):
         print("No host set. Setting to 127.0.0.1...")
-        setAndWriteSetting(settingsName='server.host', value='127.0.0.1')
-        settings = getSettings()
+        missingSettings['server.host'] = '127.0.0.1'
 
     if not checkIfSettingExistsOrIsEmpty('server.threads'):
         print(Fore.YELLOW + "No amount of threads set. Setting to 4...")
-        setAndWriteSetting(settingsName='server.threads', value=4)
-        settings = getSettings()
+        missingSettings['server.threads'] = 4
 
     if not checkIfSettingExistsOrIsEmpty('server.debug'):
-        setAndWriteSetting(settingsName='server.debug', value=False)
+        missingSettings['server.debug'] = False
+
+    if missingSettings:
+        setAndWriteSettings(missingSettings)
         settings = getSettings()
+    app.secret_key = settings.server.secretKey
+    markBootPhase("settings")
 
     print(Fore.YELLOW + f"Starting on http://{settings.server.host}:{settings.server.port} with debug {settings.server.debug} and threads {settings.server.threads}.")
     print("Output now from flask app:")
     if settings.server.debug:
+        print(getBootBreakdown())
         app.run(debug=settings.server.debug, port=settings.server.port, host=settings.server.host)
-    waitress.serve(app, host=settings.server.host, port=settings.server.port, threads=settings.server.threads)
+    import waitress # Only needed without debug
+    server = waitress.create_server(app, host=settings.server.host, port=settings.server.port, threads=settings.server.threads)
+    markBootPhase("server")
+    metrics.setWaitressDispatcher(server.task_dispatcher) # Reports the queue depth on /metrics
+    print(getBootBreakdown())
+    server.print_listen("Serving on http://{}:{}")
+    server.run()
 
 except Exception as e:
     errorHandling.setErrorPreventedStart()
@@ -82,4 +122,3 @@ except Exception as e:
         app.secret_key = secrets.token_urlsafe(32)
     print(Fore.RED + f"Error while starting: {e}\nStarting Flask app: http://{hostSetting}:{portSetting} with debug {debugSetting}.")
     app.run(debug=debugSetting, port=portSetting, host=hostSetting)
-
@@ -0,0 +1,81 @@
+"""
+Tests appending entries to entries.yaml, see yamlServices.appendEntry().
+
+Usage:
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repoDir)
+
+from app import entrySnapshot, errorHandling, yamlServices
+from app.yamlCodec import loadYaml
+
+class AppendEntryTest(unittest.TestCase):
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="sitebook-test-")
+        self.entriesPath = os.path.join(self.workDir, "entries.yaml")
+        patches = (
+            mock.patch.object(yamlServices, "getYamlFilePath", lambda fileName: os.path.join(self.workDir, fileName)),
+            mock.patch.object(entrySnapshot, "snapshotPath", os.path.join(self.workDir, "cache", "entries.snapshot"))
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(shutil.rmtree, self.workDir, True)
+        self.addCleanup(lambda: entrySnapshot.workerPool.submit(lambda: None).result()) # Queued snapshots are written before the paths are restored
+        yamlServices.dropCachedYaml("entries.yaml")
+        errorHandling.removeErrorByOrigin(origin="entries.yaml")
+
+    def appendTo(self, rawYaml: str):
+        """
+        Writes entries.yaml, appends the entry "new" and returns the parsed content of the file afterwards.
+        """
+        with open(self.entriesPath, "w", encoding="utf-8") as file:
+            file.write(rawYaml)
+        self.assertTrue(yamlServices.appendEntry("new", {"url": "https://new.example"}))
+        self.assertFalse(errorHandling.errorExists(origin="entries.yaml"))
+        with open(self.entriesPath, "r", encoding="utf-8") as file:
+            return loadYaml(file.read())
+
+    def testAppendToBlockMapping(self):
+        rawYaml = "a:\n  url: https://a.example\n# Comments are kept\n"
+        self.assertEqual(self.appendTo(rawYaml), {"a": {"url": "https://a.example"}, "new": {"url": "https://new.example"}})
+        with open(self.entriesPath, "r", encoding="utf-8") as file:
+            self.assertTrue(file.read().startswith(rawYaml))
+
+    def testAppendToFlowStyle(self):
+        parsed = self.appendTo("{a: {url: https://a.example}, b: {url: https://b.example}}\n")
+        self.assertEqual(parsed, {
+            "a": {"url": "https://a.example"},
+            "b": {"url": "https://b.example"},
+            "new": {"url": "https://new.example"}
+        })
+        self.assertEqual(list(yamlServices.loadEntriesYaml()), ["a", "b", "new"])
+
+    def testAppendAfterDocumentEnd(self):
+        parsed = self.appendTo("a:\n  url: https://a.example\n...\n")
+        self.assertEqual(list(parsed), ["a", "new"])
+
+    def testAppendAfterKeptTrailingNewlines(self):
+        parsed = self.appendTo("a:\n  description: |+\n    Two lines\n\n")
+        self.assertEqual(parsed["a"]["description"], "Two lines\n\n")
+        self.assertEqual(parsed["new"], {"url": "https://new.example"})
+
+    def testAppendWithoutEntriesYaml(self):
+        self.assertTrue(yamlServices.appendEntry("new", {"url": "https://new.example"}))
+        self.assertFalse(errorHandling.errorExists())
+        with open(self.entriesPath, "r", encoding="utf-8") as file:
+            rawYaml = file.read()
+        self.assertTrue(rawYaml.startswith("# Example entries.yaml")) # Created with its comments first
+        self.assertEqual(loadYaml(rawYaml), {"new": {"url": "https://new.example"}})
+        self.assertEqual(list(yamlServices.loadEntriesYaml()), ["new"])
+
+if __name__ == "__main__":
+    unittest.main()
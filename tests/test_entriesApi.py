@@ -0,0 +1,149 @@
+"""
+Tests the pagination of /api/entries, see getEntryPage() in services.py.
+
+Usage:
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repoDir)
+
+from app import entrySnapshot, entryStore, errorHandling, fileWatcher, yamlServices
+from app.app import app
+from app.services import encodeCursor
+
+entryNames = [f"Service {i}" for i in range(10)]
+entriesYaml = "".join(f"{name}:\n  url: https://{i}.example\n" for i, name in enumerate(entryNames))
+
+class EntriesApiTest(unittest.TestCase):
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="sitebook-test-")
+        patches = (
+            mock.patch.object(yamlServices, "getYamlFilePath", lambda fileName: os.path.join(self.workDir, fileName)),
+            mock.patch.object(entrySnapshot, "snapshotPath", os.path.join(self.workDir, "cache", "entries.snapshot")),
+            mock.patch.object(fileWatcher, "isWatcherRunning", return_value=False)
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(shutil.rmtree, self.workDir, True)
+        self.addCleanup(lambda: entrySnapshot.workerPool.submit(lambda: None).result()) # Queued snapshots are written before the paths are restored
+        self.addCleanup(self.dropCaches)
+        self.dropCaches()
+        errorHandling.removeAllErrors()
+        self.writeFile("settings.yaml", self.getSettingsYaml())
+        self.writeFile("entries.yaml", entriesYaml)
+        self.client = app.test_client()
+
+    def getSettingsYaml(self):
+        return "theme:\n  name: standard\n"
+
+    def dropCaches(self):
+        yamlServices.dropCachedYaml("entries.yaml")
+        yamlServices.dropCachedYaml("settings.yaml")
+
+    def writeFile(self, fileName: str, content: str):
+        with open(os.path.join(self.workDir, fileName), "w", encoding="utf-8") as file:
+            file.write(content)
+
+    def getPage(self, **arguments):
+        response = self.client.get("/api/entries", query_string=arguments)
+        self.assertEqual(response.status_code, 200, response.get_json())
+        return response.get_json()
+
+    def getAllPages(self, limit: int):
+        """
+        Follows the cursors from the first to the last page, like the infinite scroll of the theme.
+        """
+        pages = [self.getPage(limit=limit)]
+        while pages[-1]["nextCursor"]:
+            pages.append(self.getPage(limit=limit, cursor=pages[-1]["nextCursor"]))
+        return pages
+
+    def getNames(self, page):
+        return [entry["name"] for entry in page["entries"]]
+
+    def testCursorsReturnEveryEntryOnce(self):
+        pages = self.getAllPages(limit=4)
+        self.assertEqual([len(page["entries"]) for page in pages], [4, 4, 2])
+        self.assertEqual([name for page in pages for name in self.getNames(page)], entryNames)
+        self.assertEqual([page["offset"] for page in pages], [0, 4, 8])
+        self.assertEqual({page["total"] for page in pages}, {10})
+        self.assertIsNone(pages[-1]["nextOffset"])
+
+    def testExactlyFullLastPage(self):
+        pages = self.getAllPages(limit=5)
+        self.assertEqual(len(pages), 2)
+        self.assertIsNone(pages[-1]["nextCursor"])
+
+    def testOffset(self):
+        page = self.getPage(offset=8, limit=4)
+        self.assertEqual(self.getNames(page), ["Service 8", "Service 9"])
+        self.assertEqual(self.getPage(offset=50)["entries"], [])
+
+    def testLimitIsClamped(self):
+        self.assertEqual(len(self.getPage(limit=0)["entries"]), 1)
+        self.assertEqual(len(self.getPage(limit=1000)["entries"]), 10)
+
+    def testEntriesRemovedBeforeTheCursor(self):
+        firstPage = self.getPage(limit=4)
+        self.assertTrue(yamlServices.deleteEntry("Service 0"))
+        self.assertTrue(yamlServices.deleteEntry("Service 1"))
+        page = self.getPage(limit=4, cursor=firstPage["nextCursor"])
+        self.assertEqual(self.getNames(page), ["Service 4", "Service 5", "Service 6", "Service 7"])
+        self.assertEqual(page["offset"], 2)
+
+    def testEntryOfTheCursorRemoved(self):
+        firstPage = self.getPage(limit=4)
+        self.assertTrue(yamlServices.deleteEntry("Service 3"))
+        page = self.getPage(limit=4, cursor=firstPage["nextCursor"])
+        self.assertEqual(self.getNames(page), ["Service 4", "Service 5", "Service 6", "Service 7"])
+
+    def testInvalidCursors(self):
+        for cursor in ("not a cursor", "bm90IGpzb24", encodeCursor("3", "Service 3"), "WyJhIiwgMV0"):
+            with self.subTest(cursor):
+                response = self.client.get("/api/entries", query_string={"cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.get_json()["reason"], "Invalid cursor")
+                self.assertFalse(response.get_json()["success"])
+
+class StoredEntriesApiTest(EntriesApiTest):
+    """
+    Runs the same tests with the SQLite backend, where the pages are range scans of the database.
+    """
+    def setUp(self):
+        patch = mock.patch.object(entryStore, "storeSettings", entryStore.storeSettings) # Replaced by the storage settings of settings.yaml
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.addCleanup(self.closeConnection)
+        super().setUp()
+        yamlServices.loadSettingsYaml()
+        self.assertEqual(entryStore.storeSettings, {"enabled": True, "databasePath": os.path.join(self.workDir, "entries.db")})
+        entryStore.replaceEntries(yamlServices.parseEntriesYaml(entriesYaml))
+        os.remove(os.path.join(self.workDir, "entries.yaml"))
+
+    def getSettingsYaml(self):
+        return super().getSettingsYaml() + f"storage:\n  backend: sqlite\n  databasePath: {os.path.join(self.workDir, 'entries.db')}\n"
+
+    def closeConnection(self):
+        connection = getattr(entryStore.threadConnections, "connection", None)
+        if connection is not None:
+            connection.close()
+            entryStore.threadConnections.connection = None
+
+    def testDatabaseErrors(self):
+        self.getPage()
+        with mock.patch.object(entryStore, "getEntryRange", side_effect=sqlite3.OperationalError("disk I/O error")):
+            response = self.client.get("/api/entries")
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(response.get_json()["success"])
+
+if __name__ == "__main__":
+    unittest.main()
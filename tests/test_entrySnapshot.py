@@ -0,0 +1,120 @@
+"""
+Tests the snapshot of the validated entries, see entrySnapshot.py.
+
+Usage:
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repoDir)
+
+from app import entrySnapshot, errorHandling, yamlServices
+
+rawYaml = "a:\n  url: https://a.example\nb:\n  url: https://b.example\n  description: B\n"
+
+class SnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="sitebook-test-")
+        self.snapshotPath = os.path.join(self.workDir, "cache", "entries.snapshot")
+        patches = (
+            mock.patch.object(entrySnapshot, "snapshotPath", self.snapshotPath),
+            mock.patch.dict(entrySnapshot.snapshotState, {"yamlHash": None}, clear=True),
+            mock.patch.object(yamlServices, "getYamlFilePath", lambda fileName: os.path.join(self.workDir, fileName))
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(shutil.rmtree, self.workDir, True)
+        self.addCleanup(self.waitForSnapshots) # Queued snapshots are written before the paths are restored
+        self.addCleanup(yamlServices.dropCachedYaml, "entries.yaml")
+        yamlServices.dropCachedYaml("entries.yaml")
+        errorHandling.removeAllErrors()
+
+    def waitForSnapshots(self):
+        entrySnapshot.workerPool.submit(lambda: None).result()
+
+class SnapshotTest(SnapshotTestCase):
+    def setUp(self):
+        super().setUp()
+        self.entries = yamlServices.parseEntriesYaml(rawYaml)
+        self.yamlHash = entrySnapshot.hashYaml(rawYaml)
+
+    def testRoundTrip(self):
+        entrySnapshot.writeSnapshot(self.yamlHash, self.entries)
+        loaded = entrySnapshot.loadSnapshot(self.yamlHash)
+        self.assertEqual(loaded.rows, self.entries.rows)
+        self.assertEqual(list(loaded), ["a", "b"])
+
+    def testMissingSnapshot(self):
+        self.assertIsNone(entrySnapshot.loadSnapshot(self.yamlHash))
+
+    def testChangedYamlIsStale(self):
+        entrySnapshot.writeSnapshot(self.yamlHash, self.entries)
+        self.assertIsNone(entrySnapshot.loadSnapshot(entrySnapshot.hashYaml(rawYaml + "c:\n")))
+
+    def testChangedFormatIsStale(self):
+        entrySnapshot.writeSnapshot(self.yamlHash, self.entries)
+        with mock.patch.dict(entrySnapshot.formatKeyState, {"digest": b"\0" * 32}): # E.g. another Python version or a changed EntryModel
+            self.assertIsNone(entrySnapshot.loadSnapshot(self.yamlHash))
+
+    def testCorruptSnapshotIsIgnored(self):
+        entrySnapshot.writeSnapshot(self.yamlHash, self.entries)
+        with open(self.snapshotPath, "r+b") as file:
+            file.seek(entrySnapshot.headerSize)
+            file.write(b"\xff\xff\xff")
+            file.truncate()
+        self.assertIsNone(entrySnapshot.loadSnapshot(self.yamlHash))
+
+    def testUnchangedSnapshotIsNotWrittenAgain(self):
+        entrySnapshot.queueSnapshot(self.entries, rawYaml)
+        self.waitForSnapshots()
+        with mock.patch.object(entrySnapshot, "writeSnapshot") as writeSnapshot:
+            entrySnapshot.queueSnapshot(self.entries, rawYaml)
+            self.waitForSnapshots()
+        writeSnapshot.assert_not_called()
+
+class ValidateEntriesSnapshotTest(SnapshotTestCase):
+    def writeEntriesYaml(self, content: str):
+        with open(os.path.join(self.workDir, "entries.yaml"), "w", encoding="utf-8") as file:
+            file.write(content)
+
+    def loadEntries(self):
+        yamlServices.dropCachedYaml("entries.yaml") # Like a restart
+        entries = yamlServices.validateEntries()
+        self.waitForSnapshots()
+        return entries
+
+    def testUnchangedFileIsLoadedFromTheSnapshot(self):
+        self.writeEntriesYaml(rawYaml)
+        first = self.loadEntries()
+        self.assertTrue(os.path.exists(self.snapshotPath))
+        with mock.patch.object(yamlServices, "parseEntriesYaml") as parseEntriesYaml:
+            second = self.loadEntries()
+        parseEntriesYaml.assert_not_called()
+        self.assertEqual(second.rows, first.rows)
+
+    def testEditedFileInvalidatesTheSnapshot(self):
+        self.writeEntriesYaml(rawYaml)
+        self.loadEntries()
+        self.writeEntriesYaml(rawYaml + "c:\n  url: https://c.example\n")
+        self.assertEqual(list(self.loadEntries()), ["a", "b", "c"])
+        with mock.patch.object(yamlServices, "parseEntriesYaml") as parseEntriesYaml: # The snapshot was replaced
+            self.assertEqual(list(self.loadEntries()), ["a", "b", "c"])
+        parseEntriesYaml.assert_not_called()
+
+    def testInvalidFileIsNotSnapshotted(self):
+        self.writeEntriesYaml(rawYaml)
+        self.loadEntries()
+        self.writeEntriesYaml(rawYaml + "c:\n  url: 5\n")
+        self.assertIsNone(self.loadEntries())
+        self.assertTrue(errorHandling.errorExists(origin="entries.yaml"))
+        self.assertIsNone(entrySnapshot.loadSnapshot(entrySnapshot.hashYaml(rawYaml + "c:\n  url: 5\n")))
+
+if __name__ == "__main__":
+    unittest.main()
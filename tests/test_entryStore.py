@@ -0,0 +1,202 @@
+"""
+Tests the SQLite backend of the entries, see entryStore.py and migrateEntries.py.
+
+Usage:
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from pydantic import ValidationError
+
+repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repoDir)
+
+from app import entrySnapshot, entryStore, errorHandling, migrateEntries, yamlServices
+from app.entryCatalog import buildCatalog
+from app.yamlCodec import loadYaml
+
+entries = {
+    "a": {"url": "https://a.example"},
+    "b": {"url": "https://b.example", "description": "B"},
+    "c": {"url": "https://c.example"}
+}
+
+class StoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="sitebook-test-")
+        self.databasePath = os.path.join(self.workDir, "entries.db")
+        patches = (
+            mock.patch.object(entryStore, "storeSettings", {"enabled": True, "databasePath": self.databasePath}),
+            mock.patch.object(yamlServices, "getYamlFilePath", lambda fileName: os.path.join(self.workDir, fileName)),
+            mock.patch.object(entrySnapshot, "snapshotPath", os.path.join(self.workDir, "cache", "entries.snapshot"))
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(shutil.rmtree, self.workDir, True)
+        self.addCleanup(self.closeConnection)
+        self.addCleanup(yamlServices.dropCachedYaml, "entries.yaml")
+        yamlServices.dropCachedYaml("entries.yaml")
+        errorHandling.removeAllErrors()
+
+    def closeConnection(self):
+        connection = getattr(entryStore.threadConnections, "connection", None)
+        if connection is not None:
+            connection.close()
+            entryStore.threadConnections.connection = None
+
+    def getPositions(self):
+        return {name: position for position, name, entry in entryStore.getEntryRange(limit=1000)}
+
+class EntryStoreTest(StoreTestCase):
+    def testReplaceAndLoad(self):
+        signature = entryStore.replaceEntries(buildCatalog(entries))
+        loadedSignature, loaded = entryStore.loadEntries()
+        self.assertEqual(loadedSignature, signature)
+        self.assertEqual(loaded.toDicts(), entries)
+        self.assertEqual(list(loaded), ["a", "b", "c"])
+        self.assertEqual(entryStore.getEntry("b"), entries["b"])
+        self.assertIsNone(entryStore.getEntry("d"))
+
+    def testEveryWriteChangesTheSignature(self):
+        signatures = [entryStore.getSignature(), entryStore.replaceEntries(buildCatalog(entries))]
+        signatures.append(entryStore.insertEntry("d", {"url": "https://d.example"}))
+        signatures.append(entryStore.updateEntry("d", {"url": "https://e.example"}))
+        signatures.append(entryStore.deleteEntry("d"))
+        self.assertEqual(len(set(signatures)), len(signatures))
+        self.assertEqual(signatures[-1], entryStore.getSignature())
+
+    def testMissingEntries(self):
+        entryStore.replaceEntries(buildCatalog(entries))
+        signature = entryStore.getSignature()
+        self.assertIsNone(entryStore.updateEntry("d", {"url": "https://d.example"}))
+        self.assertIsNone(entryStore.deleteEntry("d"))
+        self.assertEqual(entryStore.getSignature(), signature)
+
+    def testRanges(self):
+        entryStore.replaceEntries(buildCatalog({f"entry {i}": {"url": f"https://{i}.example"} for i in range(10)}))
+        firstPage = entryStore.getEntryRange(limit=4)
+        self.assertEqual([name for position, name, entry in firstPage], ["entry 0", "entry 1", "entry 2", "entry 3"])
+        secondPage = entryStore.getEntryRange(afterPosition=firstPage[-1][0], limit=4)
+        self.assertEqual([name for position, name, entry in secondPage], ["entry 4", "entry 5", "entry 6", "entry 7"])
+        self.assertEqual(secondPage[0][2], {"url": "https://4.example"})
+        self.assertEqual(entryStore.getEntryRange(limit=4, offset=4), secondPage)
+        self.assertEqual(entryStore.countEntries(), 10)
+        self.assertEqual(entryStore.countEntries(untilPosition=secondPage[-1][0]), 8)
+
+    def testDeletedRowsLeaveGapsInTheRange(self):
+        entryStore.replaceEntries(buildCatalog(entries))
+        entryStore.deleteEntry("b")
+        self.assertEqual([name for position, name, entry in entryStore.getEntryRange(limit=2)], ["a", "c"])
+
+class SaveEntriesTest(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.previous = buildCatalog(entries)
+        self.signature = entryStore.replaceEntries(self.previous)
+        self.positions = self.getPositions()
+
+    def testOnlyChangedRowsAreWritten(self):
+        changed = buildCatalog({"a": entries["a"], "c": {"url": "https://changed.example"}, "d": {"url": "https://d.example"}})
+        with mock.patch.object(entryStore, "replaceEntries") as replaceEntries:
+            entryStore.saveEntries(changed, self.previous, self.signature)
+        replaceEntries.assert_not_called()
+        self.assertEqual(entryStore.loadEntries()[1].toDicts(), changed.toDicts())
+        positions = self.getPositions()
+        self.assertEqual(positions["a"], self.positions["a"])
+        self.assertEqual(positions["c"], self.positions["c"]) # Kept its position
+        self.assertGreater(positions["d"], positions["c"])
+
+    def testReorderedEntriesAreReplaced(self):
+        reordered = buildCatalog({"c": entries["c"], "a": entries["a"], "b": entries["b"]})
+        self.assertIsNone(entryStore.getEntryChanges(self.previous, reordered))
+        entryStore.saveEntries(reordered, self.previous, self.signature)
+        self.assertEqual(list(entryStore.loadEntries()[1]), ["c", "a", "b"])
+
+    def testEntriesAddedInBetweenAreReplaced(self):
+        added = buildCatalog({"a": entries["a"], "new": {"url": "https://new.example"}, "b": entries["b"], "c": entries["c"]})
+        self.assertIsNone(entryStore.getEntryChanges(self.previous, added))
+        entryStore.saveEntries(added, self.previous, self.signature)
+        self.assertEqual(list(entryStore.loadEntries()[1]), ["a", "new", "b", "c"])
+
+    def testWriteOfAnotherProcessIsReplaced(self):
+        entryStore.insertEntry("other", {"url": "https://other.example"}) # Not part of previous or of the saved entries
+        changed = buildCatalog({"a": entries["a"], "b": {"url": "https://changed.example"}})
+        entryStore.saveEntries(changed, self.previous, self.signature)
+        self.assertEqual(entryStore.loadEntries()[1].toDicts(), changed.toDicts())
+
+class EntryServicesTest(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        entryStore.replaceEntries(buildCatalog(entries))
+
+    def testChangesArePublished(self):
+        self.assertEqual(list(yamlServices.loadEntriesYaml()), ["a", "b", "c"])
+        self.assertTrue(yamlServices.updateEntry("b", {"url": "https://changed.example"}))
+        self.assertTrue(yamlServices.deleteEntry("a"))
+        self.assertTrue(yamlServices.appendEntry("d", {"url": "https://d.example"}))
+        expected = {"b": {"url": "https://changed.example"}, "c": entries["c"], "d": {"url": "https://d.example"}}
+        self.assertEqual(yamlServices.loadEntriesYaml().toDicts(), expected)
+        self.assertEqual(entryStore.loadEntries()[1].toDicts(), expected)
+        self.assertFalse(os.path.exists(os.path.join(self.workDir, "entries.yaml")))
+
+    def testEntryDeletedByAnotherProcess(self):
+        yamlServices.loadEntriesYaml()
+        with mock.patch.object(entryStore, "deleteEntry", return_value=None):
+            self.assertFalse(yamlServices.deleteEntry("a"))
+        self.assertTrue(errorHandling.errorExists(origin="entries.yaml", category="VALIDATION"))
+        self.assertIsNone(yamlServices.yamlCache.get("entries.yaml"))
+
+    def testEditorSave(self):
+        rawYaml = "a:\n  url: https://a.example\nc:\n  url: https://c.example\n"
+        yamlServices.loadEntriesYaml()
+        with mock.patch.object(entryStore, "replaceEntries") as replaceEntries:
+            yamlServices.writeYamlAtomic("entries.yaml", rawYaml)
+        replaceEntries.assert_not_called()
+        self.assertEqual(entryStore.loadEntries()[1].toDicts(), loadYaml(rawYaml))
+
+class MigrationTest(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        with open(os.path.join(self.workDir, "settings.yaml"), "w", encoding="utf-8") as file:
+            file.write(f"storage:\n  backend: yaml\n  databasePath: {self.databasePath}\n")
+        self.addCleanup(yamlServices.dropCachedYaml, "settings.yaml")
+        yamlServices.dropCachedYaml("settings.yaml")
+
+    def readSettings(self):
+        with open(os.path.join(self.workDir, "settings.yaml"), "r", encoding="utf-8") as file:
+            return loadYaml(file.read())
+
+    def testRoundTrip(self):
+        rawYaml = "b:\n  url: https://b.example\na:\n  url: https://a.example\n  description: A\nc:\n"
+        with open(os.path.join(self.workDir, "entries.yaml"), "w", encoding="utf-8") as file:
+            file.write(rawYaml)
+
+        self.assertEqual(migrateEntries.migrateToSqlite(), 3)
+        self.assertEqual(self.readSettings()["storage"]["backend"], "sqlite")
+        self.assertEqual(list(entryStore.loadEntries()[1]), ["b", "a", "c"])
+
+        os.remove(os.path.join(self.workDir, "entries.yaml"))
+        self.assertEqual(migrateEntries.migrateToYaml(), 3)
+        self.assertEqual(self.readSettings()["storage"]["backend"], "yaml")
+        with open(os.path.join(self.workDir, "entries.yaml"), "r", encoding="utf-8") as file:
+            migrated = file.read()
+        self.assertEqual(list(loadYaml(migrated)), ["b", "a", "c"])
+        self.assertEqual(yamlServices.parseEntriesYaml(migrated).toDicts(), yamlServices.parseEntriesYaml(rawYaml).toDicts())
+        self.assertFalse(errorHandling.errorExists())
+
+    def testInvalidEntriesAreNotMigrated(self):
+        with open(os.path.join(self.workDir, "entries.yaml"), "w", encoding="utf-8") as file:
+            file.write("a:\n  url: 5\n")
+        with self.assertRaises(ValidationError):
+            migrateEntries.migrateToSqlite()
+        self.assertEqual(entryStore.countEntries(), 0)
+        self.assertEqual(self.readSettings()["storage"]["backend"], "yaml")
+
+if __name__ == "__main__":
+    unittest.main()
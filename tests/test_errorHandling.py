@@ -0,0 +1,37 @@
+"""
+Tests removing errors by their category, see errorHandling.py.
+
+Usage:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repoDir)
+
+from app import errorHandling
+
+class RemoveErrorsTest(unittest.TestCase):
+    def setUp(self):
+        errorHandling.removeAllErrors()
+        self.addCleanup(errorHandling.removeAllErrors)
+
+    def testRemoveAllRecoverableErrors(self):
+        errorHandling.setError("Invalid YAML", "entries.yaml", "VALIDATION.SYNTAX")
+        errorHandling.setError("Missing picture", "a.png", "CONFIG.MISSING")
+        errorHandling.setError("Not writable", "settings.yaml", "FILESYSTEM")
+        errorHandling.removeAllRecoverableErrors()
+        self.assertFalse(errorHandling.errorExists(category="VALIDATION"))
+        self.assertFalse(errorHandling.errorExists(category="CONFIG"))
+        self.assertEqual([error.category for error in errorHandling.getErrors()], ["FILESYSTEM"]) # Critical errors are kept
+
+    def testRemoveErrorByCategory(self):
+        errorHandling.setError("Invalid YAML", "entries.yaml", "VALIDATION.SYNTAX")
+        errorHandling.setError("Missing entry", "entries.yaml", "VALIDATION.MISSING")
+        errorHandling.removeErrorByCategory("VALIDATION.SYNTAX")
+        self.assertEqual([error.category for error in errorHandling.getErrors()], ["VALIDATION.MISSING"])
+
+if __name__ == "__main__":
+    unittest.main()
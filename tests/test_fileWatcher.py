@@ -0,0 +1,69 @@
+"""
+Tests that the fileWatcher picks up changes, also those made while it starts, see fileWatcher.py.
+The watcher thread never stops, so every test runs it in its own process on a temporary base directory.
+
+Usage:
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repoDir)
+
+# Runs startWatcher() on the base directory given as argument and edits entries.yaml while it validates the files.
+# Prints every call of revalidateYaml() and exits once entries.yaml was validated again or after 5 seconds.
+watcherScript = """
+import os, sys, threading
+from app import fileWatcher
+fileWatcher.baseDir = sys.argv[1]
+if sys.argv[2] == "polling":
+    fileWatcher.loadInotify = lambda: None
+validatedAgain = threading.Event()
+calls = []
+def revalidateYaml(fileName):
+    calls.append(fileName)
+    print(fileName, flush=True)
+    if fileName == "entries.yaml" and calls.count(fileName) == 1: # Edited during the validation at startup
+        with open(os.path.join(sys.argv[1], "entries.yaml"), "a", encoding="utf-8") as file:
+            file.write("b:\\n  url: https://b.example\\n")
+    elif fileName == "entries.yaml":
+        validatedAgain.set()
+fileWatcher.revalidateYaml = revalidateYaml
+fileWatcher.startWatcher()
+print("running" if fileWatcher.isWatcherRunning() else "stopped", flush=True)
+sys.exit(0 if validatedAgain.wait(5) else 1)
+"""
+
+class FileWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="sitebook-test-")
+        self.addCleanup(shutil.rmtree, self.workDir, True)
+        for fileName, content in (("entries.yaml", "a:\n  url: https://a.example\n"), ("settings.yaml", "theme:\n  name: standard\n")):
+            with open(os.path.join(self.workDir, fileName), "w", encoding="utf-8") as file:
+                file.write(content)
+
+    def runWatcher(self, mode: str):
+        result = subprocess.run(
+            [sys.executable, "-c", watcherScript, self.workDir, mode],
+            cwd=repoDir, capture_output=True, text=True, timeout=30
+        )
+        self.assertEqual(result.returncode, 0, f"The change made during the startup was not picked up:\n{result.stdout}{result.stderr}")
+        return result.stdout.split()
+
+    def testChangeDuringStartupWithInotify(self):
+        output = self.runWatcher("inotify")
+        self.assertEqual(output[:3], ["settings.yaml", "entries.yaml", "running"])
+        self.assertEqual(output[3:], ["entries.yaml"])
+
+    def testChangeDuringStartupWithPolling(self):
+        output = self.runWatcher("polling")
+        self.assertEqual(output[:3], ["settings.yaml", "entries.yaml", "running"])
+        self.assertEqual(output[3:], ["entries.yaml"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+"""
+Tests the cached home page, its conditional requests and compressed responses, see pageCache.py, compression.py and home() in app.py.
+
+Usage:
+    python -m unittest discover tests
+"""
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repoDir)
+
+from app import compression, entrySnapshot, errorHandling, fileWatcher, pageCache, themeRegistry, yamlServices
+from app.app import app
+
+settingsYaml = "theme:\n  name: standard\n"
+entriesYaml = "".join(f"Service {i}:\n  url: https://service{i}.example\n  description: Service number {i}\n" for i in range(20))
+
+class HomePageTestCase(unittest.TestCase):
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="sitebook-test-")
+        patches = (
+            mock.patch.object(yamlServices, "getYamlFilePath", lambda fileName: os.path.join(self.workDir, fileName)),
+            mock.patch.object(entrySnapshot, "snapshotPath", os.path.join(self.workDir, "cache", "entries.snapshot")),
+            mock.patch.object(fileWatcher, "isWatcherRunning", return_value=False)
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(shutil.rmtree, self.workDir, True)
+        self.addCleanup(lambda: entrySnapshot.workerPool.submit(lambda: None).result()) # Queued snapshots are written before the paths are restored
+        self.addCleanup(self.dropCaches)
+        self.dropCaches()
+        errorHandling.removeAllErrors()
+        self.writeFile("settings.yaml", settingsYaml)
+        self.writeFile("entries.yaml", entriesYaml)
+        self.client = app.test_client()
+
+    def dropCaches(self):
+        yamlServices.dropCachedYaml("entries.yaml")
+        yamlServices.dropCachedYaml("settings.yaml")
+        pageCache.clearPageCache()
+
+    def writeFile(self, fileName: str, content: str):
+        filePath = os.path.join(self.workDir, fileName)
+        mtime = os.stat(filePath).st_mtime_ns if os.path.exists(filePath) else None
+        with open(filePath, "w", encoding="utf-8") as file:
+            file.write(content)
+        if mtime is not None: # Edited within the resolution of the mtime, the file signature has to change anyway
+            os.utime(filePath, ns=(mtime + 1_000_000_000, mtime + 1_000_000_000))
+
+class ConditionalRequestTest(HomePageTestCase):
+    def testNotModified(self):
+        response = self.client.get("/", headers={"Accept-Encoding": "identity"})
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["ETag"]
+        self.assertEqual(response.headers["Cache-Control"], "no-cache")
+        self.assertIn(b"Service 0", response.data)
+
+        revalidated = self.client.get("/", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.data, b"")
+        self.assertEqual(revalidated.headers["ETag"], etag)
+
+    def testOtherEtagGetsThePage(self):
+        response = self.client.get("/", headers={"Accept-Encoding": "identity", "If-None-Match": '"outdated"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Service 0", response.data)
+
+    def testSamePageIsRenderedOnce(self):
+        first = self.client.get("/", headers={"Accept-Encoding": "identity"})
+        with mock.patch("app.app.render_template") as renderTemplate:
+            second = self.client.get("/", headers={"Accept-Encoding": "identity"})
+        renderTemplate.assert_not_called()
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second.headers["ETag"], first.headers["ETag"])
+
+    def testEditedEntriesChangeTheEtag(self):
+        etag = self.client.get("/", headers={"Accept-Encoding": "identity"}).headers["ETag"]
+        self.writeFile("entries.yaml", entriesYaml + "Added:\n  url: https://added.example\n")
+        response = self.client.get("/", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertIn(b"https://added.example", response.data)
+
+    def testThemeFilesAreOnlyCheckedWithoutTheWatcher(self):
+        with mock.patch.object(themeRegistry, "getThemeVersion", wraps=themeRegistry.getThemeVersion) as getThemeVersion:
+            self.client.get("/")
+            self.assertEqual(getThemeVersion.call_count, 1)
+            with mock.patch.object(fileWatcher, "isWatcherRunning", return_value=True): # It scans themes/ again whenever a theme file changes
+                etag = self.client.get("/").headers["ETag"]
+                self.assertEqual(getThemeVersion.call_count, 1)
+                themeRegistry.scanThemes()
+                self.assertEqual(self.client.get("/", headers={"If-None-Match": etag}).status_code, 304) # Rendered again, to the same page
+
+class CompressionTest(HomePageTestCase):
+    def getPlain(self):
+        return self.client.get("/", headers={"Accept-Encoding": "identity"})
+
+    @unittest.skipIf(compression.brotli is None, "brotli is not installed")
+    def testBrotliIsPreferred(self):
+        plain = self.getPlain()
+        response = self.client.get("/", headers={"Accept-Encoding": "gzip, deflate, br"})
+        self.assertEqual(response.headers["Content-Encoding"], "br")
+        self.assertEqual(compression.brotli.decompress(response.data), plain.data)
+        self.assertEqual(response.headers["ETag"], plain.headers["ETag"][:-1] + '-br"')
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+
+    def testGzip(self):
+        plain = self.getPlain()
+        for acceptEncoding in ("gzip", "gzip, br;q=0"):
+            with self.subTest(acceptEncoding):
+                response = self.client.get("/", headers={"Accept-Encoding": acceptEncoding})
+                self.assertEqual(response.headers["Content-Encoding"], "gzip")
+                self.assertEqual(gzip.decompress(response.data), plain.data)
+                self.assertEqual(response.headers["ETag"], plain.headers["ETag"][:-1] + '-gzip"')
+
+    def testGzipWithoutBrotli(self):
+        with mock.patch.object(compression, "brotli", None):
+            response = self.client.get("/", headers={"Accept-Encoding": "gzip, br"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+
+    def testUncompressed(self):
+        response = self.client.get("/", headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertFalse(response.headers["ETag"].endswith('-br"'))
+
+    def testNotModifiedPerEncoding(self):
+        for encoding in ("br", "gzip", "identity"):
+            with self.subTest(encoding):
+                etag = self.client.get("/", headers={"Accept-Encoding": encoding}).headers["ETag"]
+                response = self.client.get("/", headers={"Accept-Encoding": encoding, "If-None-Match": etag})
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.headers["ETag"], etag) # Same ETag as the 200 response of this encoding
+                self.assertNotIn("Content-Encoding", response.headers)
+
+    @unittest.skipIf(compression.brotli is None, "brotli is not installed")
+    def testEtagOfAnotherEncodingMatches(self):
+        etag = self.client.get("/", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+        response = self.client.get("/", headers={"Accept-Encoding": "br", "If-None-Match": etag}) # The browser switched encodings
+        self.assertEqual(response.status_code, 304)
+        self.assertTrue(response.headers["ETag"].endswith('-br"'))
+
+    def testPageIsCompressedOnce(self):
+        self.client.get("/", headers={"Accept-Encoding": "br"})
+        with mock.patch.object(compression, "compress", wraps=compression.compress) as compress:
+            response = self.client.get("/", headers={"Accept-Encoding": "br"})
+        compress.assert_not_called()
+        self.assertEqual(response.headers["Content-Encoding"], "br")
+
+    def testSmallResponsesAreNotCompressed(self):
+        response = self.client.get("/api/entries?limit=1", headers={"Accept-Encoding": "br, gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(response.data), compression.minimumSize)
+        self.assertNotIn("Content-Encoding", response.headers)
+        response = self.client.get("/api/entries?limit=20", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(len(json.loads(gzip.decompress(response.data))["entries"]), 20)
+
+if __name__ == "__main__":
+    unittest.main()
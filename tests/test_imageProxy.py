@@ -0,0 +1,166 @@
+"""
+Tests the cache of remote pictures, see imageProxy.py.
+
+Usage:
+    python -m unittest discover tests
+"""
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repoDir)
+
+from app import imageProxy, yamlServices
+from app.app import app
+
+pictureBody = b"\x89PNG" + b"\0" * 996 # 1000 bytes
+
+class PictureHandler(BaseHTTPRequestHandler):
+    """
+    Serves /<status>/<name>, e.g. /200/a.png, and records every request in server.requests.
+    """
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get("If-None-Match")))
+        status = int(self.path.split("/")[1])
+        if status == 200 and self.headers.get("If-None-Match") == '"v1"':
+            status = 304
+        self.send_response(status)
+        if status == 200:
+            self.send_header("Content-Type", "text/html" if self.path.endswith(".html") else "image/png")
+            self.send_header("Content-Length", str(len(pictureBody)))
+            self.send_header("ETag", '"v1"')
+        else:
+            self.send_header("Content-Length", "0")
+        self.end_headers()
+        if status == 200:
+            self.wfile.write(pictureBody)
+
+    def log_message(self, *args):
+        pass
+
+class ImageProxyTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), PictureHandler)
+        cls.server.requests = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.baseUrl = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="sitebook-test-")
+        self.server.requests.clear()
+        patches = (
+            mock.patch.object(imageProxy, "cacheDir", os.path.join(self.workDir, "imageProxy")),
+            mock.patch.object(imageProxy, "proxySettings", {"enabled": True, "cacheSizeBytes": 10 * 1000}),
+            mock.patch.object(imageProxy, "cacheIndex", OrderedDict()),
+            mock.patch.object(imageProxy, "cacheState", {"loaded": False, "bytes": 0}),
+            mock.patch.object(imageProxy, "touchedAt", {}),
+            mock.patch.object(imageProxy, "inFlight", {}),
+            mock.patch("builtins.print"), # Failed fetches are reported
+            mock.patch.object(yamlServices, "getYamlFilePath", lambda fileName: os.path.join(self.workDir, fileName)) # Read by the app for every request
+        )
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(shutil.rmtree, self.workDir, True)
+        self.addCleanup(yamlServices.dropCachedYaml, "settings.yaml")
+        yamlServices.dropCachedYaml("settings.yaml")
+
+    def getUrl(self, path: str):
+        return f"{self.baseUrl}/{path}"
+
+    def restart(self):
+        """
+        Forgets the cache in memory, like a restart. It gets loaded from disk again.
+        """
+        imageProxy.cacheIndex.clear()
+        imageProxy.touchedAt.clear()
+        imageProxy.cacheState.update(loaded=False, bytes=0)
+
+    def testPictureIsFetchedOnce(self):
+        url = self.getUrl("200/a.png")
+        path, contentType = imageProxy.getImage(url)
+        self.assertEqual(contentType, "image/png")
+        with open(path, "rb") as file:
+            self.assertEqual(file.read(), pictureBody)
+        self.assertEqual(imageProxy.getImage(url), (path, contentType))
+        self.restart()
+        self.assertEqual(imageProxy.getImage(url), (path, contentType))
+        self.assertEqual(len(self.server.requests), 1)
+
+    def testOutdatedPictureIsRevalidated(self):
+        url = self.getUrl("200/a.png")
+        path, contentType = imageProxy.getImage(url)
+        later = time.time() + imageProxy.revalidateAfter + 1
+        with mock.patch.object(imageProxy.time, "time", return_value=later):
+            self.assertEqual(imageProxy.getImage(url), (path, contentType)) # Served as it is while it gets checked again
+            imageProxy.requestFetch(imageProxy.getProxyKey(url), url).result()
+        self.assertEqual(self.server.requests[-1], ("/200/a.png", '"v1"'))
+        meta = imageProxy.lookupMeta(imageProxy.getProxyKey(url))
+        self.assertEqual(meta["fetchedAt"], later) # Not modified, the cached picture is kept
+        self.assertEqual(meta["size"], len(pictureBody))
+
+    def testFailedFetchesAreCached(self):
+        for path in ("404/missing.png", "200/page.html"):
+            with self.subTest(path):
+                url = self.getUrl(path)
+                self.assertEqual(imageProxy.getImage(url), (None, None))
+                self.assertEqual(imageProxy.getImage(url), (None, None))
+                self.assertEqual([request for request, etag in self.server.requests].count(f"/{path}"), 1)
+                with mock.patch.object(imageProxy.time, "time", return_value=time.time() + imageProxy.negativeCacheTime + 1):
+                    self.assertEqual(imageProxy.getImage(url), (None, None))
+                self.assertEqual([request for request, etag in self.server.requests].count(f"/{path}"), 2)
+
+    def testUnreachableHost(self):
+        with mock.patch.object(imageProxy, "fetchTimeout", 1):
+            self.assertEqual(imageProxy.getImage("http://127.0.0.1:1/a.png"), (None, None))
+        self.assertTrue(imageProxy.lookupMeta(imageProxy.getProxyKey("http://127.0.0.1:1/a.png"))["failedAt"])
+
+    def testLeastRecentlyUsedPicturesAreEvicted(self):
+        imageProxy.proxySettings["cacheSizeBytes"] = 2500
+        paths = {name: imageProxy.getImage(self.getUrl(f"200/{name}.png"))[0] for name in ("a", "b")}
+        imageProxy.getImage(self.getUrl("200/a.png")) # a is now used more recently than b
+        paths["c"] = imageProxy.getImage(self.getUrl("200/c.png"))[0]
+        self.assertFalse(os.path.exists(paths["b"]))
+        self.assertFalse(os.path.exists(imageProxy.getMetaPath(imageProxy.getProxyKey(self.getUrl("200/b.png")))))
+        self.assertTrue(os.path.exists(paths["a"]))
+        self.assertTrue(os.path.exists(paths["c"]))
+        self.assertEqual(imageProxy.cacheState["bytes"], 2000)
+
+    def testShrinkingTheCacheEvicts(self):
+        paths = [imageProxy.getImage(self.getUrl(f"200/{name}.png"))[0] for name in ("a", "b", "c")]
+        imageSettings = mock.Mock(proxyRemote=True, cacheSizeMB=0)
+        self.assertFalse(imageProxy.configureProxy(imageSettings))
+        self.assertEqual([os.path.exists(path) for path in paths], [False, False, False])
+        self.assertEqual(imageProxy.cacheState["bytes"], 0)
+
+    def testPictureLargerThanTheCacheIsKept(self):
+        imageProxy.proxySettings["cacheSizeBytes"] = 500
+        path, contentType = imageProxy.getImage(self.getUrl("200/a.png"))
+        self.assertTrue(os.path.exists(path)) # The picture just fetched is served, the next one replaces it
+
+    def testEvictedPictureIsRedirected(self):
+        url = self.getUrl("200/a.png")
+        path, contentType = imageProxy.getImage(url)
+        os.remove(path) # Evicted between getImage() and sending it
+        with mock.patch("app.app.getProxiedUrl", return_value=url), mock.patch.object(imageProxy, "getImage", return_value=(path, contentType)):
+            response = app.test_client().get(f"/imageProxy/{imageProxy.getProxyKey(url)}")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.headers["Location"], url)
+        self.assertEqual(response.headers["Cache-Control"], "no-store")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+Tests the search index, see searchIndex.py.
+
+Usage:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repoDir)
+
+from app import searchIndex
+from app.entryCatalog import buildCatalog
+from app.searchIndex import SearchIndex
+
+entries = {
+    "Home Assistant": {"url": "http://192.168.2.15:8123", "description": "Home automation"},
+    "HomeAssistant Backup": {"url": "http://backup.local", "description": "Backups of the smart home"},
+    "GitHub": {"url": "https://github.com", "description": "Code hosting"},
+    "Gitea": {"url": "https://git.local", "description": "Self hosted git service"},
+    "Jellyfin": {"url": "http://media.local:8096", "description": "Media server"},
+    "Router": {"url": "http://192.168.2.1"},
+    "Zigbee2MQTT": None
+}
+
+def buildIndex(entryData: dict = entries):
+    index = SearchIndex()
+    index.update(buildCatalog(entryData))
+    return index
+
+def getNames(results):
+    return [name for name, score in results]
+
+class RankingTest(unittest.TestCase):
+    def setUp(self):
+        self.index = buildIndex()
+
+    def testNameRanksBeforeDescription(self):
+        self.assertEqual(getNames(self.index.search("media")), ["Jellyfin"]) # Only in the description and the URL
+        self.assertEqual(getNames(self.index.search("git"))[:2], ["GitHub", "Gitea"]) # Names starting with the query first, then by name
+
+    def testMoreMatchedTokensRankFirst(self):
+        self.assertEqual(getNames(self.index.search("home automation"))[0], "Home Assistant")
+
+    def testExactBeforePrefixBeforeSubstring(self):
+        results = self.index.search("assistant")
+        self.assertEqual(getNames(results), ["Home Assistant", "HomeAssistant Backup"])
+        self.assertGreater(results[0][1], results[1][1])
+
+    def testLimit(self):
+        self.assertEqual(len(self.index.search("http", limit=2)), 2)
+        self.assertEqual(self.index.search("http", limit=2), self.index.search("http", limit=20)[:2])
+
+    def testScoresOfAllPostingsAreKept(self):
+        manyEntries = {f"Service {i}": {"url": f"http://service{i}.local"} for i in range(3000)}
+        results = buildIndex(manyEntries).search("1", limit=3)
+        self.assertEqual(getNames(results), ["Service 1", "Service 10", "Service 100"])
+
+class MatchingTest(unittest.TestCase):
+    def setUp(self):
+        self.index = buildIndex()
+
+    def testPrefixOfLastToken(self):
+        self.assertEqual(getNames(self.index.search("jelly")), ["Jellyfin"])
+        self.assertEqual(getNames(self.index.search("home assis"))[0], "Home Assistant")
+        self.assertEqual(self.index.search("je server"), self.index.search("server")) # Only the last token is matched as prefix or substring
+        self.assertGreater(self.index.search("server je")[0][1], self.index.search("server")[0][1])
+
+    def testSubstring(self):
+        self.assertIn("HomeAssistant Backup", getNames(self.index.search("assist")))
+        self.assertEqual(getNames(self.index.search("hub")), ["GitHub"])
+        self.assertEqual(getNames(self.index.search("bee2")), ["Zigbee2MQTT"])
+        self.assertEqual(self.index.search("ub"), []) # Too short to match inside of tokens
+
+    def testTypos(self):
+        self.assertEqual(getNames(self.index.search("jelyfin")), ["Jellyfin"])
+        self.assertEqual(getNames(self.index.search("githbu"))[0], "GitHub")
+        self.assertEqual(self.index.search("8124"), []) # Numbers are not matched fuzzily
+
+    def testCaseAndPunctuation(self):
+        self.assertEqual(self.index.search("GITHUB"), self.index.search("github"))
+        self.assertEqual(getNames(self.index.search("192.168.2.15"))[0], "Home Assistant")
+
+    def testNoMatches(self):
+        self.assertEqual(self.index.search("kubernetes"), [])
+        self.assertEqual(self.index.search("  "), [])
+
+class UpdateTest(unittest.TestCase):
+    def testIncrementalUpdateMatchesFreshIndex(self):
+        index = buildIndex()
+        changed = dict(entries)
+        del changed["Router"]
+        changed["GitHub"] = {"url": "https://github.com", "description": "Pull requests"}
+        changed["Nextcloud"] = {"url": "https://cloud.local"}
+        updated = index.copy()
+        updated.update(buildCatalog(changed))
+        fresh = buildIndex(changed)
+        for query in ("router", "pull", "code", "cloud", "git", "hub", "http"):
+            with self.subTest(query):
+                self.assertEqual(updated.search(query), fresh.search(query))
+        self.assertEqual(getNames(index.search("router")), ["Router"]) # The copied index is left unchanged
+        self.assertEqual(index.search("pull"), [])
+
+    def testRemovingAndAddingTokensAgain(self):
+        index = buildIndex()
+        updated = index.copy()
+        withoutJellyfin = {name: entry for name, entry in entries.items() if name != "Jellyfin"}
+        updated.update(buildCatalog(withoutJellyfin))
+        updated.update(buildCatalog(entries))
+        self.assertEqual(updated.search("jellyfin"), index.search("jellyfin"))
+
+class SearchEntriesTest(unittest.TestCase):
+    def setUp(self):
+        patch = mock.patch.dict(searchIndex.indexState, {"index": SearchIndex()}, clear=True)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def waitForUpdates(self):
+        searchIndex.workerPool.submit(lambda: None).result()
+
+    def testFirstSearchBuildsTheIndex(self):
+        catalog = buildCatalog(entries)
+        self.assertEqual(getNames(searchIndex.searchEntries(catalog, "jellyfin")), ["Jellyfin"])
+        self.assertIs(searchIndex.indexState["index"].entries, catalog)
+
+    def testQueuedUpdateIsSwappedIn(self):
+        catalog = buildCatalog(entries)
+        searchIndex.queueIndexUpdate(catalog)
+        self.waitForUpdates()
+        index = searchIndex.indexState["index"]
+        self.assertIs(index.entries, catalog)
+        self.assertEqual(getNames(searchIndex.searchEntries(catalog, "router")), ["Router"])
+        self.assertIs(searchIndex.indexState["index"], index) # Searching did not update it again
+
+    def testRemovedEntriesAreLeftOutUntilTheIndexIsUpdated(self):
+        catalog = buildCatalog(entries)
+        searchIndex.updateSearchIndex(catalog)
+        withoutRouter = catalog.withoutEntry("Router")
+        with mock.patch.object(searchIndex, "queueIndexUpdate") as queueIndexUpdate:
+            self.assertEqual(searchIndex.searchEntries(withoutRouter, "router"), [])
+        queueIndexUpdate.assert_called_once_with(withoutRouter)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Tests that the incremental validation of entries (see yamlServices.validateEntryModel()) fails exactly like EntryModel.
+
+Usage:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+from pydantic import ValidationError
+
+repoDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repoDir)
+
+from app import yamlServices
+from app.entryCatalog import buildCatalog
+from app.validationModels import EntryModel
+
+validEntries = {
+    "a": {"url": "https://a.example", "description": "A"},
+    "b": {"url": "https://b.example", "picture": "b.png"},
+    "c": None
+}
+
+invalidCases = {
+    "unknown field": dict(validEntries, d={"url": "https://d.example", "color": "red"}),
+    "wrong type": dict(validEntries, d={"url": 5}),
+    "nested value": dict(validEntries, a={"url": ["https://a.example"]}),
+    "entry not a mapping": dict(validEntries, d="https://d.example"),
+    "several invalid entries": dict(validEntries, d={"url": 5}, e={"picture": {"file": "e.png"}}, f=[1]),
+    "changed valid entry": dict(validEntries, b={"url": "https://b.example", "extra": True}),
+    "not a mapping": ["a", "b"],
+    "scalar": "entries",
+    "non string names": {1: {"url": "https://one.example"}}
+}
+
+class ValidateEntriesTest(unittest.TestCase):
+    def setUp(self):
+        # The entries of the last validation are skipped, the errors have to be the same with and without them
+        patch = mock.patch.object(yamlServices, "lastValidEntries", buildCatalog(validEntries))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def assertSameErrors(self, data):
+        with self.assertRaises(ValidationError) as expected:
+            EntryModel.model_validate(data)
+        with self.assertRaises(ValidationError) as actual:
+            yamlServices.validateEntryModel(data)
+        self.assertEqual(actual.exception.title, expected.exception.title)
+        self.assertEqual(actual.exception.errors(), expected.exception.errors())
+        self.assertEqual(str(actual.exception), str(expected.exception))
+
+    def testSameErrorsAsEntryModel(self):
+        for name, data in invalidCases.items():
+            with self.subTest(name):
+                self.assertSameErrors(data)
+
+    def testSameErrorsWithoutPreviousEntries(self):
+        with mock.patch.object(yamlServices, "lastValidEntries", buildCatalog({})):
+            for name, data in invalidCases.items():
+                with self.subTest(name):
+                    self.assertSameErrors(data)
+
+    def testValidEntries(self):
+        data = dict(validEntries, d={"description": "D"})
+        catalog = yamlServices.validateEntryModel(data)
+        self.assertEqual(list(catalog), ["a", "b", "c", "d"])
+        self.assertEqual(catalog.toDicts(), dict(validEntries, c={}, d={"description": "D"}))
+
+    def testCheckingDoesNotReplaceTheLastValidEntries(self):
+        previous = yamlServices.lastValidEntries
+        yamlServices.validateYamlFromUser("x:\n  url: https://x.example\n", "entries.yaml")
+        self.assertIs(yamlServices.lastValidEntries, previous)
+
+if __name__ == "__main__":
+    unittest.main()